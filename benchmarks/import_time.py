@@ -0,0 +1,65 @@
+"""Import-time benchmark for the scheduling core.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and
+reports the cumulative import cost per module.
+
+Usage:
+    python benchmarks/import_time.py [module] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional dependencies that must not load when importing the scheduling core
+LAZY_DEPENDENCIES = ("streamlit", "yaml", "openpyxl", "http.server")
+
+
+def measure_import(module="scheduling_utils"):
+    """Import module in a fresh interpreter and return {module: cumulative_us}"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header row
+        timings[name.strip()] = int(cumulative)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("module", nargs="?", default="scheduling_utils")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    timings = measure_import(args.module)
+
+    print(f"Cumulative import time for {args.module}: {timings[args.module] / 1000:.1f} ms")
+    print()
+    print(f"{'module':<60} {'ms':>10}")
+    for name, us in sorted(timings.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<60} {us / 1000:>10.1f}")
+
+    loaded = [dep for dep in LAZY_DEPENDENCIES if dep in timings]
+    if loaded:
+        print()
+        print(f"Eagerly imported optional dependencies: {', '.join(loaded)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""Scale benchmark: scheduler and exporters on synthetic teams.
+
+Loads synthetic configs through import_config (as the app does) and times
+generation, local search and the Excel/ICS exporters for each team size.
+
+Usage:
+    python benchmarks/scale.py [--sizes 50 100 300] [--month 2024-01] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scheduling_utils import (  # noqa: E402
+    create_excel_export, create_ics_export, generate_schedule, import_config, improve_schedule, st
+)
+from synthetic_config import generate_config, to_yaml  # noqa: E402
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(sizes, year, month, seed):
+    rows = []
+    for size in sizes:
+        config = generate_config(team_size=size, months=[(year, month)], seed=seed)
+        st.session_state.doctors = []
+        st.session_state.shift_config = {}
+        st.session_state.constraints = {}
+        st.session_state.fairness = {}
+        st.session_state.rest_rules = {}
+        success, message = import_config(to_yaml(config))
+        if not success:
+            raise RuntimeError(message)
+
+        doctors = st.session_state.doctors
+        df, generate_s = timed(generate_schedule, year, month, doctors)
+        improved, improve_s = timed(improve_schedule, df, year, month, doctors, seed=seed)
+        _, excel_s = timed(create_excel_export, improved, year, month)
+        _, ics_s = timed(create_ics_export, improved)
+        rows.append((size, len(improved), generate_s, improve_s, excel_s, ics_s))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 100, 300])
+    parser.add_argument('--month', default='2024-01', metavar='YYYY-MM')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    year, month = map(int, args.month.split('-'))
+
+    print(f"{'team':>6} {'rows':>7} {'generate':>10} {'improve':>10} {'excel':>10} {'ics':>10}")
+    for size, n_rows, *seconds in run(args.sizes, year, month, args.seed):
+        print(f"{size:>6} {n_rows:>7} " + " ".join(f"{s * 1000:>8.0f}ms" for s in seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives simulated coordinator sessions of main.py through Streamlit's AppTest
+(no browser or network) inside one process, the way one server instance
+hosts many sessions: each loads a team, generates a schedule, filters the
+table, makes an edit and waits for the background exports. Sessions share
+the process-wide caches and export pool just as they would in production.
+
+AppTest swaps process-wide globals (the runtime, config) for the length of
+each run, so runs from different sessions take turns on a lock; on a real
+server CPU-bound reruns largely take turns on the GIL anyway. Latency is
+measured from the moment a session asks for a rerun, so time queued behind
+other sessions counts, as it would for a user; the script's own run time is
+reported separately. Edits include the app's own half-second confirmation
+pause, which holds the lock too, so edit-heavy runs overstate queueing.
+
+Reports rerun latency percentiles per step, process CPU time (exports and
+script threads included) and resident memory per live session. With
+--max-p95 the run fails when any step's p95 rerun latency goes over budget,
+so it can guard against rerun-latency regressions.
+
+Usage:
+    python benchmarks/sessions.py [--sessions 8] [--concurrency 4] [--team default|SIZE]
+                                  [--month 2024-01] [--seed 0] [--json results.json] [--max-p95 MS]
+"""
+import argparse
+import calendar
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from synthetic_config import generate_config, to_yaml  # noqa: E402
+
+APP = os.path.join(REPO_ROOT, 'main.py')
+STEPS = ('start', 'load', 'generate', 'filter', 'edit', 'export')
+EXPORT_POLL_SECONDS = 0.25
+
+_RUN_LOCK = threading.Lock()
+
+
+def rss_bytes():
+    """Resident set size of this process"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+
+        # Peak rather than current RSS off Linux (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Session:
+    """One simulated coordinator: an AppTest plus the latency of every rerun it triggered"""
+
+    def __init__(self, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(APP, default_timeout=timeout)
+        self.latencies = []  # (step, seconds from request to result, seconds running)
+
+    def rerun(self, step, element=None):
+        """Run the script (or apply an element's pending change) and time it"""
+        requested = time.perf_counter()
+        with _RUN_LOCK:
+            started = time.perf_counter()
+            (element or self.app).run()
+        finished = time.perf_counter()
+        self.latencies.append((step, finished - requested, finished - started))
+        if self.app.exception:
+            raise RuntimeError(f"{step}: {self.app.exception[0].value}")
+
+    def load_team(self, team_yaml):
+        self.rerun('load', self.app.button(key='load_defaults').click())
+        if team_yaml is None:
+            return
+        # The config editor lives in the Constraints tab, which appears once a schedule exists
+        self.rerun('load', self.app.button(key='generate').click())
+        self.rerun('load', self.app.button(key='open_editor').click())
+        self.rerun('load', self.app.text_area(key='yaml_editor').input(team_yaml))
+        self.rerun('load', self.app.button(key='apply_yaml').click())
+
+    def generate(self, year, month):
+        self.rerun('generate', self.app.selectbox(key='sched_month').set_value(month))
+        self.rerun('generate', self.app.number_input(key='sched_year').set_value(year))
+        self.rerun('generate', self.app.button(key='generate').click())
+
+    def filter(self):
+        doctors = self.app.session_state['doctors']
+        self.rerun('filter', self.app.multiselect(key='filter_doctors').set_value(doctors[:max(len(doctors) // 2, 1)]))
+        self.rerun('filter', self.app.multiselect(key='filter_doctors').set_value(doctors))
+
+    def edit(self):
+        self.rerun('edit', self.app.checkbox(key='edit_mode').check())
+        reassign = next(s for s in self.app.selectbox if s.key and s.key.startswith('reassign_'))
+        other = next(d for d in self.app.session_state['doctors'] if d != reassign.value)
+        self.rerun('edit', reassign.set_value(other))
+        self.rerun('edit', self.app.checkbox(key='edit_mode').uncheck())
+
+    def wait_for_exports(self, timeout):
+        """Rerun until the Excel and calendar downloads are ready; returns the wait in seconds"""
+        start = time.perf_counter()
+        while time.perf_counter() - start < timeout:
+            keys = {button.key for button in self.app.get('download_button')}
+            if {'export_excel', 'export_ics'} <= keys:
+                return time.perf_counter() - start
+            time.sleep(EXPORT_POLL_SECONDS)
+            self.rerun('export')
+        raise TimeoutError("exports did not finish")
+
+    def run(self, team_yaml, year, month, timeout):
+        self.rerun('start')
+        self.load_team(team_yaml)
+        self.generate(year, month)
+        self.filter()
+        self.edit()
+        return self.wait_for_exports(timeout)
+
+
+def percentiles(seconds):
+    values = np.array(seconds) * 1000
+    return {'count': len(values), 'p50': float(np.percentile(values, 50)), 'p95': float(np.percentile(values, 95)),
+            'p99': float(np.percentile(values, 99)), 'max': float(values.max())}
+
+
+def run(sessions, concurrency, team, year, month, seed, timeout=120):
+    """Run the sessions and return a results dict (latency percentiles per step, CPU, memory)"""
+    team_yaml = None
+    if team != 'default':
+        config = generate_config(team_size=int(team), months=[(year, month)], seed=seed)
+        team_yaml = to_yaml(config)
+
+    # A warm-up session pays for imports and first-use caches outside the measurement
+    Session(timeout).run(team_yaml, year, month, timeout)
+
+    baseline_rss = rss_bytes()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    live = []
+    lock = threading.Lock()
+
+    def one_session(_):
+        session = Session(timeout)
+        export_wait = session.run(team_yaml, year, month, timeout)
+        with lock:
+            live.append(session)  # Keep every session alive for the memory reading
+        return export_wait
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        export_waits = list(executor.map(one_session, range(sessions)))
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    rss_per_session = (rss_bytes() - baseline_rss) / sessions
+
+    latencies = [latency for session in live for latency in session.latencies]
+    return {
+        'sessions': sessions,
+        'concurrency': concurrency,
+        'team': team,
+        'month': f"{year}-{month:02d}",
+        'steps': {step: percentiles([latency for name, latency, _ in latencies if name == step])
+                  for step in STEPS if any(name == step for name, _, _ in latencies)},
+        'run_time': percentiles([running for _, _, running in latencies]),
+        'export_ready': percentiles(export_waits),
+        'reruns': len(latencies),
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'cpu_per_rerun_ms': cpu / len(latencies) * 1000,
+        'rss_per_session_mb': rss_per_session / 2 ** 20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8, help="Sessions to simulate")
+    parser.add_argument('--concurrency', type=int, default=4, help="Sessions running at the same time")
+    parser.add_argument('--team', default='default', help="'default' or a synthetic team size")
+    parser.add_argument('--month', default='2024-01', metavar='YYYY-MM')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    parser.add_argument('--max-p95', type=float, metavar='MS', help="Fail if any step's p95 rerun latency exceeds this")
+    args = parser.parse_args()
+    year, month = map(int, args.month.split('-'))
+
+    os.chdir(REPO_ROOT)  # The app resolves its archive directory relative to the working directory
+    results = run(args.sessions, args.concurrency, args.team, year, month, args.seed)
+
+    print(f"{results['sessions']} sessions, {results['concurrency']} at a time, "
+          f"team {results['team']}, {calendar.month_name[month]} {year}")
+    print(f"{'step':<10} {'reruns':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    rows = list(results['steps'].items()) + [('run*', results['run_time']), ('exports**', results['export_ready'])]
+    for step, stats in rows:
+        print(f"{step:<10} {stats['count']:>7} " + " ".join(f"{stats[k]:>7.0f}ms" for k in ('p50', 'p95', 'p99', 'max')))
+    print("* script run time of every rerun, without time queued behind other sessions")
+    print("** time from the edit until both background exports were downloadable")
+    print(f"wall {results['wall_seconds']:.1f}s, CPU {results['cpu_seconds']:.1f}s "
+          f"({results['cpu_per_rerun_ms']:.0f}ms per rerun, {results['cpu_seconds'] / results['wall_seconds']:.0%} of one core), "
+          f"{results['rss_per_session_mb']:.1f} MB per session")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_p95 is not None:
+        slow = [step for step, stats in results['steps'].items() if stats['p95'] > args.max_p95]
+        if slow:
+            print(f"p95 over {args.max_p95:.0f}ms: {', '.join(slow)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
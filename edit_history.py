@@ -0,0 +1,165 @@
+"""Delta-based edit history for schedules.
+
+Every reassignment is stored as a compact Edit (slot, old member, new
+member, timestamp, author) instead of a copy of the schedule; a bulk
+operation is a single BulkEdit, one version that undoes in one step. Undo
+and redo move a cursor over the edit list, periodic checkpoints hold the
+cumulative overrides so any version can be rebuilt by replaying a few
+edits, and any two versions can be diffed without materialising either
+schedule.
+"""
+import time
+from collections import namedtuple
+
+from schedule_store import with_assignments
+
+
+class Edit(namedtuple('Edit', ['slot', 'old', 'new', 'timestamp', 'author'])):
+    """One reassigned slot"""
+
+    __slots__ = ()
+
+    @property
+    def changes(self):
+        """(slot, old, new) for every slot the edit touches"""
+        return ((self.slot, self.old, self.new),)
+
+
+class BulkEdit(namedtuple('BulkEdit', ['slots', 'old', 'new', 'timestamp', 'author', 'action'])):
+    """Many slots reassigned as one version; slots, old and new are parallel tuples"""
+
+    __slots__ = ()
+
+    @property
+    def changes(self):
+        return tuple(zip(self.slots, self.old, self.new))
+
+
+class EditLog:
+    """Edit history for one schedule
+
+    Slots are schedule row labels. Version 0 is the schedule as generated;
+    version N is the schedule after the first N recorded edits.
+    """
+
+    def __init__(self, base_assignments, checkpoint_every=50):
+        self._base = base_assignments  # Mapping or Series slot -> member for version 0 (not copied)
+        self._edits = []
+        self._cursor = 0
+        self._checkpoint_every = checkpoint_every
+        self._checkpoints = {0: {}}  # version -> cumulative overrides {slot: member}
+        self._overrides = {}  # Overrides at the current version
+
+    @classmethod
+    def from_schedule(cls, df, checkpoint_every=50):
+        """Start a log for a schedule DataFrame (its Doctor column, not copied, is version 0)"""
+        return cls(df['Doctor'], checkpoint_every=checkpoint_every)
+
+    @property
+    def version(self):
+        return self._cursor
+
+    @property
+    def latest_version(self):
+        return len(self._edits)
+
+    @property
+    def edits(self):
+        """Audit trail of edits up to the latest version"""
+        return list(self._edits)
+
+    def can_undo(self):
+        return self._cursor > 0
+
+    def can_redo(self):
+        return self._cursor < len(self._edits)
+
+    def record(self, slot, old, new, author=None):
+        """Record a reassignment; discards any undone edits after the cursor"""
+        return self._append(Edit(slot, old, new, time.time(), author))
+
+    def record_many(self, slots, old, new, author=None, action=None):
+        """Record several reassignments as one version (a BulkEdit); action describes the operation"""
+        return self._append(BulkEdit(tuple(slots), tuple(old), tuple(new), time.time(), author, action))
+
+    def _append(self, edit):
+        if self._cursor < len(self._edits):
+            del self._edits[self._cursor:]
+            self._checkpoints = {v: c for v, c in self._checkpoints.items() if v <= self._cursor}
+
+        self._edits.append(edit)
+        self._advance(edit)
+        return edit
+
+    def undo(self):
+        """Step back one version and return the edit to revert (apply its old members)"""
+        if not self.can_undo():
+            return None
+        self._cursor -= 1
+        edit = self._edits[self._cursor]
+        for slot, old, _ in edit.changes:
+            self._set_override(slot, old)
+        return edit
+
+    def redo(self):
+        """Step forward one version and return the edit to reapply (apply its new members)"""
+        if not self.can_redo():
+            return None
+        edit = self._edits[self._cursor]
+        self._advance(edit)
+        return edit
+
+    def overrides_at(self, version):
+        """Changed slots {slot: member} at a version, relative to version 0"""
+        if not 0 <= version <= len(self._edits):
+            raise ValueError(f"Unknown version {version}")
+        if version == self._cursor:
+            return dict(self._overrides)
+
+        checkpoint = max(v for v in self._checkpoints if v <= version)
+        overrides = dict(self._checkpoints[checkpoint])
+        for edit in self._edits[checkpoint:version]:
+            for slot, _, new in edit.changes:
+                if new == self._base.get(slot):
+                    overrides.pop(slot, None)
+                else:
+                    overrides[slot] = new
+        return overrides
+
+    def member_at(self, slot, version):
+        """Member assigned to a slot at a version"""
+        return self.overrides_at(version).get(slot, self._base.get(slot))
+
+    def diff(self, from_version, to_version):
+        """Slots whose member differs between two versions: {slot: (member_from, member_to)}"""
+        before = self.overrides_at(from_version)
+        after = self.overrides_at(to_version)
+        changes = {}
+        for slot in before.keys() | after.keys():
+            old = before.get(slot, self._base.get(slot))
+            new = after.get(slot, self._base.get(slot))
+            if old != new:
+                changes[slot] = (old, new)
+        return changes
+
+    def apply(self, df, version=None):
+        """Return df with the Doctor column at a version (default: current)
+
+        Only the Doctor column is copied, and only when the version differs
+        from version 0; the other columns are shared with df.
+        """
+        overrides = self.overrides_at(self._cursor if version is None else version)
+        return with_assignments(df, overrides)
+
+    def _advance(self, edit):
+        self._cursor += 1
+        for slot, _, new in edit.changes:
+            self._set_override(slot, new)
+        if self._cursor % self._checkpoint_every == 0:
+            self._checkpoints[self._cursor] = dict(self._overrides)
+
+    def _set_override(self, slot, member):
+        if member == self._base.get(slot):
+            self._overrides.pop(slot, None)
+        else:
+            self._overrides[slot] = member
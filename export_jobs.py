@@ -0,0 +1,166 @@
+"""Background export jobs for schedules.
+
+Exports run on a shared worker pool so the Streamlit script never blocks on
+workbook or calendar generation. Each submitted job returns an ExportHandle
+that the UI can poll for progress and batch code can wait on through the
+standard concurrent.futures API.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from metrics import EXPORT_BYTES, EXPORT_FAILURES, EXPORT_SECONDS
+from scheduling_utils import create_excel_export, create_ics_export
+
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'mime': 'text/csv'},
+    'excel': {'extension': 'xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'},
+    'ics': {'extension': 'ics', 'mime': 'text/calendar'},
+}
+
+
+@dataclass(frozen=True)
+class ExportJob:
+    """Description of a single export: format, month, optional date range and member filter"""
+    format: str
+    year: int
+    month: int
+    start_date: str = None  # Inclusive YYYY-MM-DD
+    end_date: str = None  # Inclusive YYYY-MM-DD
+    members: tuple = None
+
+    @property
+    def filename(self):
+        extension = EXPORT_FORMATS[self.format]['extension']
+        return f"schedule_{self.year}_{self.month:02d}.{extension}"
+
+    @property
+    def mime(self):
+        return EXPORT_FORMATS[self.format]['mime']
+
+
+def filter_schedule(df, job):
+    """Restrict a schedule to the job's date range and members"""
+    mask = df['Date'].notna()
+    if job.start_date:
+        mask &= df['Date'] >= job.start_date
+    if job.end_date:
+        mask &= df['Date'] <= job.end_date
+    if job.members is not None:
+        mask &= df['Doctor'].isin(job.members)
+    return df[mask]
+
+
+def run_export(df, job, progress=None):
+    """Run an export job synchronously and return the file contents as bytes
+
+    Duration, size and failures are recorded in the process metrics by format.
+    """
+    if job.format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {job.format}")
+
+    start = time.perf_counter()
+    try:
+        data = _render_export(df, job, progress)
+    except Exception:
+        EXPORT_FAILURES.inc(format=job.format)
+        raise
+    EXPORT_SECONDS.observe(time.perf_counter() - start, format=job.format)
+    EXPORT_BYTES.observe(len(data), format=job.format)
+    return data
+
+
+def _render_export(df, job, progress):
+    filtered = filter_schedule(df, job)
+
+    if job.format == 'csv':
+        data = filtered.to_csv(index=False).encode('utf-8')
+        if progress:
+            progress(1.0)
+        return data
+    if job.format == 'excel':
+        return create_excel_export(filtered, job.year, job.month, progress=progress).getvalue()
+    return create_ics_export(filtered, progress=progress).encode('utf-8')
+
+
+class ExportHandle:
+    """Handle to a submitted export job"""
+
+    def __init__(self, job):
+        self.job = job
+        self.future = None
+        self._progress = 0.0
+        self._lock = threading.Lock()
+
+    def _report(self, fraction):
+        with self._lock:
+            self._progress = max(self._progress, min(fraction, 1.0))
+
+    @property
+    def progress(self):
+        """Completed fraction between 0.0 and 1.0"""
+        if self.future is not None and self.future.done():
+            return 1.0
+        with self._lock:
+            return self._progress
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    @property
+    def error(self):
+        """Exception raised by the export, if it finished with one"""
+        if not self.done():
+            return None
+        return self.future.exception()
+
+    def result(self, timeout=None):
+        """Block until the export finishes and return its bytes"""
+        return self.future.result(timeout=timeout)
+
+
+class ExportManager:
+    """Worker pool that accepts export jobs and returns ExportHandles
+
+    Threads are used by default so progress is reported live. With
+    use_processes=True exports run in separate processes; progress then
+    jumps from 0 to 1 when a job completes, and export metrics are recorded
+    in the worker processes rather than this one.
+    """
+
+    def __init__(self, max_workers=None, use_processes=False):
+        self.use_processes = use_processes
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='export')
+
+    def submit(self, df, job):
+        """Submit one export job for a schedule"""
+        handle = ExportHandle(job)
+        if self.use_processes:
+            handle.future = self._executor.submit(run_export, df, job)
+        else:
+            handle.future = self._executor.submit(run_export, df, job, handle._report)
+        return handle
+
+    def submit_many(self, df, jobs):
+        """Submit several export jobs for the same schedule"""
+        return [self.submit(df, job) for job in jobs]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def iter_completed(handles, timeout=None):
+    """Yield handles as their exports finish"""
+    by_future = {handle.future: handle for handle in handles}
+    for future in as_completed(by_future, timeout=timeout):
+        yield by_future[future]
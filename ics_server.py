@@ -0,0 +1,214 @@
+"""Local ICS subscription server for per-member and per-team calendar feeds.
+
+Feeds are rendered with create_ics_export and cached per member. Updating a
+team's schedule only invalidates the feeds of members whose shifts changed.
+Responses carry a strong ETag and Last-Modified, so polling calendar clients
+get a body-less 304 Not Modified until their feed actually changes.
+
+Routes:
+    /teams/<team>.ics                      whole-team feed
+    /teams/<team>/members/<member>.ics     one member's shifts
+
+Usage:
+    python ics_server.py --schedule er=schedule_2024_01.csv [--port 8765]
+"""
+import argparse
+import hashlib
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import pandas as pd
+
+from scheduling_utils import create_ics_export
+
+FEED_COLUMNS = ['Date', 'Shift', 'Start_Time', 'End_Time', 'Doctor']
+CACHE_MAX_AGE = 300  # Seconds clients may reuse a feed without revalidating
+
+
+class Feed:
+    """Rendered ICS feed with its validators"""
+
+    def __init__(self, body, last_modified):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = last_modified
+
+
+class FeedStore:
+    """Schedules per team plus lazily rendered, fingerprint-invalidated feeds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schedules = {}  # team -> DataFrame
+        self._fingerprints = {}  # (team, member or None) -> content hash
+        self._modified = {}  # (team, member or None) -> timestamp of last content change
+        self._feeds = {}  # (team, member or None) -> Feed
+        self.renders = 0  # Number of feeds rendered, for monitoring and tests
+
+    def update(self, team, df):
+        """Store a team's schedule; returns the members whose feeds changed"""
+        df = df[FEED_COLUMNS].reset_index(drop=True)
+        row_hashes = pd.util.hash_pandas_object(df, index=False)
+        member_hashes = row_hashes.groupby(df['Doctor']).sum()
+        fingerprints = {member: int(value) for member, value in member_hashes.items()}
+        fingerprints[None] = int(row_hashes.sum())
+
+        now = time.time()
+        changed = []
+        with self._lock:
+            self._schedules[team] = df
+            stale_keys = {key for key, fingerprint in self._fingerprints.items()
+                          if key[0] == team and key[1] not in fingerprints and fingerprint is not None}
+            for member, fingerprint in fingerprints.items():
+                key = (team, member)
+                if self._fingerprints.get(key) != fingerprint:
+                    self._fingerprints[key] = fingerprint
+                    self._modified[key] = now
+                    self._feeds.pop(key, None)
+                    if member is not None:
+                        changed.append(member)
+            for key in stale_keys:
+                # Member no longer on the schedule: their feed becomes empty
+                self._fingerprints[key] = None
+                self._modified[key] = now
+                self._feeds.pop(key, None)
+                changed.append(key[1])
+        return changed
+
+    def teams(self):
+        with self._lock:
+            return list(self._schedules)
+
+    def get_feed(self, team, member=None):
+        """Return the Feed for a team or member (None if the team or member is unknown)"""
+        key = (team, member)
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is not None:
+                return feed
+            if team not in self._schedules or key not in self._fingerprints:
+                return None
+            df = self._schedules[team]
+            last_modified = self._modified[key]
+
+        rows = df if member is None else df[df['Doctor'] == member]
+        feed = Feed(create_ics_export(rows).encode('utf-8'), last_modified)
+
+        with self._lock:
+            # Keep the render unless the schedule changed while we were working
+            if self._modified.get(key) == last_modified:
+                self._feeds[key] = feed
+            self.renders += 1
+        return feed
+
+
+def parse_feed_path(path):
+    """Map a request path to (team, member); member is None for team feeds"""
+    parts = [unquote(part) for part in path.split('?', 1)[0].strip('/').split('/')]
+    if len(parts) == 2 and parts[0] == 'teams' and parts[1].endswith('.ics'):
+        return parts[1][:-4], None
+    if len(parts) == 4 and parts[0] == 'teams' and parts[2] == 'members' and parts[3].endswith('.ics'):
+        return parts[1], parts[3][:-4]
+    return None
+
+
+def is_not_modified(headers, feed):
+    """Evaluate If-None-Match / If-Modified-Since against a feed"""
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or feed.etag in tags
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(feed.last_modified) <= since
+    return False
+
+
+def make_handler(store):
+    """Build a request handler class bound to a FeedStore"""
+
+    class FeedHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self._serve(send_body=True)
+
+        def do_HEAD(self):
+            self._serve(send_body=False)
+
+        def _serve(self, send_body):
+            target = parse_feed_path(self.path)
+            feed = store.get_feed(*target) if target else None
+            if feed is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+            if is_not_modified(self.headers, feed):
+                self.send_response(304)
+                self._send_validators(feed)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/calendar; charset=utf-8')
+            self.send_header('Content-Length', str(len(feed.body)))
+            self._send_validators(feed)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(feed.body)
+
+        def _send_validators(self, feed):
+            self.send_header('ETag', feed.etag)
+            self.send_header('Last-Modified', formatdate(feed.last_modified, usegmt=True))
+            self.send_header('Cache-Control', f'max-age={CACHE_MAX_AGE}')
+
+        def log_message(self, format, *args):
+            pass  # Calendar clients poll constantly; keep the console quiet
+
+    return FeedHandler
+
+
+def serve_feeds(store, host='127.0.0.1', port=8765):
+    """Start the feed server on a background thread and return it (call .shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='ics-server', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve schedule ICS feeds over HTTP")
+    parser.add_argument('--schedule', action='append', default=[], metavar='TEAM=CSV',
+                        help="Team schedule exported as CSV (repeatable)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    store = FeedStore()
+    for item in args.schedule:
+        team, path = item.split('=', 1)
+        store.update(team, pd.read_csv(path, dtype=str))
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"Serving feeds for {', '.join(store.teams()) or 'no teams'} on http://{args.host}:{args.port}/teams/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
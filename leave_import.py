@@ -0,0 +1,229 @@
+"""Streaming bulk import of leave (days off) from CSV or Excel files.
+
+Rows are read one at a time (csv.reader, or openpyxl in read-only mode) and
+validated as they stream: the member must be on the team and the dates must
+parse. Valid rows are collected per member and merged into the constraints
+in a single pass at the end, so a 50k-row HR export never sits in memory as
+a table. Single days go into the month's days_off list; multi-day leave
+becomes a date range under 'unavailable' (see normalize_unavailability),
+which also keeps the row's reason.
+
+Expected columns (header names are case-insensitive, aliases in brackets):
+    member  [name, employee, doctor, team member]
+    date    [day]                 a single day of leave, or
+    start   [from, start date] and end [to, end date] for a range
+    reason  [type, note, leave type]  optional
+
+Dates may be YYYY-MM-DD, MM/DD/YYYY or Excel date cells.
+
+Usage:
+    python leave_import.py leave.csv --config team.yaml [-o merged.yaml] [--add-members]
+"""
+import argparse
+import csv
+import io
+import os
+from collections import defaultdict, namedtuple
+from datetime import date, datetime
+
+COLUMN_ALIASES = {
+    'member': ('member', 'name', 'employee', 'doctor', 'team member'),
+    'date': ('date', 'day'),
+    'start': ('start', 'from', 'start date', 'start_date'),
+    'end': ('end', 'to', 'end date', 'end_date'),
+    'reason': ('reason', 'type', 'note', 'leave type'),
+}
+
+LeaveImportResult = namedtuple('LeaveImportResult', [
+    'rows', 'days_off', 'ranges', 'new_members', 'errors', 'error_count'
+])
+
+
+def parse_leave_date(value):
+    """Date for a YYYY-MM-DD / MM/DD/YYYY string or an Excel date cell"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(text, '%m/%d/%Y').date()
+    except ValueError:
+        raise ValueError(f"Unrecognised date {text!r}") from None
+
+
+def _column_positions(header):
+    """Map each known column to its position in the header row"""
+    names = [str(name).strip().lower() if name is not None else '' for name in header]
+    positions = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                positions[column] = names.index(alias)
+                break
+    if 'member' not in positions:
+        raise ValueError("Leave file needs a member (or name/employee) column")
+    if 'date' not in positions and 'start' not in positions:
+        raise ValueError("Leave file needs a date column, or start and end columns")
+    return positions
+
+
+def iter_leave_rows(file, filename):
+    """Yield (row_number, cells) from a CSV or XLSX leave file, header row first
+
+    file is a path or a binary file object; filename picks the format.
+    Row numbers match what a spreadsheet shows (the header is row 1).
+    """
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row_number, row in enumerate(workbook.active.iter_rows(values_only=True), start=1):
+                yield row_number, row
+        finally:
+            workbook.close()
+        return
+
+    if isinstance(file, (str, os.PathLike)):
+        handle = open(file, newline='', encoding='utf-8-sig')
+    else:
+        handle = io.TextIOWrapper(file, newline='', encoding='utf-8-sig')
+    try:
+        yield from enumerate(csv.reader(handle), start=1)
+    finally:
+        if isinstance(file, (str, os.PathLike)):
+            handle.close()
+        else:
+            handle.detach()  # Leave the caller's file open
+
+
+def import_leave(file, filename, doctors, constraints, add_members=False, max_errors=1000):
+    """Stream a leave file and merge it into constraints (modified in place)
+
+    Unknown members are errors unless add_members is set, in which case they
+    are appended to doctors. Rows already present (same day, or same range
+    and reason) are not added twice. At most max_errors row errors are kept,
+    but all of them are counted. Returns a LeaveImportResult.
+    """
+    known = set(doctors)
+    new_members = []
+    days_off = defaultdict(set)   # member -> {date}
+    ranges = defaultdict(dict)    # member -> {(start, end, reason): None}, keeps file order
+    errors = []
+    error_count = 0
+    rows = 0
+    positions = None
+
+    def cell(cells, column):
+        position = positions.get(column)
+        if position is None or position >= len(cells):
+            return None
+        value = cells[position]
+        return None if value is None or (isinstance(value, str) and not value.strip()) else value
+
+    for row_number, cells in iter_leave_rows(file, filename):
+        if positions is None:
+            positions = _column_positions(cells)
+            continue
+        if not any(value not in (None, '') for value in cells):
+            continue  # Blank line
+        rows += 1
+        try:
+            member = cell(cells, 'member')
+            if member is None:
+                raise ValueError("Missing member")
+            member = str(member).strip()
+            if member not in known:
+                if not add_members:
+                    raise ValueError(f"Unknown member {member!r}")
+                known.add(member)
+                new_members.append(member)
+
+            single = cell(cells, 'date')
+            start_value = single if single is not None else cell(cells, 'start')
+            if start_value is None:
+                raise ValueError("Missing date")
+            start = parse_leave_date(start_value)
+            end_value = cell(cells, 'end')
+            end = parse_leave_date(end_value) if single is None and end_value is not None else start
+            if end < start:
+                raise ValueError(f"Leave ends ({end}) before it starts ({start})")
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < max_errors:
+                errors.append((row_number, str(e)))
+            continue
+
+        if start == end:
+            days_off[member].add(start)
+        else:
+            reason = cell(cells, 'reason')
+            ranges[member][(start, end, str(reason).strip() if reason is not None else None)] = None
+
+    if positions is None:
+        raise ValueError("Leave file is empty")
+
+    # Merge everything in one pass per member
+    doctors.extend(new_members)
+    added_days = added_ranges = 0
+    for member, dates in days_off.items():
+        member_constraints = constraints.setdefault(member, {})
+        by_month = defaultdict(list)
+        for day in sorted(dates):
+            by_month[day.strftime('%Y-%m')].append(day.isoformat())
+        for month_key, month_days in by_month.items():
+            existing = member_constraints.setdefault(month_key, {}).setdefault('days_off', [])
+            seen = set(existing)
+            fresh = [d for d in month_days if d not in seen]
+            existing.extend(fresh)
+            added_days += len(fresh)
+
+    for member, periods in ranges.items():
+        unavailable = constraints.setdefault(member, {}).setdefault('unavailable', [])
+        seen = {(rule.get('from'), rule.get('to'), rule.get('reason')) for rule in unavailable if 'weekday' not in rule}
+        for start, end, reason in periods:
+            key = (start.isoformat(), end.isoformat(), reason)
+            if key in seen:
+                continue
+            rule = {'from': key[0], 'to': key[1]}
+            if reason:
+                rule['reason'] = reason
+            unavailable.append(rule)
+            added_ranges += 1
+
+    return LeaveImportResult(rows, added_days, added_ranges, new_members, errors, error_count)
+
+
+def main():
+    import yaml
+
+    parser = argparse.ArgumentParser(description="Merge a CSV/XLSX leave file into a configuration")
+    parser.add_argument('leave_file')
+    parser.add_argument('--config', required=True, help="Configuration YAML (export_config format)")
+    parser.add_argument('-o', '--output', help="Output YAML file (default: overwrite --config)")
+    parser.add_argument('--add-members', action='store_true', help="Add unknown members to the team")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f) or {}
+    doctors = config.setdefault('team_members', [])
+    constraints = config.get('constraints') or {}
+    config['constraints'] = constraints
+
+    result = import_leave(args.leave_file, args.leave_file, doctors, constraints, add_members=args.add_members)
+    for row_number, message in result.errors:
+        print(f"row {row_number}: {message}")
+    print(f"{result.rows} rows: {result.days_off} days off and {result.ranges} ranges added, "
+          f"{len(result.new_members)} new members, {result.error_count} errors")
+
+    with open(args.output or args.config, 'w') as f:
+        yaml.dump(config, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+
+if __name__ == '__main__':
+    main()
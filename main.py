@@ -1,448 +1,1271 @@
 import streamlit as st
 import pandas as pd
 import calendar
+import hashlib
+import json
+import os
 import time
 from datetime import datetime
+from urllib.parse import quote
 
 # Import all utility functions
 from scheduling_utils import (
     DEFAULT_DOCTORS, DEFAULT_SHIFTS, init_session, generate_colors,
     get_shifts_for_day, get_doctor_constraints, is_available,
     get_fixed_shift, generate_schedule, export_config, import_config,
-    create_excel_export, create_ics_export
+    schedule_hours, improve_schedule,
+    check_feasibility, feasibility_messages, describe_unavailability, normalize_unavailability,
+    get_fairness, fairness_loads, FAIRNESS_DIMENSIONS, ORDINALS, WEEKDAY_NAMES,
+    get_rest_rules, member_timelines, rest_conflicts, shift_mask, reassign_shifts, swap_shifts,
+    redistribute_shifts, shift_config_hash
 )
+from export_jobs import ExportJob, ExportManager
+from edit_history import BulkEdit, EditLog
+from ics_server import FeedStore, serve_feeds
+from leave_import import import_leave
+from member_views import MemberViews
+from metrics import ACTIVE_SESSIONS, SessionTracker, serve_metrics, write_metrics_every
+from schedule_archive import ScheduleArchive
+from schedule_pivots import (DIMENSIONS, SchedulePivots, coverage_heatmap, fairness_trend_chart, hours_over_time,
+                             member_week_heatmap)
+from schedule_store import ScheduleStore
+from schedule_validator import validate_changes, validate_schedule
+from simulation import simulate
+
+ARCHIVE_DIR = os.environ.get("TOOL_SCHED_ARCHIVE_DIR", "schedule_archive")
+FEED_TEAM = "team"
+FEED_HOST = os.environ.get("TOOL_SCHED_FEED_HOST", "127.0.0.1")
+FEED_PORT = int(os.environ.get("TOOL_SCHED_FEED_PORT", "8765"))
+METRICS_HOST = os.environ.get("TOOL_SCHED_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.environ.get("TOOL_SCHED_METRICS_PORT")
+METRICS_FILE = os.environ.get("TOOL_SCHED_METRICS_FILE")
+
+@st.cache_resource
+def get_feed_store():
+    """ICS feed store shared by all sessions in this process"""
+    return FeedStore()
+
+@st.cache_resource
+def get_feed_server():
+    """HTTP server for the feed store, started on the first publish (a failed bind is retried next time)"""
+    return serve_feeds(get_feed_store(), FEED_HOST, FEED_PORT)
+
+@st.cache_resource
+def get_session_tracker():
+    """Live-session counter behind the active sessions gauge; starts the metrics exporter if configured"""
+    tracker = SessionTracker()
+    ACTIVE_SESSIONS.set_function(lambda: len(tracker))
+    if METRICS_PORT:
+        serve_metrics(METRICS_HOST, int(METRICS_PORT))
+    if METRICS_FILE:
+        write_metrics_every(METRICS_FILE)
+    return tracker
+
+@st.cache_resource
+def get_schedule_store():
+    """Generated schedules shared by all sessions in this process"""
+    return ScheduleStore()
+
+@st.cache_resource
+def get_export_manager():
+    """Export worker pool shared by all sessions in this process"""
+    return ExportManager(max_workers=4)
+
+def render_export_buttons(csv, csv_filename, polling):
+    """Show CSV download plus progress or download buttons for the background Excel/ICS exports"""
+    handles = st.session_state.export_handles
+    labels = {'excel': "📊 Excel", 'ics': "📅 Calendar"}
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.download_button("📄 CSV", csv, csv_filename, "text/csv", key="export_csv")
+
+    for col, fmt in ((col2, 'excel'), (col3, 'ics')):
+        handle = handles[fmt]
+        with col:
+            if not handle.done():
+                st.progress(handle.progress, text=f"Preparing {labels[fmt]}...")
+            elif handle.error:
+                st.error(f"Export failed: {handle.error}")
+            else:
+                st.download_button(labels[fmt], handle.result(), handle.job.filename, handle.job.mime, key=f"export_{fmt}")
+
+    # A polling fragment reruns the app once everything has finished so the timer stops
+    if polling and all(handle.done() for handle in handles.values()):
+        st.rerun()
+
+def set_schedule(schedule_df):
+    """Make a new schedule current: shared per process, with an empty edit overlay"""
+    open_schedule(get_schedule_store().share(schedule_df))
+
+def open_schedule(shared):
+    """Show a SharedSchedule in this session, with an empty edit overlay"""
+    st.session_state.schedule = shared
+    st.session_state.edit_log = EditLog.from_schedule(shared.frame)
+    refresh_schedule_view()
+
+def refresh_schedule_view():
+    """Rebuild schedule_df from the shared schedule and this session's edits"""
+    st.session_state.schedule_df = st.session_state.edit_log.apply(st.session_state.schedule.frame)
+    mark_schedule_changed()
+
+def reset_reassign_dropdowns(slots):
+    """Forget the Edit Mode dropdown state of slots so they show their current member"""
+    prefixes = tuple(f"reassign_{slot}_" for slot in slots)
+    for key in [k for k in st.session_state.keys() if k.startswith(prefixes)]:
+        del st.session_state[key]
+
+def apply_history_step(edit):
+    """Show the schedule after undo/redo and reset the reassignment dropdowns of the edit's slots"""
+    refresh_schedule_view()
+    reset_reassign_dropdowns([slot for slot, _, _ in edit.changes])
+
+# Derived views are memoized with st.cache_data, keyed on the schedule version
+# (a content key of the shared schedule plus this session's edits, so sessions
+# showing the same schedule share entries) and the config version (a content
+# hash of the team, colors, shifts and constraints). Underscored arguments are
+# the data itself and are not hashed.
+
+def mark_schedule_changed():
+    """Recompute the schedule version: the shared schedule's key, plus a hash of this session's edits if any"""
+    key = st.session_state.schedule.key
+    overrides = st.session_state.edit_log.overrides_at(st.session_state.edit_log.version)
+    if overrides:
+        edits = json.dumps(sorted(overrides.items()), default=str)
+        key += ':' + hashlib.sha1(edits.encode('utf-8')).hexdigest()
+    st.session_state.schedule_version = key
+
+def schedule_version():
+    """Content key of the current schedule"""
+    if 'schedule' not in st.session_state:
+        set_schedule(st.session_state.schedule_df)
+    elif 'schedule_version' not in st.session_state:
+        mark_schedule_changed()
+    return st.session_state.schedule_version
+
+def config_version():
+    """Content hash of the team, colors, shift config, constraints, fairness settings and rest rules"""
+    state = [st.session_state.doctors, st.session_state.doctor_colors,
+             st.session_state.shift_config, st.session_state.constraints, st.session_state.fairness,
+             st.session_state.rest_rules]
+    return hashlib.sha1(json.dumps(state, default=str).encode('utf-8')).hexdigest()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def config_yaml(config_key):
+    """export_config() for a config version"""
+    return export_config()
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def feasibility_report(config_key, year, month, _doctors, _shift_config, _constraints):
+    """check_feasibility() for a config version and month"""
+    return check_feasibility(year, month, _doctors, _shift_config, _constraints)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def calendar_html(schedule_key, config_key, year, month, _df, _colors):
+    """Calendar table and legend HTML for a schedule"""
+    html = "<table style='width: 100%; border-collapse: collapse;'>"
+    html += "<tr>" + "".join(f"<th style='border: 1px solid #ddd; padding: 8px; background: #f2f2f2; color: black;'>{day[:3]}</th>" for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']) + "</tr>"
+
+    rows_by_date = dict(list(_df.groupby('Date', sort=False)))
+    for week in calendar.monthcalendar(year, month):
+        html += "<tr style='height: 120px;'>"
+        for day in week:
+            if day == 0:
+                html += "<td style='border: 1px solid #ddd; background: #f9f9f9;'></td>"
+            else:
+                day_shifts = rows_by_date.get(f"{year}-{month:02d}-{day:02d}", _df.iloc[:0])
+
+                cell = f"<div style='font-weight: bold; margin-bottom: 5px;'>{day}</div>"
+                for shift_name, seats in day_shifts.groupby('Shift', sort=False)['Doctor']:
+                    if len(seats) > 1:
+                        # Multi-seat shift: one label followed by a chip per member
+                        cell += f"<div style='font-size: 10px; text-align: center; margin-top: 2px;'><b>{shift_name}</b> ({len(seats)})</div>"
+                    for doctor in seats:
+                        color = _colors.get(doctor, '#CCCCCC') if _colors else '#CCCCCC'
+                        cell += f"<div style='background: {color}; color: white; padding: 2px; margin: 1px; border-radius: 3px; font-size: 10px; text-align: center;'>"
+                        if len(seats) > 1:
+                            cell += f"{doctor.replace('Dr. ', '')}</div>"
+                        else:
+                            cell += f"<b>{shift_name}</b><br>{doctor.replace('Dr. ', '')}</div>"
+
+                html += f"<td style='border: 1px solid #ddd; padding: 4px; vertical-align: top;'>{cell}</td>"
+        html += "</tr>"
+    html += "</table>"
+
+    # One wrapping row of chips rather than a column per member
+    legend = ""
+    if _colors:
+        legend = "<div style='display: flex; flex-wrap: wrap; gap: 4px;'>" + "".join(
+            f'<div style="background: {color}; color: white; padding: 5px 10px; text-align: center; border-radius: 5px;">{doctor}</div>'
+            for doctor, color in _colors.items()
+        ) + "</div>"
+    return html, legend
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def filtered_schedule(schedule_key, doctors, shifts, _df):
+    """Rows of the schedule for the selected members and shifts, plus their CSV"""
+    filtered = _df[_df['Doctor'].isin(doctors) & _df['Shift'].isin(shifts)]
+    return filtered, filtered.to_csv(index=False)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def workload(schedule_key, config_key, _df, _shift_config):
+    """Shift counts and configured hours per member"""
+    return _df['Doctor'].value_counts(), schedule_hours(_df, _shift_config)
+
+def describe_target(target):
+    """Workload target as percentages, e.g. 50% or nights 0%, weekends 50%"""
+    if target is None:
+        return ""
+    if isinstance(target, dict):
+        return ", ".join(f"{dimension} {float(ratio):.0%}" for dimension, ratio in target.items())
+    return f"{float(target):.0%}"
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def fairness_breakdown(schedule_key, config_key, _df, _doctors, _shift_config, _fairness):
+    """Shifts, hours, nights, weekends and holidays per member"""
+    return fairness_loads(_df, _doctors, _shift_config, _fairness)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def schedule_violations(schedule_key, config_key, _df, _doctors, _shift_config, _constraints, _rest_rules):
+    """validate_schedule() for a schedule and config version"""
+    return validate_schedule(_df, _doctors, _shift_config, _constraints, _rest_rules)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def member_views(view_key, shift_key, _df, _shift_config):
+    """Per-member views of a schedule, built once and shared by every session showing it"""
+    return MemberViews(_df, _shift_config)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def member_calendar_html(view_key, shift_key, member, year, month, color, _views):
+    """Small month calendar with a member's shifts"""
+    html = "<table style='border-collapse: collapse;'><tr>" + "".join(
+        f"<th style='padding: 4px; font-size: 12px;'>{day[:2]}</th>" for day in WEEKDAY_NAMES) + "</tr>"
+    for week in _views.calendar(member, year, month):
+        html += "<tr>"
+        for day, shifts in week:
+            if day == 0:
+                html += "<td></td>"
+            elif shifts:
+                html += (f"<td style='background: {color}; color: white; border-radius: 4px; padding: 4px; "
+                         f"text-align: center; font-size: 11px;'><b>{day}</b><br>{'<br>'.join(shifts)}</td>")
+            else:
+                html += f"<td style='padding: 4px; text-align: center; font-size: 11px; color: #888;'>{day}</td>"
+        html += "</tr>"
+    return html + "</table>"
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def shared_pivots(schedule_key, config_key, _df, _doctors, _shift_config, _fairness):
+    """Dashboard pivots for a shared schedule, built once and used by every session showing it"""
+    return SchedulePivots.from_frame(_df, _doctors, _shift_config, _fairness)
+
+def schedule_pivots():
+    """Dashboard pivots for this session's schedule, kept in step with its edits"""
+    if 'schedule' not in st.session_state:
+        set_schedule(st.session_state.schedule_df)
+    shared = shared_pivots(st.session_state.schedule.key, config_version(), st.session_state.schedule.frame,
+                           st.session_state.doctors, st.session_state.shift_config, st.session_state.fairness)
+    overrides = st.session_state.edit_log.overrides_at(st.session_state.edit_log.version)
+    if not overrides:
+        return shared
+
+    # Edits move load between members in a private copy instead of re-pivoting
+    source, pivots = st.session_state.get('pivots', (None, None))
+    if source is not shared:
+        pivots = shared.copy()
+        st.session_state.pivots = (shared, pivots)
+    pivots.sync(overrides)
+    return pivots
+
+def archive_signature():
+    """Archived months with their modification times, so rewritten months invalidate cached pivots"""
+    archive = ScheduleArchive(ARCHIVE_DIR)
+    return tuple((month, os.path.getmtime(os.path.join(ARCHIVE_DIR, month))) for month in archive.months())
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def archive_pivots(signature, start_month, end_month, config_key, _doctors, _fairness):
+    """Dashboard pivots over a range of archived months"""
+    return SchedulePivots.from_archive(ScheduleArchive(ARCHIVE_DIR), start_month, end_month, _doctors, _fairness)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def schedule_timelines(schedule_key, config_key, _df, _shift_config):
+    """Per-member timelines for rest rule checks in Edit Mode"""
+    return member_timelines(_df, _shift_config)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def constraints_summary(config_key, _constraints):
+    """One row per member describing their constraints"""
+    rows = []
+    for doctor, doctor_constraints in _constraints.items():
+        fixed_shifts = doctor_constraints.get('fixed_shifts') or {}
+        rotation = doctor_constraints.get('rotation') or {}
+        rotation_text = ""
+        if rotation:
+            pattern = ", ".join("off" if entry is False else (entry or "—") for entry in rotation.get('pattern', []))
+            group = f" ({rotation['group']})" if rotation.get('group') else ""
+            rotation_text = f"{len(rotation.get('pattern', []))}-day cycle{group} from {rotation.get('anchor')}: {pattern}"
+        days_off = []
+        for month_key, month_data in doctor_constraints.items():
+            if month_key.count('-') == 1 and isinstance(month_data, dict):  # YYYY-MM format
+                days_off.extend(month_data.get('days_off', []))
+        rows.append({
+            'Team member': doctor,
+            'Fixed weekly schedule': ", ".join(f"{day}: {shift}" for day, shift in fixed_shifts.items()),
+            'Rotation': rotation_text,
+            'Days off': ", ".join(days_off),
+            'Unavailable': "; ".join(describe_unavailability(rule) for rule in doctor_constraints.get('unavailable') or []),
+            'Target': describe_target(doctor_constraints.get('target')),
+            'Notes': doctor_constraints.get('notes', ''),
+        })
+    return pd.DataFrame(rows)
+
+@st.fragment
+def render_sidebar():
+    """Team, configuration and generation controls"""
+    st.header("Team Members")
+
+    # Load defaults
+    if st.button("Load Default Team", key="load_defaults"):
+        st.session_state.doctors = DEFAULT_DOCTORS.copy()
+        st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
+        st.success("Default team loaded!")
+        st.rerun()
+
+    # Add member
+    new_member = st.text_input("Add team member:", placeholder="e.g., Dr. Johnson", key="new_member")
+    if st.button("Add Member", key="add_member") and new_member.strip():
+        if new_member.strip() not in st.session_state.doctors:
+            st.session_state.doctors.append(new_member.strip())
+            st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
+            st.success(f"Added {new_member.strip()}")
+            st.rerun()
+        else:
+            st.warning("Already exists!")
+
+    # Display members
+    if st.session_state.doctors:
+        st.write("**Current Team:**")
+        for i, doctor in enumerate(st.session_state.doctors):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                color = st.session_state.doctor_colors.get(doctor, "#CCCCCC") if st.session_state.doctor_colors else "#CCCCCC"
+                st.markdown(f'<div style="background-color: {color}; color: white; padding: 3px; border-radius: 3px; text-align: center; margin: 2px;">{doctor}</div>', unsafe_allow_html=True)
+            with col2:
+                if st.button("❌", key=f"remove_{i}"):
+                    st.session_state.doctors.remove(doctor)
+                    if st.session_state.doctors:
+                        st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
+                    st.rerun()
 
-def main():
-    st.set_page_config(page_title="Tool Sched", page_icon="🛠️", layout="wide")
-    st.title("🛠️ Tool Sched")
-    st.write("Collaborative scheduling system for any team")
-
-    init_session()
-
-    # Sidebar
-    with st.sidebar:
-        st.header("Team Members")
-
-        # Load defaults
-        if st.button("Load Default Team", key="load_defaults"):
-            st.session_state.doctors = DEFAULT_DOCTORS.copy()
+        if st.button("🎨 New Colors", key="regen_colors"):
             st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
-            st.success("Default team loaded!")
             st.rerun()
 
-        # Add member
-        new_member = st.text_input("Add team member:", placeholder="e.g., Dr. Johnson", key="new_member")
-        if st.button("Add Member", key="add_member") and new_member.strip():
-            if new_member.strip() not in st.session_state.doctors:
-                st.session_state.doctors.append(new_member.strip())
-                st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
-                st.success(f"Added {new_member.strip()}")
-                st.rerun()
+    st.divider()
+
+    # Import/Export
+    st.header("Configuration")
+
+    # Export
+    if st.session_state.doctors or st.session_state.constraints:
+        config_export = config_yaml(config_version())
+        st.download_button(
+            "📥 Export Config",
+            config_export,
+            f"tool_sched_config_{datetime.now().strftime('%Y%m%d')}.yaml",
+            "text/yaml",
+            key="export_config"
+        )
+
+    # Import
+    uploaded = st.file_uploader("📤 Import Config", type=['yaml', 'yml'], key="import_config")
+    if uploaded is not None:
+        try:
+            content = uploaded.read().decode('utf-8')
+            success, msg = import_config(content)
+
+            if success:
+                st.success(msg)
+                # Clear the file uploader by forcing a rerun after successful import
+                if st.session_state.get('import_success') != uploaded.file_id:
+                    st.session_state.import_success = uploaded.file_id
+                    time.sleep(0.5)
+                    st.rerun()
             else:
-                st.warning("Already exists!")
+                st.error(msg)
+        except Exception as e:
+            st.error(f"Error reading file: {str(e)}")
 
-        # Display members
-        if st.session_state.doctors:
-            st.write("**Current Team:**")
-            for i, doctor in enumerate(st.session_state.doctors):
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    color = st.session_state.doctor_colors.get(doctor, "#CCCCCC") if st.session_state.doctor_colors else "#CCCCCC"
-                    st.markdown(f'<div style="background-color: {color}; color: white; padding: 3px; border-radius: 3px; text-align: center; margin: 2px;">{doctor}</div>', unsafe_allow_html=True)
-                with col2:
-                    if st.button("❌", key=f"remove_{i}"):
-                        st.session_state.doctors.remove(doctor)
-                        if st.session_state.doctors:
-                            st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
-                        st.rerun()
+    # Clear import success flag if no file is uploaded
+    if uploaded is None and 'import_success' in st.session_state:
+        del st.session_state.import_success
 
-            if st.button("🎨 New Colors", key="regen_colors"):
-                st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
-                st.rerun()
+    st.divider()
 
-        st.divider()
+    # Schedule generation
+    st.header("Generate Schedule")
 
-        # Import/Export
-        st.header("Configuration")
+    current_date = datetime.now()
+    sched_month = st.selectbox("Month:", range(1, 13), index=current_date.month-1, format_func=lambda x: calendar.month_name[x], key="sched_month")
+    sched_year = st.number_input("Year:", min_value=2024, max_value=2030, value=current_date.year, key="sched_year")
 
-        # Export
-        if st.session_state.doctors or st.session_state.constraints:
-            config_yaml = export_config()
-            st.download_button(
-                "📥 Export Config",
-                config_yaml,
-                f"tool_sched_config_{datetime.now().strftime('%Y%m%d')}.yaml",
-                "text/yaml",
-                key="export_config"
-            )
+    can_generate = len(st.session_state.doctors) >= 2
 
-        # Import
-        uploaded = st.file_uploader("📤 Import Config", type=['yaml', 'yml'], key="import_config")
-        if uploaded is not None:
-            try:
-                content = uploaded.read().decode('utf-8')
-                success, msg = import_config(content)
-
-                if success:
-                    st.success(msg)
-                    # Clear the file uploader by forcing a rerun after successful import
-                    if st.session_state.get('import_success') != uploaded.file_id:
-                        st.session_state.import_success = uploaded.file_id
-                        time.sleep(0.5)
-                        st.rerun()
-                else:
-                    st.error(msg)
-            except Exception as e:
-                st.error(f"Error reading file: {str(e)}")
+    if not can_generate:
+        st.warning("Need at least 2 team members")
+    else:
+        # Pre-flight feasibility check for the selected month, cached per config version
+        feasibility = feasibility_report(config_version(), sched_year, sched_month, st.session_state.doctors,
+                                         st.session_state.shift_config, st.session_state.constraints)
+        if not feasibility['feasible'] or feasibility['unknown_fixed_shifts']:
+            messages = feasibility_messages(feasibility)
+            st.warning(f"⚠️ {len(messages)} constraint issue(s) for {calendar.month_name[sched_month]}")
+            with st.expander("Show issues"):
+                for message in messages:
+                    st.write(f"• {message}")
+
+    optimize = st.checkbox("✨ Optimize balance after generating", value=True, key="optimize_schedule",
+                           help="Runs a short local search that evens out workloads and removes same-day double-bookings")
+
+    if st.button("🗓️ Generate", disabled=not can_generate, key="generate"):
+        schedule_df = generate_schedule(sched_year, sched_month, st.session_state.doctors)
+        if optimize:
+            schedule_df = improve_schedule(schedule_df, sched_year, sched_month, st.session_state.doctors)
+        set_schedule(schedule_df)
+        st.session_state.schedule_generated = True
+        st.success("Schedule generated!")
+        st.rerun()
+
+    # Open the published team schedule without copying it into this session
+    published = get_schedule_store().published(FEED_TEAM)
+    if published is not None and published is not st.session_state.get('schedule'):
+        if st.button("📂 Open Team Schedule", key="open_team_schedule",
+                     help="Load the schedule last published to the calendar feeds"):
+            open_schedule(published)
+            st.session_state.schedule_generated = True
+            st.rerun()
 
-        # Clear import success flag if no file is uploaded
-        if uploaded is None and 'import_success' in st.session_state:
-            del st.session_state.import_success
+def render_member_view(member, year, month):
+    """One member's month: totals, next shifts, a mini calendar and every shift"""
+    views = member_views(schedule_version(), shift_config_hash(st.session_state.shift_config),
+                         st.session_state.schedule_df, st.session_state.shift_config)
+    if member not in views:
+        st.info(f"{member} has no shifts in this schedule.")
+        return
+
+    month_key = f"{year}-{month:02d}"
+    monthly = views.monthly_hours(member)
+    this_month = monthly.loc[month_key] if month_key in monthly.index else None
+    shifts = views.shifts(member)
+    upcoming = views.upcoming(member, datetime.now())
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Shifts", int(this_month['Shifts']) if this_month is not None else 0)
+    col2.metric("Hours", f"{this_month['Hours'] if this_month is not None else 0:g}")
+    col3.metric("Most hours in 7 days", f"{shifts['Hours_7_Days'].max():g}")
+    if len(upcoming):
+        next_shift = upcoming.iloc[0]
+        col4.metric("Next shift", next_shift['Date'], help=f"{next_shift['Shift']}, {next_shift['Start_Time']}–{next_shift['End_Time']}")
+    else:
+        col4.metric("Next shift", "—")
+
+    col1, col2 = st.columns([2, 3])
+    with col1:
+        color = (st.session_state.doctor_colors or {}).get(member, '#4C78A8')
+        st.markdown(member_calendar_html(schedule_version(), shift_config_hash(st.session_state.shift_config),
+                                         member, year, month, color, views), unsafe_allow_html=True)
+    with col2:
+        st.write("**Upcoming shifts**")
+        if len(upcoming):
+            st.dataframe(upcoming, width='stretch', hide_index=True)
+        else:
+            st.caption("No upcoming shifts in this schedule.")
+        if len(monthly) > 1:
+            st.write("**Hours per month**")
+            st.dataframe(monthly, width='stretch')
+
+    with st.expander(f"📋 All shifts ({len(shifts)})"):
+        st.dataframe(shifts.rename(columns={'Hours_7_Days': 'Hours (7 days)'}), width='stretch', hide_index=True)
+
+@st.fragment
+def render_member_tab(year, month):
+    """Personal schedule for a chosen member, with a link to open it directly"""
+    st.subheader("My Schedule")
+    doctors = st.session_state.doctors
+    if not doctors:
+        return
+    member = st.selectbox("Team member:", doctors, key="my_member")
+    if st.button("🔗 Open as personal page", key="open_member_page",
+                 help="Adds ?member=... to the address so the page can be bookmarked or shared"):
+        st.query_params['member'] = member
+        st.rerun()
+    render_member_view(member, year, month)
+
+def render_member_page(member, year, month):
+    """Deep-linked personal page (?member=...) without the coordinator tabs"""
+    st.subheader(f"👤 {member}")
+    if st.button("⬅️ Full schedule", key="close_member_page"):
+        del st.query_params['member']
+        st.rerun()
+    render_member_view(member, year, month)
+
+@st.fragment
+def render_calendar_tab(year, month):
+    """Month calendar with a chip per assignment"""
+    # Calendar view
+    st.subheader("Calendar View")
+    st.write(f"### {calendar.month_name[month]} {year}")
+
+    html, legend = calendar_html(schedule_version(), config_version(), year, month,
+                                 st.session_state.schedule_df, st.session_state.doctor_colors)
+    st.markdown(html, unsafe_allow_html=True)
+
+    # Legend
+    if legend:
+        st.write("**Legend:**")
+        st.markdown(legend, unsafe_allow_html=True)
+
+def render_bulk_changes(year, month, violations):
+    """Reassign, swap or redistribute a member's shifts over a date range as a single edit"""
+    doctors = st.session_state.doctors
+    df = st.session_state.schedule_df
+    action = st.radio("Operation:", ["Reassign", "Swap", "Redistribute"], horizontal=True, key="bulk_action")
+    first, last = datetime(year, month, 1).date(), datetime(year, month, calendar.monthrange(year, month)[1]).date()
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        member = st.selectbox("Shifts of:", doctors, key="bulk_member")
+    with col2:
+        others = [d for d in doctors if d != member]
+        label = {"Reassign": "Give them to:", "Swap": "Swap with:"}.get(action, "Give them to:")
+        other = st.selectbox(label, others, key="bulk_other", disabled=action == "Redistribute",
+                             help="Redistribute picks the least-loaded eligible member for each shift")
+    with col3:
+        dates = st.date_input("Dates:", value=(first, last), min_value=first, max_value=last, key="bulk_dates")
+
+    if len(dates) != 2 or not others:
+        st.caption("Choose a start and an end date.")
+        return
+    start, end = dates
+    stuck = 0
+    if action == "Reassign":
+        changes = reassign_shifts(df, member, other, start, end)
+        description = f"{member} → {other}"
+    elif action == "Swap":
+        changes = swap_shifts(df, member, other, start, end)
+        description = f"{member} ⇄ {other}"
+    else:
+        changes = redistribute_shifts(df, member, doctors, start, end, st.session_state.shift_config,
+                                      st.session_state.constraints, st.session_state.fairness,
+                                      st.session_state.rest_rules)
+        description = f"{member} → team"
+        stuck = int(shift_mask(df, member, start, end).sum()) - len(changes)
+        if stuck:
+            st.warning(f"⚠️ Nobody else is eligible for {stuck} of {member}'s shifts; they stay with {member}")
+
+    if changes.empty:
+        if not stuck:
+            st.caption("No shifts in this range.")
+        return
+
+    added = validate_changes(df, changes, doctors, st.session_state.shift_config, st.session_state.constraints,
+                             st.session_state.rest_rules, before=violations)
+    st.caption(f"{len(changes)} shift(s) will change: "
+               + ", ".join(f"{count} to {name}" for name, count in changes.value_counts().items()))
+    if not added.empty:
+        st.warning(f"⚠️ This would add {len(added)} rule violation(s)")
+        st.dataframe(added.drop(columns='Row'), width='stretch', hide_index=True)
+
+    if st.button(f"✅ Apply {action}", key="bulk_apply"):
+        st.session_state.edit_log.record_many(
+            changes.index, df.loc[changes.index, 'Doctor'], changes,
+            author=st.session_state.get('editor_name') or None,
+            action=f"{action} {description}, {start:%Y-%m-%d} to {end:%Y-%m-%d}",
+        )
+        refresh_schedule_view()
+        reset_reassign_dropdowns(changes.index)
+        st.rerun()
+
+def history_row(version, edit, df):
+    """Edit History table row for an Edit or a BulkEdit"""
+    if isinstance(edit, BulkEdit):
+        dates = df.loc[list(edit.slots), 'Date']
+        date, shift = f"{dates.min()} – {dates.max()}", f"{len(edit.slots)} shifts"
+        old, new = ", ".join(sorted(set(edit.old))), ", ".join(sorted(set(edit.new)))
+        action = edit.action or ""
+    else:
+        date, shift = df.loc[edit.slot, 'Date'], df.loc[edit.slot, 'Shift']
+        old, new, action = edit.old, edit.new, ""
+    return {
+        'Version': version,
+        'Date': date,
+        'Shift': shift,
+        'From': old,
+        'To': new,
+        'Operation': action,
+        'Author': edit.author or '',
+        'Time': datetime.fromtimestamp(edit.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+@st.fragment
+def render_table_tab(year, month):
+    """Schedule table with editing, history and exports"""
+    # Table view with editing
+    st.subheader("Schedule Table")
+
+    # Edit mode toggle
+    edit_mode = st.checkbox("✏️ Edit Mode - Reassign shifts by changing dropdowns", key="edit_mode")
+
+    if edit_mode:
+        st.info("🔄 **Edit Mode Active** - Use the dropdowns in the 'Reassign To' column to change shift assignments. Changes save automatically.")
+
+    # Undo/redo over the edit log
+    if 'schedule' not in st.session_state:
+        set_schedule(st.session_state.schedule_df)
+    edit_log = st.session_state.edit_log
+
+    if edit_mode or edit_log.latest_version:
+        col1, col2, col3, col4 = st.columns([1, 1, 2, 4])
+        with col1:
+            if st.button("↩️ Undo", disabled=not edit_log.can_undo(), key="undo_edit"):
+                edit = edit_log.undo()
+                apply_history_step(edit)
+                st.rerun()
+        with col2:
+            if st.button("↪️ Redo", disabled=not edit_log.can_redo(), key="redo_edit"):
+                edit = edit_log.redo()
+                apply_history_step(edit)
+                st.rerun()
+        with col3:
+            st.caption(f"Version {edit_log.version} of {edit_log.latest_version}")
+        with col4:
+            if edit_mode:
+                st.text_input("Editing as:", key="editor_name", placeholder="Your name (for the edit history)")
+
+    # Whole-schedule check, redone whenever the schedule or the config changes
+    violations = schedule_violations(schedule_version(), config_version(), st.session_state.schedule_df,
+                                     st.session_state.doctors, st.session_state.shift_config,
+                                     st.session_state.constraints, st.session_state.rest_rules)
+    if not violations.empty:
+        counts = violations['Rule'].value_counts()
+        summary = ", ".join(f"{count} {rule.replace('_', ' ')}" for rule, count in counts.items())
+        st.warning(f"⚠️ {len(violations)} rule violation(s): {summary}")
+        with st.expander("🔍 Violations"):
+            st.dataframe(violations.drop(columns='Row'), width='stretch', hide_index=True)
+
+    # Bulk operations: one combined check and one edit log version however many shifts move
+    with st.expander("🔁 Bulk Changes"):
+        render_bulk_changes(year, month, violations)
+
+    # Filters
+    col1, col2 = st.columns(2)
+    with col1:
+        filter_doctors = st.multiselect("Filter by team member:", st.session_state.doctors, default=st.session_state.doctors, key="filter_doctors")
+    with col2:
+        filter_shifts = st.multiselect("Filter by shift:", st.session_state.schedule_df['Shift'].unique(), default=st.session_state.schedule_df['Shift'].unique(), key="filter_shifts")
+
+    # Filter data
+    filtered, csv = filtered_schedule(schedule_version(), filter_doctors, list(filter_shifts), st.session_state.schedule_df)
+
+    if edit_mode:
+        # Display editable table
+        st.write("**Click dropdowns to reassign shifts:**")
+
+        changes_made = False
+        seats_per_shift = st.session_state.schedule_df.groupby(['Date', 'Shift']).size()
+        for idx, row in filtered.iterrows():
+            col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 2])
 
-        st.divider()
+            with col1:
+                st.write(f"**{row['Date']}**")
+                st.write(f"{row['Day']}")
 
-        # Schedule generation
-        st.header("Generate Schedule")
+            with col2:
+                st.write(f"**{row['Shift']}**")
+                st.write(f"{row['Start_Time']} - {row['End_Time']}")
+                if seats_per_shift.get((row['Date'], row['Shift']), 1) > 1:
+                    st.caption(f"Seat {row['Seat']} of {seats_per_shift[(row['Date'], row['Shift'])]}")
 
-        current_date = datetime.now()
-        sched_month = st.selectbox("Month:", range(1, 13), index=current_date.month-1, format_func=lambda x: calendar.month_name[x], key="sched_month")
-        sched_year = st.number_input("Year:", min_value=2024, max_value=2030, value=current_date.year, key="sched_year")
+            with col3:
+                # Current assignment
+                current_color = st.session_state.doctor_colors.get(row['Doctor'], '#CCCCCC') if st.session_state.doctor_colors else '#CCCCCC'
+                st.markdown(f"<div style='background: {current_color}; color: white; padding: 8px; border-radius: 5px; text-align: center; margin: 2px;'>{row['Doctor']}</div>", unsafe_allow_html=True)
+
+            with col4:
+                st.write("**→**")
+
+            with col5:
+                # Dropdown for reassignment
+                current_doctor = row['Doctor']
+                new_doctor = st.selectbox(
+                    "Reassign to:",
+                    options=st.session_state.doctors,
+                    index=st.session_state.doctors.index(current_doctor) if current_doctor in st.session_state.doctors else 0,
+                    key=f"reassign_{idx}_{row['Date']}_{row['Shift']}"
+                )
 
-        can_generate = len(st.session_state.doctors) >= 2
+                # Check for conflicts
+                if new_doctor != current_doctor:
+                    # Check if new doctor already works this day
+                    same_day_shifts = st.session_state.schedule_df[
+                        (st.session_state.schedule_df['Date'] == row['Date']) &
+                        (st.session_state.schedule_df['Doctor'] == new_doctor)
+                    ]
 
-        if not can_generate:
-            st.warning("Need at least 2 team members")
+                    if len(same_day_shifts) > 0:
+                        st.warning(f"⚠️ {new_doctor} already works on {row['Date']}")
 
-        if st.button("🗓️ Generate", disabled=not can_generate, key="generate"):
-            st.session_state.schedule_df = generate_schedule(sched_year, sched_month, st.session_state.doctors)
-            st.session_state.schedule_generated = True
-            st.success("Schedule generated!")
-            st.rerun()
+                    # Same rest rules as generation: minimum rest, consecutive days, hours per 7 days
+                    timelines = schedule_timelines(schedule_version(), config_version(),
+                                                   st.session_state.schedule_df, st.session_state.shift_config)
+                    for message in rest_conflicts(st.session_state.schedule_df, idx, new_doctor,
+                                                  st.session_state.shift_config, timelines=timelines):
+                        st.warning(f"⚠️ {new_doctor}: {message}")
 
-    # Main content
-    if st.session_state.schedule_generated and not st.session_state.schedule_df.empty:
-        tab1, tab2, tab3, tab4 = st.tabs(["📅 Calendar", "📋 Table", "⚙️ Edit Constraints", "📊 Analytics"])
+                    # Record the edit in this session's overlay; the shared schedule is never modified
+                    edit_log.record(idx, current_doctor, new_doctor, author=st.session_state.get('editor_name') or None)
+                    changes_made = True
 
-        with tab1:
-            # Calendar view
-            st.subheader("Calendar View")
-            year = st.session_state.schedule_df.iloc[0]['Date'][:4]
-            month = int(st.session_state.schedule_df.iloc[0]['Date'][5:7])
+            st.divider()
 
-            cal = calendar.monthcalendar(int(year), month)
-            month_name = calendar.month_name[month]
+        if changes_made:
+            refresh_schedule_view()
+            st.success("✅ Schedule updated! Changes are automatically saved.")
+            time.sleep(0.5)  # Brief pause to show success message
+            st.rerun()
 
-            st.write(f"### {month_name} {year}")
+    else:
+        # Display regular table
+        st.dataframe(filtered, width='stretch', hide_index=True)
 
-            # HTML calendar
-            html = "<table style='width: 100%; border-collapse: collapse;'>"
-            html += "<tr>" + "".join(f"<th style='border: 1px solid #ddd; padding: 8px; background: #f2f2f2; color: black;'>{day[:3]}</th>" for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']) + "</tr>"
+    # Edit history and version diff
+    if edit_log.latest_version:
+        with st.expander(f"🕘 Edit History ({edit_log.latest_version} edits)"):
+            history = pd.DataFrame([history_row(version, edit, st.session_state.schedule_df)
+                                    for version, edit in enumerate(edit_log.edits, start=1)])
+            st.dataframe(history, width='stretch', hide_index=True)
 
-            for week in cal:
-                html += "<tr style='height: 120px;'>"
-                for day in week:
-                    if day == 0:
-                        html += "<td style='border: 1px solid #ddd; background: #f9f9f9;'></td>"
-                    else:
-                        date_str = f"{year}-{month:02d}-{day:02d}"
-                        day_shifts = st.session_state.schedule_df[st.session_state.schedule_df['Date'] == date_str]
+            versions = list(range(edit_log.latest_version + 1))
+            col1, col2 = st.columns(2)
+            with col1:
+                from_version = st.selectbox("Compare version:", versions, index=0, format_func=lambda v: "Generated" if v == 0 else f"Version {v}", key="diff_from")
+            with col2:
+                to_version = st.selectbox("With version:", versions, index=edit_log.version, format_func=lambda v: "Generated" if v == 0 else f"Version {v}", key="diff_to")
+
+            changes = edit_log.diff(from_version, to_version)
+            if changes:
+                diff_df = st.session_state.schedule_df.loc[list(changes), ['Date', 'Shift']].assign(
+                    Before=[old for old, _ in changes.values()],
+                    After=[new for _, new in changes.values()],
+                ).sort_values(['Date', 'Shift'])
+                st.dataframe(diff_df, width='stretch', hide_index=True)
+            else:
+                st.write("No differences between these versions.")
+
+    # Export options
+    st.subheader("Export Options")
+    # Excel and ICS are built in the background so the page stays responsive
+    # Exports are named and built for the selected month, so a new month means new exports too
+    signature = (schedule_version(), year, month)
+    if st.session_state.get('export_signature') != signature:
+        manager = get_export_manager()
+        # schedule_df is never modified in place (edits rebuild it), so workers can read it without a copy
+        st.session_state.export_handles = {
+            'excel': manager.submit(st.session_state.schedule_df, ExportJob('excel', year, month)),
+            'ics': manager.submit(st.session_state.schedule_df, ExportJob('ics', year, month)),
+        }
+        st.session_state.export_signature = signature
+
+    pending = any(not handle.done() for handle in st.session_state.export_handles.values())
+    st.fragment(render_export_buttons, run_every=1.0 if pending else None)(csv, f"schedule_{year}_{month:02d}.csv", pending)
+
+    # Columnar archive for long-range analytics
+    with st.expander("🗄️ Archive"):
+        st.write(f"Store this month in the columnar schedule archive at `{ARCHIVE_DIR}` for multi-year reporting.")
+        if st.button("🗄️ Archive Schedule", key="archive_schedule"):
+            months = ScheduleArchive(ARCHIVE_DIR).write(st.session_state.schedule_df, st.session_state.shift_config)
+            st.success(f"Archived {', '.join(months)}")
+
+    # Live calendar subscriptions served from this process
+    with st.expander("📡 Calendar Subscriptions"):
+        st.write("Publish the schedule to the local feed server so calendar apps can subscribe and stay up to date.")
+        if st.button("📡 Publish Feeds", key="publish_feeds"):
+            try:
+                get_feed_server()
+            except OSError as e:
+                st.warning(f"⚠️ Couldn't start the feed server on {FEED_HOST}:{FEED_PORT}: {e}")
+            else:
+                changed = get_feed_store().update(FEED_TEAM, st.session_state.schedule_df)
+                get_schedule_store().publish(FEED_TEAM, get_schedule_store().share(st.session_state.schedule_df))
+                st.success(f"Feeds published ({len(changed)} member calendars changed)")
+        if FEED_TEAM in get_feed_store().teams():
+            base_url = f"http://{FEED_HOST}:{FEED_PORT}/teams/{quote(FEED_TEAM)}"
+            st.code(f"{base_url}.ics", language=None)
+            for doctor in st.session_state.doctors:
+                st.code(f"{base_url}/members/{quote(doctor)}.ics", language=None)
+
+@st.fragment
+def render_constraints_tab():
+    """Per-member constraints and the YAML editor"""
+    # Constraints configuration
+    st.subheader("Scheduling Constraints")
+
+    if not st.session_state.doctors:
+        st.info("Add team members first")
+    else:
+        # Month/year for constraints (for days off only)
+        col1, col2 = st.columns(2)
+        with col1:
+            const_month = st.selectbox("Month:", range(1, 13), index=datetime.now().month-1, format_func=lambda x: calendar.month_name[x], key="const_month")
+        with col2:
+            const_year = st.number_input("Year:", min_value=2024, max_value=2030, value=datetime.now().year, key="const_year")
 
-                        cell = f"<div style='font-weight: bold; margin-bottom: 5px;'>{day}</div>"
-                        for _, shift in day_shifts.iterrows():
-                            color = st.session_state.doctor_colors.get(shift['Doctor'], '#CCCCCC') if st.session_state.doctor_colors else '#CCCCCC'
-                            cell += f"<div style='background: {color}; color: white; padding: 2px; margin: 1px; border-radius: 3px; font-size: 10px; text-align: center;'>"
-                            cell += f"<b>{shift['Shift']}</b><br>{shift['Doctor'].replace('Dr. ', '')}</div>"
+        # Select doctor
+        selected_doctor = st.selectbox("Team member:", st.session_state.doctors, key="const_doctor")
 
-                        html += f"<td style='border: 1px solid #ddd; padding: 4px; vertical-align: top;'>{cell}</td>"
-                html += "</tr>"
+        if selected_doctor:
+            # Get doctor's constraints
+            doctor_constraints = st.session_state.constraints.get(selected_doctor, {})
+            month_key = f"{const_year}-{const_month:02d}"
+            month_constraints = doctor_constraints.get(month_key, {})
 
-            html += "</table>"
-            st.markdown(html, unsafe_allow_html=True)
+            # Days off (month-specific)
+            days_in_month = calendar.monthrange(const_year, const_month)[1]
+            all_dates = [f"{const_year}-{const_month:02d}-{d:02d}" for d in range(1, days_in_month + 1)]
+            days_off = st.multiselect("Days off:", all_dates, default=month_constraints.get('days_off', []), key="days_off")
 
-            # Legend
-            if st.session_state.doctor_colors:
-                st.write("**Legend:**")
-                cols = st.columns(len(st.session_state.doctors))
-                for i, (doctor, color) in enumerate(st.session_state.doctor_colors.items()):
-                    with cols[i]:
-                        st.markdown(f'<div style="background: {color}; color: white; padding: 5px; text-align: center; border-radius: 5px;">{doctor}</div>', unsafe_allow_html=True)
+            # Fixed shifts (day of week based)
+            st.write("**Fixed Weekly Schedule:**")
+            st.write("*Recurring shifts by day of the week (portable across months)*")
 
-        with tab2:
-            # Table view with editing
-            st.subheader("Schedule Table")
+            current_fixed = doctor_constraints.get('fixed_shifts', {})
+            fixed_shifts = {}
 
-            # Edit mode toggle
-            edit_mode = st.checkbox("✏️ Edit Mode - Reassign shifts by changing dropdowns", key="edit_mode")
+            days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
 
-            if edit_mode:
-                st.info("🔄 **Edit Mode Active** - Use the dropdowns in the 'Reassign To' column to change shift assignments. Changes save automatically.")
+            for day in days:
+                # Get available shifts for this day (from shift config)
+                day_shifts = st.session_state.shift_config.get(day, {})
+                shift_options = ['None'] + list(day_shifts.keys())
+
+                current_value = current_fixed.get(day, 'None')
+                if current_value and current_value not in shift_options:
+                    shift_options.append(current_value)
+
+                selected_shift = st.selectbox(
+                    f"{day}:",
+                    options=shift_options,
+                    index=shift_options.index(current_value) if current_value in shift_options else 0,
+                    key=f"fixed_{day}"
+                )
 
-            # Filters
+                if selected_shift != 'None':
+                    fixed_shifts[day] = selected_shift
+
+            # Rotation (repeating cycle from an anchor date, overrides the weekly schedule)
+            st.write("**Rotation:**")
+            st.write("*Repeating cycle from a start date, e.g. `7p-7a, 7p-7a, 7p-7a, 7p-7a, off, off, off, off`. Leave an entry empty to let the scheduler decide that day.*")
+
+            current_rotation = doctor_constraints.get('rotation') or {}
+            current_pattern = ", ".join("off" if entry is False else (entry or "") for entry in current_rotation.get('pattern', []))
+            rotation_text = st.text_input("Pattern:", value=current_pattern, key="rotation_pattern")
+            current_anchor = current_rotation.get('anchor') or datetime(const_year, const_month, 1)
+            if isinstance(current_anchor, str):
+                current_anchor = datetime.strptime(current_anchor, "%Y-%m-%d")
+            rotation_anchor = st.date_input("Starting:", value=current_anchor, key="rotation_anchor")
+
+            # Workload target relative to a full-time member
+            st.write("**Workload Target:**")
+            current_target = doctor_constraints.get('target')
+            if isinstance(current_target, dict):
+                target_ratios = {dimension: float(current_target.get(dimension, 1.0)) for dimension in FAIRNESS_DIMENSIONS}
+            else:
+                target_ratios = dict.fromkeys(FAIRNESS_DIMENSIONS, 1.0 if current_target is None else float(current_target))
             col1, col2 = st.columns(2)
             with col1:
-                filter_doctors = st.multiselect("Filter by team member:", st.session_state.doctors, default=st.session_state.doctors, key="filter_doctors")
+                target_percent = st.number_input("Share of a full workload (%):", min_value=0, max_value=200,
+                                                 value=int(round(target_ratios['shifts'] * 100)), step=10,
+                                                 key="target_percent", help="50 for a half-time member")
             with col2:
-                filter_shifts = st.multiselect("Filter by shift:", st.session_state.schedule_df['Shift'].unique(), default=st.session_state.schedule_df['Shift'].unique(), key="filter_shifts")
-
-            # Filter data
-            filtered = st.session_state.schedule_df[
-                (st.session_state.schedule_df['Doctor'].isin(filter_doctors)) &
-                (st.session_state.schedule_df['Shift'].isin(filter_shifts))
-            ].copy()
-
-            if edit_mode:
-                # Display editable table
-                st.write("**Click dropdowns to reassign shifts:**")
-
-                changes_made = False
-                for idx, row in filtered.iterrows():
-                    col1, col2, col3, col4, col5 = st.columns([2, 2, 2, 2, 2])
-
-                    with col1:
-                        st.write(f"**{row['Date']}**")
-                        st.write(f"{row['Day']}")
-
-                    with col2:
-                        st.write(f"**{row['Shift']}**")
-                        st.write(f"{row['Start_Time']} - {row['End_Time']}")
-
-                    with col3:
-                        # Current assignment
-                        current_color = st.session_state.doctor_colors.get(row['Doctor'], '#CCCCCC') if st.session_state.doctor_colors else '#CCCCCC'
-                        st.markdown(f"<div style='background: {current_color}; color: white; padding: 8px; border-radius: 5px; text-align: center; margin: 2px;'>{row['Doctor']}</div>", unsafe_allow_html=True)
-
-                    with col4:
-                        st.write("**→**")
-
-                    with col5:
-                        # Dropdown for reassignment
-                        current_doctor = row['Doctor']
-                        new_doctor = st.selectbox(
-                            "Reassign to:",
-                            options=st.session_state.doctors,
-                            index=st.session_state.doctors.index(current_doctor) if current_doctor in st.session_state.doctors else 0,
-                            key=f"reassign_{idx}_{row['Date']}_{row['Shift']}"
-                        )
-
-                        # Check for conflicts
-                        if new_doctor != current_doctor:
-                            # Check if new doctor already works this day
-                            same_day_shifts = st.session_state.schedule_df[
-                                (st.session_state.schedule_df['Date'] == row['Date']) &
-                                (st.session_state.schedule_df['Doctor'] == new_doctor)
-                            ]
-
-                            if len(same_day_shifts) > 0:
-                                st.warning(f"⚠️ {new_doctor} already works on {row['Date']}")
-
-                            # Update the schedule
-                            st.session_state.schedule_df.loc[idx, 'Doctor'] = new_doctor
-                            changes_made = True
-
-                    st.divider()
-
-                if changes_made:
-                    st.success("✅ Schedule updated! Changes are automatically saved.")
-                    time.sleep(0.5)  # Brief pause to show success message
+                no_nights = st.checkbox("No night shifts unless needed", value=target_ratios['nights'] == 0,
+                                        key="target_no_nights")
+
+            # Unavailable periods (ranges and recurring rules, portable across months)
+            st.write("**Unavailable Periods:**")
+            st.write("*Vacations and recurring unavailability, e.g. every other Tuesday or the first weekend of each month.*")
+
+            unavailable = doctor_constraints.get('unavailable') or []
+            for i, rule in enumerate(unavailable):
+                rule_col, remove_col = st.columns([5, 1])
+                rule_col.write(f"• {describe_unavailability(rule)}")
+                if remove_col.button("🗑️", key=f"remove_unavailable_{i}"):
+                    unavailable.pop(i)
                     st.rerun()
 
+            period_kind = st.selectbox("Add:", ["Date range", "Every N weeks", "Nth weekday of the month"],
+                                       key="unavailable_kind")
+            first_of_month = datetime(const_year, const_month, 1)
+            if period_kind == "Date range":
+                period = st.date_input("Dates:", value=(first_of_month, first_of_month), key="unavailable_range")
+                new_rule = {'from': period[0], 'to': period[-1]} if period else None
             else:
-                # Display regular table
-                st.dataframe(filtered, width='stretch', hide_index=True)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    weekday = st.selectbox("Weekday:", WEEKDAY_NAMES, key="unavailable_weekday")
+                with col2:
+                    if period_kind == "Every N weeks":
+                        every = st.number_input("Every N weeks:", min_value=1, max_value=8, value=2, key="unavailable_every")
+                    else:
+                        nth = st.selectbox("Which:", list(ORDINALS), format_func=ORDINALS.get, key="unavailable_nth")
+                with col3:
+                    span = st.number_input("Days:", min_value=1, max_value=7, value=1, key="unavailable_days",
+                                           help="2 on a Saturday covers the whole weekend")
+                if period_kind == "Every N weeks":
+                    anchor = st.date_input("Starting:", value=first_of_month, key="unavailable_anchor")
+                    new_rule = {'weekday': weekday, 'every': int(every), 'anchor': anchor}
+                else:
+                    new_rule = {'weekday': weekday, 'nth': nth}
+                if span > 1:
+                    new_rule['days'] = int(span)
+            reason = st.text_input("Reason (optional):", key="unavailable_reason")
+
+            if st.button("➕ Add Period", key="add_unavailable", disabled=new_rule is None):
+                if reason:
+                    new_rule['reason'] = reason
+                member_constraints = st.session_state.constraints.setdefault(selected_doctor, {})
+                member_constraints.setdefault('unavailable', []).append(normalize_unavailability(new_rule))
+                st.session_state.constraints_saved = selected_doctor
+                st.rerun()
 
-            # Export options
-            st.subheader("Export Options")
-            col1, col2, col3 = st.columns(3)
+            # Save
+            if st.button("💾 Save", key="save_constraints"):
+                if selected_doctor not in st.session_state.constraints:
+                    st.session_state.constraints[selected_doctor] = {}
 
-            with col1:
-                csv = filtered.to_csv(index=False)
-                st.download_button("📄 CSV", csv, f"schedule_{year}_{month:02d}.csv", "text/csv", key="export_csv")
+                # Save fixed shifts (day of week based)
+                st.session_state.constraints[selected_doctor]['fixed_shifts'] = fixed_shifts
 
-            with col2:
-                excel = create_excel_export(st.session_state.schedule_df, int(year), month)
-                st.download_button("📊 Excel", excel, f"schedule_{year}_{month:02d}.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", key="export_excel")
+                # Save rotation
+                pattern = [entry.strip() or None for entry in rotation_text.split(",")]
+                if any(pattern):
+                    rotation = dict(current_rotation, anchor=rotation_anchor.strftime("%Y-%m-%d"), pattern=pattern)
+                    st.session_state.constraints[selected_doctor]['rotation'] = rotation
+                else:
+                    st.session_state.constraints[selected_doctor].pop('rotation', None)
+
+                # Save workload target (a single ratio unless nights differ)
+                ratio = target_percent / 100
+                target = dict(target_ratios, shifts=ratio, hours=ratio, weekends=ratio, holidays=ratio,
+                              nights=0.0 if no_nights else ratio)
+                if len(set(target.values())) > 1:
+                    st.session_state.constraints[selected_doctor]['target'] = target
+                elif ratio != 1.0:
+                    st.session_state.constraints[selected_doctor]['target'] = ratio
+                else:
+                    st.session_state.constraints[selected_doctor].pop('target', None)
 
-            with col3:
-                ics = create_ics_export(st.session_state.schedule_df)
-                st.download_button("📅 Calendar", ics, f"schedule_{year}_{month:02d}.ics", "text/calendar", key="export_ics")
+                # Save days off (month specific)
+                if month_key not in st.session_state.constraints[selected_doctor]:
+                    st.session_state.constraints[selected_doctor][month_key] = {}
+                st.session_state.constraints[selected_doctor][month_key]['days_off'] = days_off
 
-        with tab3:
-            # Constraints configuration
-            st.subheader("Scheduling Constraints")
+                # Full rerun so the sidebar's feasibility check sees the change
+                st.session_state.constraints_saved = selected_doctor
+                st.rerun()
 
-            if not st.session_state.doctors:
-                st.info("Add team members first")
+            if st.session_state.pop('constraints_saved', None) == selected_doctor:
+                st.success("Constraints saved!")
+
+        st.divider()
+
+        # Show all constraints summary
+        if st.session_state.constraints:
+            st.subheader("📋 Current Constraints Summary")
+            summary = constraints_summary(config_version(), st.session_state.constraints)
+            st.dataframe(summary, width='stretch', hide_index=True)
+
+    # Fairness weights, weekend days and holidays used by generation and optimization
+    with st.expander("⚖️ Fairness"):
+        st.write("How much each kind of load counts when spreading work evenly. Targets above scale each member's share.")
+        fairness = get_fairness()
+        weight_cols = st.columns(len(FAIRNESS_DIMENSIONS))
+        weights = {}
+        for col, dimension in zip(weight_cols, FAIRNESS_DIMENSIONS):
+            with col:
+                weights[dimension] = st.number_input(f"{dimension.capitalize()}:", min_value=0.0, max_value=10.0,
+                                                     value=fairness['weights'][dimension], step=0.5,
+                                                     key=f"fairness_weight_{dimension}")
+        weekend_days = st.multiselect("Weekend days:", WEEKDAY_NAMES, default=fairness['weekend_days'],
+                                      key="fairness_weekend_days")
+        holidays_text = st.text_area("Holidays (YYYY-MM-DD, one per line):", value="\n".join(fairness['holidays']),
+                                     key="fairness_holidays")
+        if st.button("💾 Save Fairness", key="save_fairness"):
+            try:
+                st.session_state.fairness = get_fairness({
+                    'weights': weights,
+                    'weekend_days': weekend_days,
+                    'holidays': [line.strip() for line in holidays_text.splitlines() if line.strip()],
+                })
+            except ValueError as e:
+                st.error(f"Invalid holiday: {e}")
             else:
-                # Month/year for constraints (for days off only)
-                col1, col2 = st.columns(2)
-                with col1:
-                    const_month = st.selectbox("Month:", range(1, 13), index=datetime.now().month-1, format_func=lambda x: calendar.month_name[x], key="const_month")
-                with col2:
-                    const_year = st.number_input("Year:", min_value=2024, max_value=2030, value=datetime.now().year, key="const_year")
-
-                # Select doctor
-                selected_doctor = st.selectbox("Team member:", st.session_state.doctors, key="const_doctor")
-
-                if selected_doctor:
-                    # Get doctor's constraints
-                    doctor_constraints = st.session_state.constraints.get(selected_doctor, {})
-                    month_key = f"{const_year}-{const_month:02d}"
-                    month_constraints = doctor_constraints.get(month_key, {})
-
-                    # Days off (month-specific)
-                    days_in_month = calendar.monthrange(const_year, const_month)[1]
-                    all_dates = [f"{const_year}-{const_month:02d}-{d:02d}" for d in range(1, days_in_month + 1)]
-                    days_off = st.multiselect("Days off:", all_dates, default=month_constraints.get('days_off', []), key="days_off")
-
-                    # Fixed shifts (day of week based)
-                    st.write("**Fixed Weekly Schedule:**")
-                    st.write("*Recurring shifts by day of the week (portable across months)*")
-
-                    current_fixed = doctor_constraints.get('fixed_shifts', {})
-                    fixed_shifts = {}
-
-                    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-
-                    for day in days:
-                        # Get available shifts for this day (from shift config)
-                        day_shifts = st.session_state.shift_config.get(day, {})
-                        shift_options = ['None'] + list(day_shifts.keys())
-
-                        current_value = current_fixed.get(day, 'None')
-                        if current_value and current_value not in shift_options:
-                            shift_options.append(current_value)
-
-                        selected_shift = st.selectbox(
-                            f"{day}:",
-                            options=shift_options,
-                            index=shift_options.index(current_value) if current_value in shift_options else 0,
-                            key=f"fixed_{day}"
-                        )
-
-                        if selected_shift != 'None':
-                            fixed_shifts[day] = selected_shift
-
-                    # Save
-                    if st.button("💾 Save", key="save_constraints"):
-                        if selected_doctor not in st.session_state.constraints:
-                            st.session_state.constraints[selected_doctor] = {}
-
-                        # Save fixed shifts (day of week based)
-                        st.session_state.constraints[selected_doctor]['fixed_shifts'] = fixed_shifts
-
-                        # Save days off (month specific)
-                        if month_key not in st.session_state.constraints[selected_doctor]:
-                            st.session_state.constraints[selected_doctor][month_key] = {}
-                        st.session_state.constraints[selected_doctor][month_key]['days_off'] = days_off
-
-                        st.success("Constraints saved!")
-
-                st.divider()
-
-                # Show all constraints summary
-                if st.session_state.constraints:
-                    st.subheader("📋 Current Constraints Summary")
-                    for doctor, doctor_constraints in st.session_state.constraints.items():
-                        with st.expander(f"📝 {doctor}"):
-                            # Fixed shifts (day of week)
-                            fixed_shifts = doctor_constraints.get('fixed_shifts', {})
-                            if fixed_shifts:
-                                st.write("**Fixed weekly schedule:**")
-                                for day, shift in fixed_shifts.items():
-                                    st.write(f"  • {day}: {shift}")
-
-                            # Days off (month specific)
-                            has_days_off = False
-                            for month_key, month_data in doctor_constraints.items():
-                                if month_key.count('-') == 1 and isinstance(month_data, dict):  # YYYY-MM format
-                                    days_off = month_data.get('days_off', [])
-                                    if days_off:
-                                        if not has_days_off:
-                                            st.write("**Days off:**")
-                                            has_days_off = True
-                                        month_name = datetime.strptime(month_key + "-01", "%Y-%m-%d").strftime("%B %Y")
-                                        st.write(f"  • {month_name}: {', '.join(days_off)}")
-
-                            # Notes
-                            notes = doctor_constraints.get('notes', '')
-                            if notes:
-                                st.write(f"**Notes:** {notes}")
-
-                            if not fixed_shifts and not has_days_off and not notes:
-                                st.write("No constraints set")
+                st.session_state.fairness_saved = True
+                st.rerun()
+        if st.session_state.pop('fairness_saved', False):
+            st.success("Fairness settings saved!")
 
-            st.divider()
+    # Rest rules used by generation, optimization and Edit Mode
+    with st.expander("🛌 Rest Rules"):
+        st.write("Limits that keep shifts apart. Set a rule to 0 to turn it off; a member's `rest` constraint in the YAML overrides these.")
+        rest_rules = get_rest_rules()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_rest = st.number_input("Minimum rest between shifts (hours):", min_value=0.0, max_value=48.0,
+                                       value=float(rest_rules['min_rest_hours'] or 0), step=1.0, key="rest_min_hours")
+        with col2:
+            max_days = st.number_input("Max consecutive working days:", min_value=0, max_value=31,
+                                       value=int(rest_rules['max_consecutive_days'] or 0), key="rest_max_days")
+        with col3:
+            max_hours = st.number_input("Max hours in any 7 days:", min_value=0.0, max_value=168.0,
+                                        value=float(rest_rules['max_hours_7_days'] or 0), step=4.0, key="rest_max_hours")
+        if st.button("💾 Save Rest Rules", key="save_rest_rules"):
+            st.session_state.rest_rules = get_rest_rules({
+                'min_rest_hours': min_rest,
+                'max_consecutive_days': max_days,
+                'max_hours_7_days': max_hours,
+            })
+            st.session_state.rest_rules_saved = True
+            st.rerun()
+        if st.session_state.pop('rest_rules_saved', False):
+            st.success("Rest rules saved!")
+
+    st.divider()
+
+    # Bulk leave import from HR exports
+    st.subheader("📥 Bulk Leave Import")
+    st.write("Upload a CSV or Excel file with a member column and either a date column or start and end columns. Multi-day leave keeps its reason.")
+    leave_file = st.file_uploader("Leave file:", type=['csv', 'xlsx'], key="leave_upload")
+    add_members = st.checkbox("Add unknown names to the team", key="leave_add_members")
+    if leave_file is not None and st.button("📥 Import Leave", key="import_leave"):
+        try:
+            result = import_leave(leave_file, leave_file.name, st.session_state.doctors,
+                                  st.session_state.constraints, add_members=add_members)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            if result.new_members:
+                st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
+            # Full rerun so the sidebar's feasibility check sees the new leave
+            st.session_state.leave_import_result = result
+            st.rerun()
 
-            # YAML Editor
-            st.subheader("Advanced Configuration Editor")
+    result = st.session_state.pop('leave_import_result', None)
+    if result is not None:
+        st.success(f"Imported {result.rows - result.error_count} of {result.rows} rows: "
+                   f"{result.days_off} days off and {result.ranges} date ranges added"
+                   + (f", {len(result.new_members)} new members" if result.new_members else ""))
+        if result.error_count:
+            st.warning(f"{result.error_count} rows skipped")
+            errors = pd.DataFrame(result.errors, columns=['Row', 'Error'])
+            st.dataframe(errors, width='stretch', hide_index=True)
 
-            if st.button("📝 Open Config Editor", key="open_editor"):
-                st.session_state.show_editor = not st.session_state.get('show_editor', False)
+    st.divider()
 
-            if st.session_state.get('show_editor', False):
-                st.write("**Edit Full Configuration (YAML format):**")
+    # YAML Editor
+    st.subheader("Advanced Configuration Editor")
 
-                # Get current config as YAML
-                current_yaml = export_config()
+    if st.button("📝 Open Config Editor", key="open_editor"):
+        st.session_state.show_editor = not st.session_state.get('show_editor', False)
 
-                # YAML editor with more space
-                edited_yaml = st.text_area(
-                    "Configuration:",
-                    value=current_yaml,
-                    height=400,
-                    key="yaml_editor",
-                    help="Edit the complete configuration in YAML format. Includes team members, shifts, and constraints. Be careful with indentation!"
-                )
+    if st.session_state.get('show_editor', False):
+        st.write("**Edit Full Configuration (YAML format):**")
 
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    if st.button("💾 Apply Changes", key="apply_yaml"):
-                        try:
-                            success, msg = import_config(edited_yaml)
-                            if success:
-                                st.success("Configuration updated from YAML!")
-                                st.rerun()
-                            else:
-                                st.error(f"Error applying changes: {msg}")
-                        except Exception as e:
-                            st.error(f"Error parsing YAML: {str(e)}")
+        # Get current config as YAML
+        current_yaml = config_yaml(config_version())
 
-                with col2:
-                    if st.button("🔄 Reset to Current", key="reset_yaml"):
+        # YAML editor with more space
+        edited_yaml = st.text_area(
+            "Configuration:",
+            value=current_yaml,
+            height=400,
+            key="yaml_editor",
+            help="Edit the complete configuration in YAML format. Includes team members, shifts, and constraints. Be careful with indentation!"
+        )
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("💾 Apply Changes", key="apply_yaml"):
+                try:
+                    success, msg = import_config(edited_yaml)
+                    if success:
+                        st.success("Configuration updated from YAML!")
                         st.rerun()
+                    else:
+                        st.error(f"Error applying changes: {msg}")
+                except Exception as e:
+                    st.error(f"Error parsing YAML: {str(e)}")
 
-                with col3:
-                    # Download current YAML
-                    st.download_button(
-                        "📥 Download YAML",
-                        current_yaml,
-                        f"tool_sched_config_{datetime.now().strftime('%Y%m%d')}.yaml",
-                        "text/yaml",
-                        key="download_yaml_editor"
-                    )
+        with col2:
+            if st.button("🔄 Reset to Current", key="reset_yaml"):
+                st.rerun()
+
+        with col3:
+            # Download current YAML
+            st.download_button(
+                "📥 Download YAML",
+                current_yaml,
+                f"tool_sched_config_{datetime.now().strftime('%Y%m%d')}.yaml",
+                "text/yaml",
+                key="download_yaml_editor"
+            )
+
+        st.info("💡 **Tip:** This editor shows the complete configuration including example constraints with set schedules, days off requests, and notes. Changes here affect everything: team members, shift patterns, and all constraints.")
+
+def render_dashboard():
+    """Coverage and load charts drawn from pre-aggregated pivots"""
+    doctors = st.session_state.doctors
+    signature = archive_signature()
+    months = [month for month, _ in signature]
+    source = st.radio("Show:", ["This schedule", "Archived months"], horizontal=True, key="dashboard_source",
+                      disabled=not months, help="Archive schedules from the Table tab to chart longer ranges")
+    if source == "Archived months" and months:
+        start_month, end_month = st.select_slider("Months:", months, value=(months[0], months[-1]),
+                                                  key="dashboard_months")
+        pivots = archive_pivots(signature, start_month, end_month, config_version(),
+                                doctors, st.session_state.fairness)
+    else:
+        pivots = schedule_pivots()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(coverage_heatmap(pivots), key="chart_coverage")
+    with col2:
+        dimension = st.selectbox("Load:", DIMENSIONS, index=DIMENSIONS.index('Hours'), key="dashboard_dimension")
+        st.plotly_chart(member_week_heatmap(pivots, dimension), key="chart_member_weeks")
+
+    highlight = st.multiselect("Highlight:", doctors, max_selections=8, key="dashboard_highlight")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(hours_over_time(pivots, doctors, highlight), key="chart_hours")
+    with col2:
+        st.plotly_chart(fairness_trend_chart(pivots, doctors), key="chart_fairness")
+
+@st.fragment
+def render_analytics_tab(year, month):
+    """Workload charts and what-if scenarios"""
+    # Analytics
+    st.subheader("Schedule Analytics")
+
+    render_dashboard()
+
+    # Balance check
+    shifts_per_doctor, _ = workload(schedule_version(), config_version(),
+                                    st.session_state.schedule_df, st.session_state.shift_config)
+    if len(shifts_per_doctor) > 0:
+        min_shifts = shifts_per_doctor.min()
+        max_shifts = shifts_per_doctor.max()
+        diff = max_shifts - min_shifts
+
+        if diff <= 1:
+            st.success(f"✅ Well balanced (max difference: {diff})")
+        elif diff <= 2:
+            st.info(f"📊 Reasonably balanced (max difference: {diff})")
+        else:
+            st.warning(f"⚠️ Imbalanced (max difference: {diff})")
+
+    st.write("**Load breakdown per team member:**")
+    breakdown = fairness_breakdown(schedule_version(), config_version(), st.session_state.schedule_df,
+                                   st.session_state.doctors, st.session_state.shift_config, st.session_state.fairness)
+    st.dataframe(breakdown, width='stretch')
+
+    # What-if scenarios against the current configuration
+    with st.expander("🔮 What-if Scenarios"):
+        st.write(f"Compare staffing changes for {calendar.month_name[month]} {year} over many seeded generations.")
+        doctors = st.session_state.doctors
+        col1, col2 = st.columns(2)
+        with col1:
+            extra_members = st.number_input("Add team members:", min_value=0, max_value=10, value=1, key="whatif_add")
+            removed_members = st.multiselect("Remove team members:", doctors, key="whatif_remove")
+        with col2:
+            leave_member = st.selectbox("Time off for:", ["(nobody)"] + doctors, key="whatif_leave_member")
+            days_in_month = calendar.monthrange(year, month)[1]
+            leave_days = st.slider("Days off:", 1, days_in_month, (1, min(14, days_in_month)), key="whatif_leave_days")
+        runs = st.slider("Runs per scenario:", 5, 100, 20, step=5, key="whatif_runs")
+
+        if st.button("Run Simulation", key="whatif_run"):
+            variations = []
+            if extra_members:
+                variations.append({
+                    'name': f"Add {extra_members} member(s)",
+                    'add_members': [f"New Member {i + 1}" for i in range(extra_members)],
+                })
+            if removed_members:
+                variations.append({'name': f"Remove {', '.join(removed_members)}", 'remove_members': removed_members})
+            if leave_member != "(nobody)":
+                variations.append({
+                    'name': f"{leave_member} off {leave_days[0]}-{leave_days[1]}",
+                    'days_off': {leave_member: [f"{year}-{month:02d}-{d:02d}" for d in range(leave_days[0], leave_days[1] + 1)]},
+                })
+            base_config = {
+                'team_members': doctors,
+                'shift_configuration': st.session_state.shift_config,
+                'constraints': st.session_state.constraints,
+                'fairness': st.session_state.fairness,
+                'rest_rules': st.session_state.rest_rules,
+            }
+            with st.spinner(f"Running {runs * (len(variations) + 1)} schedules..."):
+                summary, _ = simulate(base_config, variations, year, month, runs=runs)
+            st.session_state.whatif_summary = summary
+
+        if st.session_state.get('whatif_summary') is not None:
+            summary = st.session_state.whatif_summary
+            means = summary.xs('mean', axis=1, level=1)
+            st.dataframe(means.round(2), width='stretch')
+            st.caption("Mean per scenario. Lower is better for every column; p5/p95 ranges below.")
+            st.dataframe(summary.round(2), width='stretch')
 
-                st.info("💡 **Tip:** This editor shows the complete configuration including example constraints with set schedules, days off requests, and notes. Changes here affect everything: team members, shift patterns, and all constraints.")
+def main():
+    st.set_page_config(page_title="Tool Sched", page_icon="🛠️", layout="wide")
+    st.title("🛠️ Tool Sched")
+    st.write("Collaborative scheduling system for any team")
+
+    init_session()
+    if 'session_token' not in st.session_state:
+        st.session_state.session_token = get_session_tracker().register()
+
+    # Sidebar
+    with st.sidebar:
+        render_sidebar()
 
+    # Deep link to one member's page (?member=...), opening the published team schedule if needed
+    linked_member = st.query_params.get('member')
+    published = get_schedule_store().published(FEED_TEAM)
+    if linked_member and not st.session_state.schedule_generated and published is not None:
+        open_schedule(published)
+        st.session_state.schedule_generated = True
+
+    # Main content
+    if st.session_state.schedule_generated and not st.session_state.schedule_df.empty:
+        first_date = st.session_state.schedule_df.iloc[0]['Date']
+        year, month = int(first_date[:4]), int(first_date[5:7])
+        if linked_member:
+            render_member_page(linked_member, year, month)
+            return
+
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["📅 Calendar", "📋 Table", "⚙️ Edit Constraints", "📊 Analytics",
+                                                "👤 My Schedule"])
+
+        # Each tab is a fragment: its widgets rerun only that tab
+        with tab1:
+            render_calendar_tab(year, month)
+        with tab2:
+            render_table_tab(year, month)
+        with tab3:
+            render_constraints_tab()
         with tab4:
-            # Analytics
-            st.subheader("Schedule Analytics")
-
-            # Workload distribution
-            shifts_per_doctor = st.session_state.schedule_df['Doctor'].value_counts()
-            st.bar_chart(shifts_per_doctor)
-
-            # Balance check
-            if len(shifts_per_doctor) > 0:
-                min_shifts = shifts_per_doctor.min()
-                max_shifts = shifts_per_doctor.max()
-                diff = max_shifts - min_shifts
-
-                if diff <= 1:
-                    st.success(f"✅ Well balanced (max difference: {diff})")
-                elif diff <= 2:
-                    st.info(f"📊 Reasonably balanced (max difference: {diff})")
-                else:
-                    st.warning(f"⚠️ Imbalanced (max difference: {diff})")
+            render_analytics_tab(year, month)
+        with tab5:
+            render_member_tab(year, month)
 
     else:
         st.info("👈 Configure your team and generate a schedule to get started!")
@@ -0,0 +1,88 @@
+"""Per-member personal schedule views, computed once per schedule.
+
+MemberViews sorts a schedule by member and start time in a single pass and
+keeps each member's shifts as one contiguous slice, along with rolling
+7-day hours for every shift and a per-member, per-month hours table built
+by one groupby. Every later query (a member's shift list, monthly hours,
+next or upcoming shifts, calendar) is a slice or a binary search within
+that member's rows, so any number of members can look up their own
+schedule without rescanning or re-masking the whole table.
+
+Build one per schedule version and share it; it is never modified.
+"""
+import calendar
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from schedule_index import to_minutes
+from scheduling_utils import schedule_intervals, schedule_row_hours, trailing_hours
+
+SHIFT_COLUMNS = ['Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Hours', 'Hours_7_Days']
+
+
+class MemberViews:
+    """Every member's shifts, hours and upcoming assignments from one sorted copy of a schedule"""
+
+    def __init__(self, df, shift_config=None):
+        starts, _ = schedule_intervals(df)
+        hours = schedule_row_hours(df, shift_config)
+        codes, names = pd.factorize(df['Doctor'])
+        order = np.lexsort((starts, codes))
+
+        self.members = list(names)
+        self._codes = {name: code for code, name in enumerate(self.members)}
+        self._starts = starts[order]
+        self._bounds = np.searchsorted(codes[order], np.arange(len(self.members) + 1))
+
+        frame = df.iloc[order][['Date', 'Day', 'Shift', 'Start_Time', 'End_Time']].reset_index(drop=True)
+        frame['Hours'] = hours[order]
+        frame['Hours_7_Days'] = trailing_hours(codes[order], self._starts, hours[order])
+        self._frame = frame
+
+        month = frame['Date'].str[:7].rename('Month')
+        member = pd.Series(np.asarray(names, dtype=object)[codes[order]], name='Doctor')
+        self.monthly = frame.groupby([member, month], sort=True)['Hours'].agg(Shifts='size', Hours='sum')
+        self.summary = self.monthly.groupby(level='Doctor').sum()
+        self.summary['Max_Hours_7_Days'] = frame['Hours_7_Days'].groupby(member).max()
+
+    def __contains__(self, member):
+        return member in self._codes
+
+    def _slice(self, member):
+        code = self._codes.get(member)
+        if code is None:
+            return 0, 0
+        return int(self._bounds[code]), int(self._bounds[code + 1])
+
+    def shifts(self, member):
+        """A member's shifts in time order (SHIFT_COLUMNS)"""
+        lo, hi = self._slice(member)
+        return self._frame.iloc[lo:hi]
+
+    def monthly_hours(self, member):
+        """Shifts and hours per YYYY-MM for a member"""
+        if member not in self._codes:
+            return self.monthly.iloc[:0]
+        return self.monthly.xs(member, level='Doctor')
+
+    def upcoming(self, member, after, limit=5):
+        """A member's next shifts starting at or after a moment (datetime or timestamp string)"""
+        lo, hi = self._slice(member)
+        first = lo + int(np.searchsorted(self._starts[lo:hi], to_minutes(after), side='left'))
+        return self._frame.iloc[first:min(first + limit, hi)]
+
+    def next_shift(self, member, after):
+        """A member's first shift starting at or after a moment, as a row Series, or None"""
+        upcoming = self.upcoming(member, after, limit=1)
+        return upcoming.iloc[0] if len(upcoming) else None
+
+    def calendar(self, member, year, month):
+        """Weeks of a month (calendar.monthcalendar) with the member's shift names per day"""
+        prefix = f"{year}-{month:02d}-"
+        by_day = defaultdict(list)
+        for date, shift in zip(*self.shifts(member)[['Date', 'Shift']].to_numpy().T):
+            if date.startswith(prefix):
+                by_day[int(date[8:10])].append(shift)
+        return [[(day, by_day.get(day, [])) for day in week] for week in calendar.monthcalendar(year, month)]
@@ -0,0 +1,333 @@
+"""Process-wide counters, gauges and histograms in Prometheus text format.
+
+Metrics are module-level objects recorded from the scheduling, export and
+import code paths and shared by every session in the process. Recording is
+a dict update under a lock; hot loops aggregate locally and record once per
+call (one observation per generated schedule, not per slot).
+
+The registry can be served over HTTP for a Prometheus scrape or written to a
+file for node_exporter's textfile collector. The app does either when
+TOOL_SCHED_METRICS_PORT or TOOL_SCHED_METRICS_FILE is set.
+
+Usage:
+    from metrics import render, serve_metrics, write_metrics
+    serve_metrics(port=9464)           # http://127.0.0.1:9464/metrics
+    write_metrics('scheduler.prom')    # one snapshot, written atomically
+"""
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 3e5, 1e6, 3e6, 1e7, 3e7)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+REGISTRY = []
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Named metric with optional labels; values are kept per label combination"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        if registry is not None:
+            registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """(suffix, label values, extra labels, value) tuples for the exposition"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [('', key, (), value) for key, value in items]
+
+
+class Gauge(Metric):
+    """Value that goes up and down; set_function reads it at scrape time instead"""
+
+    kind = 'gauge'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Report function() at every scrape (unlabelled gauges only)"""
+        self._function = function
+
+    def value(self, **labels):
+        if self._function is not None:
+            return self._function()
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self):
+        if self._function is not None:
+            return [('', (), (), self._function())]
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [('', key, (), value) for key, value in items]
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block in seconds"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            return state[2] if state else 0
+
+    def total(self, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            return state[1] if state else 0.0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        if not items and not self.labelnames:
+            items = [((), ([0] * len(self.buckets), 0.0, 0))]
+        samples = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(('_bucket', key, (('le', _format_value(bound)),), cumulative))
+            samples.append(('_sum', key, (), total))
+            samples.append(('_count', key, (), count))
+        return samples
+
+
+# Scheduling
+GENERATION_SECONDS = Histogram(
+    'scheduler_generation_seconds', "Time to generate a month's schedule")
+FALLBACK_SEATS = Counter(
+    'scheduler_fallback_seats_total',
+    "Seats filled from the fallback pool because no available member was eligible")
+DOUBLE_BOOKINGS = Counter(
+    'scheduler_double_bookings_total',
+    "Seats generation gave to members already working that day")
+IMPROVE_SECONDS = Histogram(
+    'scheduler_improve_seconds', "Time spent improving a generated schedule")
+REMAINING_DOUBLE_BOOKINGS = Histogram(
+    'scheduler_improve_remaining_double_bookings',
+    "Double bookings still in a schedule after improvement", buckets=COUNT_BUCKETS)
+
+# Exports
+EXPORT_SECONDS = Histogram(
+    'scheduler_export_seconds', "Export duration by format", ['format'])
+EXPORT_BYTES = Histogram(
+    'scheduler_export_bytes', "Export size in bytes by format", ['format'], buckets=SIZE_BUCKETS)
+EXPORT_FAILURES = Counter(
+    'scheduler_export_failures_total', "Exports that raised an error, by format", ['format'])
+
+# Configuration imports
+CONFIG_IMPORTS = Counter(
+    'scheduler_config_imports_total', "Configuration imports by result (ok or error)", ['result'])
+CONFIG_IMPORT_BYTES = Histogram(
+    'scheduler_config_import_bytes', "Size of imported configuration files", buckets=SIZE_BUCKETS)
+CONFIG_IMPORT_MEMBERS = Histogram(
+    'scheduler_config_import_members', "Team members per imported configuration", buckets=COUNT_BUCKETS)
+
+# Sessions
+ACTIVE_SESSIONS = Gauge('scheduler_active_sessions', "App sessions currently alive in this process")
+
+
+class _SessionToken:
+    """Per-session object whose lifetime marks the session as alive"""
+
+
+class SessionTracker:
+    """Counts live sessions by weak references to a token each session keeps
+
+    A session stores the token from register() in its own state; once the
+    session is discarded the token is garbage collected and drops out.
+    """
+
+    def __init__(self):
+        self._tokens = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def register(self):
+        token = _SessionToken()
+        with self._lock:
+            self._tokens.add(token)
+        return token
+
+    def __len__(self):
+        with self._lock:
+            return len(self._tokens)
+
+
+def render(registry=REGISTRY):
+    """Every metric in the registry in Prometheus text exposition format"""
+    return '\n'.join(metric.render() for metric in registry) + '\n'
+
+
+def write_metrics(path, registry=REGISTRY):
+    """Write a snapshot to a file, atomically so a collector never reads half of it"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(render(registry))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def write_metrics_every(path, interval=15, registry=REGISTRY):
+    """Rewrite the metrics file every interval seconds on a background thread; returns a stop Event"""
+    stop = threading.Event()
+
+    def loop():
+        while True:
+            write_metrics(path, registry)
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=loop, name='metrics-writer', daemon=True).start()
+    return stop
+
+
+def make_handler(registry=REGISTRY):
+    # Imported here so recording metrics does not pull the HTTP server into every importer
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render(registry).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Scrapes every few seconds would flood the console
+
+    return MetricsHandler
+
+
+def serve_metrics(host='127.0.0.1', port=9464, registry=REGISTRY):
+    """Serve /metrics on a background thread and return the server (call .shutdown() to stop)"""
+    from http.server import ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), make_handler(registry))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,215 @@
+"""Columnar, memory-mapped archive of generated schedules.
+
+Schedules are stored one directory per month, one typed NumPy column per
+field. Members and shift names are dictionary-encoded against archive-wide
+category lists, so codes are stable across months. The reader opens the
+columns with mmap_mode='r' and aggregates one partition at a time, which
+keeps multi-year queries at the memory cost of a single month.
+
+Layout:
+    <root>/categories.json        {"members": [...], "shifts": [...]}
+    <root>/<YYYY-MM>/<column>.npy date, member, shift, seat, start, end, hours
+
+Usage:
+    python schedule_archive.py write <root> schedule.csv [...]
+    python schedule_archive.py hours <root> [--from YYYY-MM] [--to YYYY-MM]
+    python schedule_archive.py coverage <root> [--from YYYY-MM] [--to YYYY-MM]
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from scheduling_utils import EPOCH, schedule_intervals, schedule_row_hours
+
+COLUMNS = {
+    'date': np.int32,    # Days since 1970-01-01
+    'member': np.int32,  # Code into categories['members']
+    'shift': np.int16,   # Code into categories['shifts']
+    'seat': np.int16,
+    'start': np.int64,   # Absolute start, minutes since 1970-01-01
+    'end': np.int64,
+    'hours': np.float32,
+}
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+class ScheduleArchive:
+    """Month-partitioned columnar schedule archive rooted at a directory"""
+
+    def __init__(self, root):
+        self.root = root
+        self.categories = self._load_categories()
+
+    def _categories_path(self):
+        return os.path.join(self.root, 'categories.json')
+
+    def _load_categories(self):
+        try:
+            with open(self._categories_path()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'members': [], 'shifts': []}
+
+    def _save_categories(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._categories_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.categories, f)
+        os.replace(tmp_path, self._categories_path())
+
+    def _encode(self, kind, values):
+        """Dictionary-encode values, appending unseen categories"""
+        categories = self.categories[kind]
+        lookup = {value: code for code, value in enumerate(categories)}
+        for value in pd.unique(values):
+            if value not in lookup:
+                lookup[value] = len(categories)
+                categories.append(value)
+        return np.fromiter((lookup[value] for value in values), dtype=np.int64, count=len(values))
+
+    def write(self, df, shift_config=None):
+        """Write a schedule, replacing the partitions of every month it covers
+
+        Hours come from shift_config when given, otherwise from each row's
+        start and end times. Returns the list of months written.
+        """
+        df = df.reset_index(drop=True)
+        hours = schedule_row_hours(df, shift_config or {})
+        starts, ends = schedule_intervals(df)
+        seats = df['Seat'].to_numpy() if 'Seat' in df.columns else np.ones(len(df))
+
+        member_codes = self._encode('members', df['Doctor'].to_numpy())
+        shift_codes = self._encode('shifts', df['Shift'].to_numpy())
+        self._save_categories()
+
+        dates = pd.to_datetime(df['Date'])
+        day_numbers = (dates - EPOCH).dt.days.to_numpy()
+        month_keys = dates.dt.strftime('%Y-%m').to_numpy()
+
+        written = []
+        for month_key in sorted(set(month_keys)):
+            rows = np.flatnonzero(month_keys == month_key)
+            order = rows[np.lexsort((seats[rows], starts[rows]))]
+            columns = {
+                'date': day_numbers[order],
+                'member': member_codes[order],
+                'shift': shift_codes[order],
+                'seat': seats[order],
+                'start': starts[order],
+                'end': ends[order],
+                'hours': hours[order],
+            }
+
+            # Write into a scratch directory and swap it in so readers never see half a month
+            partition = os.path.join(self.root, month_key)
+            scratch = partition + '.tmp'
+            shutil.rmtree(scratch, ignore_errors=True)
+            os.makedirs(scratch)
+            for name, dtype in COLUMNS.items():
+                np.save(os.path.join(scratch, f'{name}.npy'), np.asarray(columns[name], dtype=dtype))
+            shutil.rmtree(partition, ignore_errors=True)
+            os.replace(scratch, partition)
+            written.append(month_key)
+
+        return written
+
+    def months(self, start_month=None, end_month=None):
+        """Archived months (YYYY-MM), optionally limited to an inclusive range"""
+        if not os.path.isdir(self.root):
+            return []
+        months = sorted(
+            name for name in os.listdir(self.root)
+            if len(name) == 7 and name[4] == '-' and os.path.isdir(os.path.join(self.root, name))
+        )
+        return [m for m in months
+                if (start_month is None or m >= start_month) and (end_month is None or m <= end_month)]
+
+    def partition(self, month_key, columns=None):
+        """Memory-mapped columns of one month"""
+        names = columns or list(COLUMNS)
+        return {name: np.load(os.path.join(self.root, month_key, f'{name}.npy'), mmap_mode='r') for name in names}
+
+    def member_hours(self, start_month=None, end_month=None):
+        """Total hours and shift counts per member across the archived months"""
+        self.categories = self._load_categories()
+        size = len(self.categories['members'])
+        hours = np.zeros(size)
+        shifts = np.zeros(size, dtype=np.int64)
+        for month_key in self.months(start_month, end_month):
+            part = self.partition(month_key, ['member', 'hours'])
+            hours += np.bincount(part['member'], weights=part['hours'], minlength=size)
+            shifts += np.bincount(part['member'], minlength=size)
+
+        result = pd.DataFrame({'Shifts': shifts, 'Hours': hours}, index=pd.Index(self.categories['members'], name='Doctor'))
+        return result[result['Shifts'] > 0]
+
+    def coverage_by_shift(self, start_month=None, end_month=None):
+        """Assignments and hours per (weekday, shift) across the archived months"""
+        self.categories = self._load_categories()
+        n_shifts = len(self.categories['shifts'])
+        assignments = np.zeros(7 * n_shifts, dtype=np.int64)
+        hours = np.zeros(7 * n_shifts)
+        for month_key in self.months(start_month, end_month):
+            part = self.partition(month_key, ['date', 'shift', 'hours'])
+            weekday = (part['date'].astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+            cell = weekday * n_shifts + part['shift']
+            assignments += np.bincount(cell, minlength=7 * n_shifts)
+            hours += np.bincount(cell, weights=part['hours'], minlength=7 * n_shifts)
+
+        index = pd.MultiIndex.from_product([WEEKDAYS, self.categories['shifts']], names=['Day', 'Shift'])
+        result = pd.DataFrame({'Assignments': assignments, 'Hours': hours}, index=index)
+        return result[result['Assignments'] > 0]
+
+    def to_frame(self, start_month=None, end_month=None):
+        """Load archived months as a typed DataFrame with categorical member/shift columns"""
+        self.categories = self._load_categories()
+        frames = []
+        for month_key in self.months(start_month, end_month):
+            part = self.partition(month_key)
+            frames.append(pd.DataFrame({
+                'Date': EPOCH + pd.to_timedelta(np.asarray(part['date']), unit='D'),
+                'Shift': pd.Categorical.from_codes(np.asarray(part['shift']), self.categories['shifts']),
+                'Doctor': pd.Categorical.from_codes(np.asarray(part['member']), self.categories['members']),
+                'Seat': np.asarray(part['seat']),
+                'Start': EPOCH + pd.to_timedelta(np.asarray(part['start']), unit='m'),
+                'End': EPOCH + pd.to_timedelta(np.asarray(part['end']), unit='m'),
+                'Hours': np.asarray(part['hours']),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['Date', 'Shift', 'Doctor', 'Seat', 'Start', 'End', 'Hours'])
+        return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar schedule archive")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    write_parser = subparsers.add_parser('write', help="Archive schedule CSV exports")
+    write_parser.add_argument('root')
+    write_parser.add_argument('csv', nargs='+')
+
+    for command in ('hours', 'coverage'):
+        query_parser = subparsers.add_parser(command)
+        query_parser.add_argument('root')
+        query_parser.add_argument('--from', dest='start_month')
+        query_parser.add_argument('--to', dest='end_month')
+
+    args = parser.parse_args()
+    archive = ScheduleArchive(args.root)
+
+    if args.command == 'write':
+        for path in args.csv:
+            months = archive.write(pd.read_csv(path, dtype={'Start_Time': str, 'End_Time': str}))
+            print(f"{path}: archived {', '.join(months)}")
+    elif args.command == 'hours':
+        print(archive.member_hours(args.start_month, args.end_month).to_string())
+    else:
+        print(archive.coverage_by_shift(args.start_month, args.end_month).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""Indexed point-in-time, range, next-shift and coverage-gap queries.
+
+ScheduleIndex holds every assignment as an absolute [start, end) interval in
+minutes since 1970-01-01, so overnight shifts are simply intervals that cross
+midnight. Intervals are kept in start order for the whole team and per member
+(members are contiguous runs of one array), alongside the merged coverage
+blocks. Every query is a binary search plus the matches it returns; nothing
+re-parses Start_Time/End_Time strings or scans the schedule.
+
+Build an index once per schedule, from a DataFrame or from a range of
+archived months, and reuse it for any number of queries.
+
+Usage:
+    python schedule_index.py now <archive-root|schedule.csv> [--at "YYYY-MM-DD HH:MM"]
+    python schedule_index.py next <archive-root|schedule.csv> MEMBER [--at ...]
+    python schedule_index.py gaps <archive-root|schedule.csv> --from YYYY-MM-DD --to YYYY-MM-DD
+"""
+import argparse
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from schedule_archive import ScheduleArchive
+from scheduling_utils import EPOCH, schedule_intervals
+
+Assignment = namedtuple('Assignment', ['member', 'shift', 'seat', 'start', 'end'])
+Gap = namedtuple('Gap', ['start', 'end'])
+
+_EPOCH_TS = pd.Timestamp(EPOCH)
+_MINUTE = pd.Timedelta(minutes=1)
+
+
+def to_minutes(value):
+    """Absolute minutes since 1970-01-01 for a datetime, timestamp string or minute count"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int((pd.Timestamp(value) - _EPOCH_TS) // _MINUTE)
+
+
+def from_minutes(minutes):
+    """datetime for absolute minutes since 1970-01-01"""
+    return EPOCH + timedelta(minutes=int(minutes))
+
+
+class ScheduleIndex:
+    """Sorted interval index over one or more months of assignments"""
+
+    def __init__(self, starts, ends, members, shifts, seats, member_names, shift_names):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        members = np.asarray(members, dtype=np.int64)
+        shifts = np.asarray(shifts, dtype=np.int64)
+        seats = np.asarray(seats, dtype=np.int64)
+        self.member_names = list(member_names)
+        self.shift_names = list(shift_names)
+        self._member_codes = {name: code for code, name in enumerate(self.member_names)}
+
+        # Team order: by start, seats in order within a shift
+        order = np.lexsort((seats, starts))
+        self._starts = starts[order]
+        self._ends = ends[order]
+        self._members = members[order]
+        self._shifts = shifts[order]
+        self._seats = seats[order]
+        self._max_duration = int((ends - starts).max()) if len(starts) else 0
+        self._sorted_ends = np.sort(ends)
+
+        # Member order: contiguous runs per member code, each run sorted by start
+        member_order = np.lexsort((self._starts, self._members))
+        self._member_rows = member_order
+        self._member_starts = self._starts[member_order]
+        self._member_bounds = np.searchsorted(self._members[member_order], np.arange(len(self.member_names) + 1))
+
+        # Merged coverage: a new block starts wherever a shift starts after every earlier one ended
+        if len(starts):
+            reach = np.maximum.accumulate(self._ends)
+            new_block = np.empty(len(starts), dtype=bool)
+            new_block[0] = True
+            new_block[1:] = self._starts[1:] > reach[:-1]
+            first = np.flatnonzero(new_block)
+            self._block_starts = self._starts[first]
+            self._block_ends = reach[np.append(first[1:] - 1, len(starts) - 1)]
+        else:
+            self._block_starts = self._block_ends = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def from_schedule(cls, df):
+        """Index a schedule DataFrame (Date, Shift, Start_Time, End_Time, Doctor[, Seat])"""
+        starts, ends = schedule_intervals(df)
+        member_codes, member_names = pd.factorize(df['Doctor'])
+        shift_codes, shift_names = pd.factorize(df['Shift'])
+        seats = df['Seat'].to_numpy() if 'Seat' in df.columns else np.ones(len(df), dtype=np.int64)
+        return cls(starts, ends, member_codes, shift_codes, seats, member_names, shift_names)
+
+    @classmethod
+    def from_archive(cls, archive, start_month=None, end_month=None):
+        """Index archived months (inclusive YYYY-MM range) of a ScheduleArchive"""
+        columns = ['start', 'end', 'member', 'shift', 'seat']
+        parts = [archive.partition(month_key, columns) for month_key in archive.months(start_month, end_month)]
+        arrays = {name: np.concatenate([np.asarray(part[name]) for part in parts]) if parts else np.empty(0)
+                  for name in columns}
+        return cls(arrays['start'], arrays['end'], arrays['member'], arrays['shift'], arrays['seat'],
+                   archive.categories['members'], archive.categories['shifts'])
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _assignments(self, rows, after):
+        """Assignments for team-order rows that end after a minute"""
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self._ends[rows] > after]
+        members = self._members[rows].tolist()
+        shifts = self._shifts[rows].tolist()
+        seats = self._seats[rows].tolist()
+        starts = self._starts[rows].astype('datetime64[m]').tolist()
+        ends = self._ends[rows].astype('datetime64[m]').tolist()
+        return [
+            Assignment(self.member_names[m], self.shift_names[s], seat, start, end)
+            for m, s, seat, start, end in zip(members, shifts, seats, starts, ends)
+        ]
+
+    def _member_slice(self, member):
+        code = self._member_codes.get(member)
+        if code is None:
+            return 0, 0
+        return int(self._member_bounds[code]), int(self._member_bounds[code + 1])
+
+    def on_call(self, at, member=None):
+        """Assignments in progress at a moment (start <= at < end), optionally for one member"""
+        t = to_minutes(at)
+        if member is not None:
+            lo, hi = self._member_slice(member)
+            stop = lo + int(np.searchsorted(self._member_starts[lo:hi], t, side='right'))
+            start = lo + int(np.searchsorted(self._member_starts[lo:hi], t - self._max_duration, side='right'))
+            rows = self._member_rows[start:stop]
+        else:
+            start = int(np.searchsorted(self._starts, t - self._max_duration, side='right'))
+            stop = int(np.searchsorted(self._starts, t, side='right'))
+            rows = np.arange(start, stop)
+        return self._assignments(rows, t)
+
+    def between(self, start, end, member=None):
+        """Assignments overlapping [start, end), in start order"""
+        t0, t1 = to_minutes(start), to_minutes(end)
+        if member is not None:
+            lo, hi = self._member_slice(member)
+            first = lo + int(np.searchsorted(self._member_starts[lo:hi], t0 - self._max_duration, side='right'))
+            last = lo + int(np.searchsorted(self._member_starts[lo:hi], t1, side='left'))
+            rows = self._member_rows[first:last]
+        else:
+            first = int(np.searchsorted(self._starts, t0 - self._max_duration, side='right'))
+            last = int(np.searchsorted(self._starts, t1, side='left'))
+            rows = np.arange(first, last)
+        return self._assignments(rows, t0)
+
+    def next_shift(self, member, after):
+        """A member's first shift starting at or after a moment, or None"""
+        lo, hi = self._member_slice(member)
+        i = lo + int(np.searchsorted(self._member_starts[lo:hi], to_minutes(after), side='left'))
+        return self._assignments(self._member_rows[i:i + 1], -1)[0] if i < hi else None
+
+    def headcount(self, times):
+        """Number of assignments in progress at each of the given moments"""
+        values = np.atleast_1d(np.asarray(times, dtype=object))
+        t = np.array([to_minutes(value) for value in values], dtype=np.int64)
+        return np.searchsorted(self._starts, t, side='right') - np.searchsorted(self._sorted_ends, t, side='right')
+
+    def gaps(self, start, end):
+        """Uncovered intervals within [start, end), as Gaps of datetimes"""
+        t0, t1 = to_minutes(start), to_minutes(end)
+        first = int(np.searchsorted(self._block_ends, t0, side='right'))
+        last = int(np.searchsorted(self._block_starts, t1, side='left'))
+        gaps = []
+        cursor = t0
+        for block_start, block_end in zip(self._block_starts[first:last].tolist(),
+                                        self._block_ends[first:last].tolist()):
+            if block_start > cursor:
+                gaps.append(Gap(from_minutes(cursor), from_minutes(block_start)))
+            cursor = max(cursor, block_end)
+        if cursor < t1:
+            gaps.append(Gap(from_minutes(cursor), from_minutes(t1)))
+        return gaps
+
+
+def load_index(source):
+    """Index an archive directory or a schedule CSV export"""
+    if source.endswith('.csv'):
+        return ScheduleIndex.from_schedule(pd.read_csv(source, dtype={'Start_Time': str, 'End_Time': str}))
+    return ScheduleIndex.from_archive(ScheduleArchive(source))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query schedules by time")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    now_parser = subparsers.add_parser('now', help="Who is on at a moment")
+    now_parser.add_argument('source')
+    now_parser.add_argument('--at')
+
+    next_parser = subparsers.add_parser('next', help="A member's next shift")
+    next_parser.add_argument('source')
+    next_parser.add_argument('member')
+    next_parser.add_argument('--at')
+
+    gaps_parser = subparsers.add_parser('gaps', help="Uncovered periods in a range")
+    gaps_parser.add_argument('source')
+    gaps_parser.add_argument('--from', dest='start', required=True)
+    gaps_parser.add_argument('--to', dest='end', required=True)
+
+    args = parser.parse_args()
+    index = load_index(args.source)
+
+    if args.command == 'now':
+        at = args.at or datetime.now()
+        for a in index.on_call(at):
+            print(f"{a.member}\t{a.shift}\t{a.start:%Y-%m-%d %H:%M} - {a.end:%Y-%m-%d %H:%M}")
+    elif args.command == 'next':
+        shift = index.next_shift(args.member, args.at or datetime.now())
+        if shift is None:
+            print(f"No upcoming shifts for {args.member}")
+        else:
+            print(f"{shift.shift}\t{shift.start:%Y-%m-%d %H:%M} - {shift.end:%Y-%m-%d %H:%M}")
+    else:
+        for gap in index.gaps(args.start, args.end):
+            print(f"{gap.start:%Y-%m-%d %H:%M} - {gap.end:%Y-%m-%d %H:%M}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Pre-aggregated coverage and load pivots for the analytics dashboard.
+
+SchedulePivots bins a schedule once into NumPy arrays: assignments per
+weekday x shift, and shifts, hours, nights, weekends and holidays per
+member x week. Charts read these arrays instead of pivoting the schedule
+DataFrame on every rerun. A reassignment only moves one row's load from
+one member to another, so edits update a copy of the pivots in place in
+O(edited rows); sync() brings a copy in step with an edit log's overrides.
+
+Pivots can also be built from a ScheduleArchive for year-long (or longer)
+views, reading only the columns they need from each month partition.
+
+The figure functions turn pivots into plotly figures; plotly is imported on
+first use.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from scheduling_utils import (
+    EPOCH, FAIRNESS_DIMENSIONS, MINUTES_PER_DAY, NIGHT_END, NIGHT_START, WEEKDAY_NAMES, _LazyModule,
+    _distinct_rows, compile_shift_config, get_fairness, night_minutes, schedule_intervals, schedule_row_hours,
+    shift_interval
+)
+
+go = _LazyModule('plotly.graph_objects')
+
+DIMENSIONS = tuple(dimension.capitalize() for dimension in FAIRNESS_DIMENSIONS)
+
+
+def _row_nights(df, shift_config):
+    """Night flag per row: the configured shift's, else at least half of it between 22:00 and 06:00"""
+    codes, combinations = _distinct_rows(df, ['Day', 'Shift', 'Start_Time', 'End_Time'])
+    lookup = compile_shift_config(shift_config).lookup
+    nights = []
+    for day_name, shift_name, start, end in combinations:
+        template = lookup.get((day_name, shift_name))
+        if template is not None:
+            nights.append(template.night)
+        else:
+            start_minute, end_minute = shift_interval(start, end)
+            nights.append(2 * night_minutes(start_minute, end_minute) >= end_minute - start_minute)
+    return np.array(nights, dtype=bool)[codes]
+
+
+def _interval_nights(starts, ends):
+    """night_minutes() test for arrays of absolute start and end minutes"""
+    offset = starts - starts % MINUTES_PER_DAY
+    start_minutes, end_minutes = starts - offset, ends - offset
+    length = NIGHT_END + MINUTES_PER_DAY - NIGHT_START
+    total = np.zeros(len(starts))
+    for window_start in (NIGHT_START - MINUTES_PER_DAY, NIGHT_START, NIGHT_START + MINUTES_PER_DAY):
+        total += np.clip(np.minimum(end_minutes, window_start + length) - np.maximum(start_minutes, window_start), 0, None)
+    return 2 * total >= end_minutes - start_minutes
+
+
+def _row_values(days, hours, nights, fairness):
+    """Load each row adds per dimension (rows x DIMENSIONS), with hours unscaled"""
+    weekend_days = [WEEKDAY_NAMES.index(day) for day in fairness['weekend_days']]
+    holidays = (pd.to_datetime(fairness['holidays']) - EPOCH).days.to_numpy() if fairness['holidays'] else []
+    return np.column_stack([
+        np.ones(len(days)),
+        hours,
+        nights,
+        np.isin((days + 3) % 7, weekend_days),  # 1970-01-01 was a Thursday
+        np.isin(days, holidays),
+    ]).astype(float)
+
+
+class SchedulePivots:
+    """Coverage (weekday x shift) and load (member x week x dimension) arrays for one schedule
+
+    Members are the team in order followed by anyone else assigned; weeks
+    start on Monday. coverage counts assignments per weekday and shift and
+    occurrences the dated shifts behind them, so coverage / occurrences is
+    the average number of people on that shift. Reassignments don't change
+    coverage, only loads.
+    """
+
+    def __init__(self, slots, days, shift_codes, shift_names, members, values):
+        """Rows are parallel arrays: slot labels, days since 1970-01-01, shift codes, member names
+        and load per dimension"""
+        self.shifts = list(shift_names)
+        self._slots = pd.Index(slots)
+        member_codes, names = pd.factorize(np.asarray(members, dtype=object))
+        self.members = list(names)
+        self._codes = {member: code for code, member in enumerate(self.members)}
+        self._base = member_codes
+        self._member = member_codes.copy()
+        self._values = values
+        self._overrides = {}
+
+        days = np.asarray(days, dtype=np.int64)
+        shift_codes = np.asarray(shift_codes, dtype=np.int64)
+        first = int(days.min() - (days.min() + 3) % 7) if len(days) else 0
+        self._week = (days - first) // 7
+        n_weeks = int(self._week.max()) + 1 if len(days) else 0
+        self.weeks = pd.DatetimeIndex([EPOCH + pd.Timedelta(days=first + 7 * week) for week in range(n_weeks)])
+
+        n_shifts = len(self.shifts)
+        self.coverage = np.bincount(((days + 3) % 7) * n_shifts + shift_codes,
+                                    minlength=7 * n_shifts).reshape(7, n_shifts)
+        dated = np.unique(days * n_shifts + shift_codes)
+        self.occurrences = np.bincount(((dated // n_shifts + 3) % 7) * n_shifts + dated % n_shifts,
+                                       minlength=7 * n_shifts).reshape(7, n_shifts)
+
+        cells = self._member * n_weeks + self._week
+        self.loads = np.column_stack([
+            np.bincount(cells, weights=values[:, i], minlength=len(self.members) * n_weeks)
+            for i in range(len(DIMENSIONS))
+        ]).reshape(len(self.members), n_weeks, len(DIMENSIONS))
+
+    @classmethod
+    def from_frame(cls, df, doctors=(), shift_config=None, fairness=None):
+        """Pivots for a schedule DataFrame; doctors puts the team first, in order"""
+        starts, _ = schedule_intervals(df)
+        days = starts // MINUTES_PER_DAY
+        values = _row_values(days, schedule_row_hours(df, shift_config), _row_nights(df, shift_config),
+                             get_fairness(fairness))
+        shift_codes, shift_names = pd.factorize(df['Shift'])
+        pivots = cls(df.index, days, shift_codes, shift_names, df['Doctor'].to_numpy(), values)
+        return pivots._team_first(doctors)
+
+    @classmethod
+    def from_archive(cls, archive, start_month=None, end_month=None, doctors=(), fairness=None):
+        """Pivots for a range of ScheduleArchive months; slots are row positions in the range"""
+        columns = {name: [] for name in ('date', 'member', 'shift', 'start', 'end', 'hours')}
+        for month_key in archive.months(start_month, end_month):
+            for name, values in archive.partition(month_key, list(columns)).items():
+                columns[name].append(np.asarray(values))
+        columns = {name: np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+                   for name, parts in columns.items()}
+
+        days = columns['date'].astype(np.int64)
+        starts, ends = columns['start'].astype(np.int64), columns['end'].astype(np.int64)
+        values = _row_values(days, columns['hours'].astype(float), _interval_nights(starts, ends),
+                             get_fairness(fairness or {}))
+        members = np.asarray(archive.categories['members'], dtype=object)[columns['member']]
+        pivots = cls(np.arange(len(days)), days, columns['shift'], archive.categories['shifts'], members, values)
+        return pivots._team_first(doctors)
+
+    def _team_first(self, doctors):
+        """Reorder member rows: the team in its order, then everyone else as first seen"""
+        team = set(doctors)
+        order = list(dict.fromkeys(doctors)) + [member for member in self.members if member not in team]
+        position = {member: code for code, member in enumerate(order)}
+        remap = np.array([position[member] for member in self.members], dtype=np.int64)
+        loads = np.zeros((len(order),) + self.loads.shape[1:])
+        loads[remap] = self.loads
+        self.loads = loads
+        self._base, self._member = remap[self._base], remap[self._member]
+        self.members = order
+        self._codes = {member: code for code, member in enumerate(order)}
+        return self
+
+    def copy(self):
+        """Copy that can be edited without touching this one (row data is shared)"""
+        copied = copy.copy(self)
+        copied.members = list(self.members)
+        copied._codes = dict(self._codes)
+        copied._member = self._member.copy()
+        copied._overrides = dict(self._overrides)
+        copied.loads = self.loads.copy()
+        return copied
+
+    def _code(self, member):
+        code = self._codes.get(member)
+        if code is None:
+            code = self._codes[member] = len(self.members)
+            self.members.append(member)
+            self.loads = np.concatenate([self.loads, np.zeros((1,) + self.loads.shape[1:])])
+        return code
+
+    def assign(self, assignments):
+        """Reassign slots ({slot: member}), moving their load; returns how many rows changed"""
+        positions = self._slots.get_indexer(list(assignments))
+        if (positions < 0).any():
+            raise KeyError(f"Unknown slots: {[s for s, p in zip(assignments, positions) if p < 0]}")
+        new = np.array([self._code(member) for member in assignments.values()], dtype=np.int64)
+        moved = new != self._member[positions]
+        positions, new = positions[moved], new[moved]
+        weeks, values = self._week[positions], self._values[positions]
+        np.subtract.at(self.loads, (self._member[positions], weeks), values)
+        np.add.at(self.loads, (new, weeks), values)
+        self._member[positions] = new
+        return len(positions)
+
+    def sync(self, overrides):
+        """Match an edit log's overrides ({slot: member} relative to the schedule built from)
+
+        Only slots whose override differs from the last sync are touched, so
+        stepping through undo and redo costs the edits stepped over.
+        """
+        changed = [slot for slot in self._overrides.keys() | overrides.keys()
+                   if self._overrides.get(slot) != overrides.get(slot)]
+        positions = self._slots.get_indexer(changed)
+        self.assign({slot: overrides[slot] if slot in overrides else self.members[self._base[position]]
+                     for slot, position in zip(changed, positions)})
+        self._overrides = dict(overrides)
+
+    def _rows(self, members):
+        if members is None:
+            return list(self.members), slice(None)
+        members = [member for member in members if member in self._codes]
+        return members, [self._codes[member] for member in members]
+
+    def member_weeks(self, dimension='Hours', members=None):
+        """One dimension's load per member (rows) and week (columns)"""
+        members, rows = self._rows(members)
+        return pd.DataFrame(self.loads[rows, :, DIMENSIONS.index(dimension)], index=pd.Index(members, name='Doctor'),
+                            columns=self.weeks)
+
+    def fairness_trend(self, members=None):
+        """Spread (most minus least) of each member's running total per dimension, week by week"""
+        _, rows = self._rows(members)
+        totals = self.loads[rows].cumsum(axis=1)
+        spread = totals.max(axis=0) - totals.min(axis=0) if len(totals) else np.zeros((len(self.weeks), len(DIMENSIONS)))
+        return pd.DataFrame(spread, index=pd.Index(self.weeks, name='Week'), columns=list(DIMENSIONS))
+
+    def staffing(self):
+        """Average people per dated shift, weekday (rows) x shift (columns); NaN where the shift never ran"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(self.occurrences > 0, self.coverage / self.occurrences, np.nan)
+        return pd.DataFrame(mean, index=pd.Index(WEEKDAY_NAMES, name='Day'), columns=self.shifts)
+
+
+def coverage_heatmap(pivots):
+    """Weekday x shift heatmap of average staffing"""
+    staffing = pivots.staffing()
+    figure = go.Figure(go.Heatmap(
+        z=staffing.to_numpy(), x=list(staffing.columns), y=list(staffing.index), colorscale='Blues',
+        hovertemplate="%{y} %{x}: %{z:.2f} on shift<extra></extra>", colorbar={'title': 'People'}))
+    figure.update_layout(title="Average staffing", yaxis={'autorange': 'reversed'}, margin={'t': 40, 'b': 10})
+    return figure
+
+
+def member_week_heatmap(pivots, dimension='Hours', members=None):
+    """Member x week heatmap of one load dimension"""
+    loads = pivots.member_weeks(dimension, members)
+    figure = go.Figure(go.Heatmap(
+        z=loads.to_numpy(), x=loads.columns, y=list(loads.index), colorscale='YlOrRd',
+        hovertemplate="%{y}, week of %{x|%b %d}: %{z:g}<extra></extra>", colorbar={'title': dimension}))
+    figure.update_layout(title=f"{dimension} per member and week", yaxis={'autorange': 'reversed'},
+                         height=max(300, 22 * len(loads) + 120), margin={'t': 40, 'b': 10})
+    return figure
+
+
+def hours_over_time(pivots, members=None, highlight=()):
+    """Weekly hours: the team's range and mean, plus a line per highlighted member"""
+    hours = pivots.member_weeks('Hours', members)
+    weeks = hours.columns
+    figure = go.Figure([
+        go.Scatter(x=weeks, y=hours.max(), line={'width': 0}, showlegend=False, hoverinfo='skip'),
+        go.Scatter(x=weeks, y=hours.min(), line={'width': 0}, fill='tonexty', fillcolor='rgba(76, 120, 168, 0.2)',
+                   name="Team range"),
+        go.Scatter(x=weeks, y=hours.mean(), line={'color': '#4C78A8'}, name="Team mean"),
+    ])
+    for member in highlight:
+        if member in hours.index:
+            figure.add_trace(go.Scatter(x=weeks, y=hours.loc[member], mode='lines+markers', name=member))
+    figure.update_layout(title="Hours per week", yaxis_title="Hours", hovermode='x unified', margin={'t': 40, 'b': 10})
+    return figure
+
+
+def fairness_trend_chart(pivots, members=None):
+    """Week-by-week spread of running totals, one line per dimension"""
+    trend = pivots.fairness_trend(members)
+    figure = go.Figure([go.Scatter(x=trend.index, y=trend[dimension], mode='lines', name=dimension)
+                        for dimension in trend.columns])
+    figure.update_layout(title="Fairness trend (most minus least, running totals)", yaxis_title="Spread",
+                         hovermode='x unified', margin={'t': 40, 'b': 10})
+    return figure
@@ -0,0 +1,102 @@
+"""Process-wide, content-addressed store of immutable schedules.
+
+Generated schedules are held once per process and identified by a hash of
+their content, so sessions showing the same schedule share one copy.
+Sessions keep a SharedSchedule reference plus their own pending edits (an
+EditLog overlay); their working view replaces only the Doctor column and
+shares every other column with the stored frame.
+
+Entries are held weakly: a schedule stays in the store while some session
+still references it, or while it is published under a name.
+"""
+import hashlib
+import threading
+import weakref
+
+import pandas as pd
+
+
+def schedule_key(df):
+    """Content hash of a schedule (columns, index and values)"""
+    digest = hashlib.sha1(','.join(map(str, df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:20]
+
+
+class SharedSchedule:
+    """Immutable schedule held once per process; treat .frame as read-only"""
+
+    __slots__ = ('key', 'frame', '__weakref__')
+
+    def __init__(self, key, frame):
+        self.key = key
+        self.frame = frame
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __repr__(self):
+        return f"SharedSchedule({self.key!r}, {len(self.frame)} rows)"
+
+
+class ScheduleStore:
+    """Content-addressed pool of SharedSchedules"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._schedules = weakref.WeakValueDictionary()
+        self._published = {}  # name -> SharedSchedule, held until replaced
+
+    def share(self, df):
+        """Return the SharedSchedule for df's content, storing a private copy on first sight"""
+        key = schedule_key(df)
+        with self._lock:
+            shared = self._schedules.get(key)
+            if shared is None:
+                shared = SharedSchedule(key, df.copy())
+                self._schedules[key] = shared
+        return shared
+
+    def get(self, key):
+        """SharedSchedule for a key, or None if no session holds it any more"""
+        with self._lock:
+            return self._schedules.get(key)
+
+    def publish(self, name, shared):
+        """Pin a schedule under a name (e.g. a team) so other sessions can open it"""
+        with self._lock:
+            self._published[name] = shared
+
+    def published(self, name):
+        """The SharedSchedule published under name, or None"""
+        with self._lock:
+            return self._published.get(name)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._schedules)
+
+
+def copy_on_write():
+    """Whether writing to a shallow copy leaves the original frame alone
+
+    Always true from pandas 3; on pandas 2 it follows mode.copy_on_write.
+    """
+    return int(pd.__version__.split('.')[0]) >= 3 or pd.get_option('mode.copy_on_write') is True
+
+
+def with_assignments(frame, overrides):
+    """View of frame with some Doctor entries replaced
+
+    Only the Doctor column is copied; every other column stays shared with
+    frame, so writing to the view never reaches frame. Where pandas does not
+    copy on write (pandas 2 with the option off) the whole frame is copied
+    instead. Without overrides frame itself is returned.
+    """
+    if not overrides:
+        return frame
+    doctors = frame['Doctor'].copy()
+    doctors.loc[list(overrides)] = list(overrides.values())
+    result = frame.copy(deep=not copy_on_write())
+    result['Doctor'] = doctors
+    return result
@@ -0,0 +1,260 @@
+"""Whole-schedule validation in one vectorized pass.
+
+validate_schedule checks every row of a schedule (one month or many) against
+the team's rules and returns one row per violation:
+
+    unknown_member    member is not on the team
+    day_off           scheduled on a day off, rotation rest day or unavailable period
+    fixed_shift       on a different shift than the one they are fixed to that day,
+                      or missing from the configured shift they are fixed to
+    double_booking    a second (or later) shift for the member on the same day
+    overlap           starts before the member's previous shift has ended
+    rest              too little rest after the member's previous shift
+    consecutive_days  a working day beyond the consecutive-day limit
+    hours_7_days      trailing 7 days (this shift included) over the hours limit
+    coverage          a configured shift, or its role seats, not fully staffed
+
+Rows are sorted once by member and start time; every per-row rule is then a
+comparison of neighbouring rows, a lookup into the month's pre-assignment
+grid (see month_assignment_grid) or a binary search over cumulative hours.
+Rest rule limits match generation and Edit Mode (see get_rest_rules).
+
+validate_changes runs the same check for a batch of proposed reassignments
+and keeps only what they would add.
+
+Usage:
+    python schedule_validator.py schedule.csv --config team.yaml [--ignore RULE] [--csv violations.csv]
+
+Exits with status 1 when any violation is found, so batch jobs can gate on it.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from schedule_store import with_assignments
+from scheduling_utils import (
+    DEFAULT_SHIFTS, EPOCH, MINUTES_PER_DAY, expand_rotation_groups, get_member_role, get_month_slots,
+    member_rest_rules, month_assignment_grid, normalize_unavailability, schedule_intervals, schedule_row_hours,
+    trailing_hours
+)
+
+RULES = ('unknown_member', 'day_off', 'fixed_shift', 'double_booking', 'overlap', 'rest',
+         'consecutive_days', 'hours_7_days', 'coverage')
+VIOLATION_COLUMNS = ['Date', 'Shift', 'Doctor', 'Rule', 'Message', 'Row']
+
+
+class _Violations:
+    """Collects violations as column lists"""
+
+    def __init__(self):
+        self.columns = {column: [] for column in VIOLATION_COLUMNS}
+
+    def add(self, dates, shifts, doctors, rule, messages, rows):
+        self.columns['Date'].extend(dates)
+        self.columns['Shift'].extend(shifts)
+        self.columns['Doctor'].extend(doctors)
+        self.columns['Rule'].extend([rule] * len(messages))
+        self.columns['Message'].extend(messages)
+        self.columns['Row'].extend(rows)
+
+    def frame(self):
+        result = pd.DataFrame(self.columns, columns=VIOLATION_COLUMNS)
+        result['Row'] = result['Row'].astype('Int64')
+        result['Rule'] = pd.Categorical(result['Rule'], categories=RULES)
+        result = result.sort_values(['Date', 'Shift', 'Rule'], kind='stable', ignore_index=True)
+        result['Rule'] = result['Rule'].astype(str)
+        return result
+
+
+def _hours(minutes):
+    return f"{minutes / 60:g}h"
+
+
+def validate_schedule(df, doctors=None, shift_config=None, constraints=None, rest_rules=None):
+    """Every rule violation in a schedule, as a DataFrame with VIOLATION_COLUMNS
+
+    doctors is the team; without it every member in the schedule counts as
+    on the team. shift_config, constraints and rest_rules default to the
+    session's. Row holds the schedule row's index label (missing for
+    coverage shortfalls, which belong to a slot rather than a row).
+    """
+    violations = _Violations()
+    if df.empty:
+        return violations.frame()
+
+    team = list(doctors) if doctors is not None else []
+    names = team + [name for name in pd.unique(df['Doctor']) if name not in set(team)]
+    codes = pd.Index(names).get_indexer(df['Doctor'])
+    labels = df.index.to_numpy()
+    dates = df['Date'].to_numpy(dtype=object)
+    shifts = df['Shift'].to_numpy(dtype=object)
+    members = df['Doctor'].to_numpy(dtype=object)
+    starts, ends = schedule_intervals(df)
+    hours = schedule_row_hours(df, shift_config)
+    days = starts // MINUTES_PER_DAY
+
+    def add(rule, rows, messages):
+        violations.add(dates[rows], shifts[rows], members[rows], rule, messages, labels[rows])
+
+    if doctors is not None:
+        unknown = np.flatnonzero(codes >= len(team))
+        add('unknown_member', unknown, ["not on the team"] * len(unknown))
+
+    # Pre-assignments and coverage, one month at a time
+    roles = np.array([get_member_role(name, constraints) for name in names], dtype=object)
+    month_codes, month_keys = pd.factorize(df['Date'].str[:7])
+    held = pd.MultiIndex.from_arrays([codes, dates, shifts])
+    for code, month_key in sorted(enumerate(month_keys), key=lambda item: item[1]):
+        year, month = int(month_key[:4]), int(month_key[5:7])
+        grid_dates, fixed, off = month_assignment_grid(names, year, month, constraints)
+        rows = np.flatnonzero(month_codes == code)
+        columns = days[rows] - (datetime(year, month, 1) - EPOCH).days
+
+        off_rows = rows[off[codes[rows], columns]]
+        add('day_off', off_rows, ["scheduled on a day off"] * len(off_rows))
+
+        pinned = fixed[codes[rows], columns]
+        wrong = np.not_equal(pinned, None) & (pinned != shifts[rows])
+        add('fixed_shift', rows[wrong], [f"fixed to {shift} that day" for shift in pinned[wrong]])
+
+        slots = get_month_slots(year, month, shift_config)
+        configured = {(slot.date, slot.template.name) for slot in slots}
+        m_index, c_index = np.nonzero(np.not_equal(fixed, None))
+        missing = [(m, grid_dates[c], fixed[m, c]) for m, c in zip(m_index.tolist(), c_index.tolist())
+                   if (grid_dates[c], fixed[m, c]) in configured]
+        if missing:
+            missing = [key for key, present in zip(missing, pd.MultiIndex.from_tuples(missing).isin(held)) if not present]
+        violations.add([d for _, d, _ in missing], [s for _, _, s in missing], [names[m] for m, _, _ in missing],
+                       'fixed_shift', ["fixed to this shift but not on it"] * len(missing), [None] * len(missing))
+
+        # Coverage: seats per slot, and seats per role where the shift asks for roles
+        in_month = pd.DataFrame({'Date': dates[rows], 'Shift': shifts[rows], 'Role': roles[codes[rows]]})
+        filled = in_month.groupby(['Date', 'Shift']).size().to_dict()
+        filled_roles = in_month.groupby(['Date', 'Shift', 'Role']).size().to_dict() if in_month['Role'].notna().any() else {}
+        for slot in slots:
+            template = slot.template
+            count = filled.get((slot.date, template.name), 0)
+            messages = []
+            if count < template.headcount:
+                messages.append(f"{count} of {template.headcount} seats filled")
+            for role, needed in template.roles:
+                role_count = filled_roles.get((slot.date, template.name, role), 0)
+                if role_count < needed:
+                    messages.append(f"{role_count} of {needed} {role} seats filled")
+            if messages:
+                violations.add([slot.date] * len(messages), [template.name] * len(messages), [None] * len(messages),
+                               'coverage', messages, [None] * len(messages))
+
+    # Neighbouring shifts of the same member, in start order
+    order = np.lexsort((starts, codes))
+    s_codes, s_starts, s_days, s_hours = codes[order], starts[order], days[order], hours[order]
+    rules = member_rest_rules(names, constraints, rest_rules)
+    min_rest = np.array([r.min_rest for r in rules], dtype=float)[s_codes]
+    max_days = np.array([r.max_days for r in rules], dtype=float)[s_codes]
+    max_window = np.array([r.max_window_hours for r in rules], dtype=float)[s_codes]
+
+    same_member = np.zeros(len(order), dtype=bool)
+    same_member[1:] = s_codes[1:] == s_codes[:-1]
+    # Latest end among the member's earlier shifts (a long shift can outlast the next one)
+    latest_end = pd.Series(ends[order]).groupby(s_codes).cummax().to_numpy()
+    previous_end = np.where(same_member, np.roll(latest_end, 1), np.iinfo(np.int64).min)
+    gap = s_starts - previous_end
+
+    doubled = same_member & np.concatenate([[False], s_days[1:] == s_days[:-1]])
+    rows = order[doubled]
+    add('double_booking', rows, [f"already works on {date}" for date in dates[rows]])
+
+    overlapping = same_member & (gap < 0)
+    rows = order[overlapping]
+    add('overlap', rows, [f"starts {_hours(-g)} before the previous shift ends" for g in gap[overlapping]])
+
+    short = same_member & (gap >= 0) & (gap < min_rest)
+    rows = order[short]
+    add('rest', rows, [f"only {_hours(g)} rest after the previous shift (minimum {_hours(m)})"
+                       for g, m in zip(gap[short], min_rest[short])])
+
+    # Consecutive working days: position of each member's working day within its run
+    first_of_day = ~(same_member & np.concatenate([[False], s_days[1:] == s_days[:-1]]))
+    day_rows = np.flatnonzero(first_of_day)
+    new_run = np.ones(len(day_rows), dtype=bool)
+    new_run[1:] = (s_codes[day_rows[1:]] != s_codes[day_rows[:-1]]) | (s_days[day_rows[1:]] != s_days[day_rows[:-1]] + 1)
+    run_id = np.cumsum(new_run) - 1
+    run_start = np.flatnonzero(new_run)
+    position = np.arange(len(day_rows)) - run_start[run_id] + 1
+    run_length = np.diff(np.append(run_start, len(day_rows)))[run_id]
+    over = position > max_days[day_rows]
+    rows = order[day_rows[over]]
+    add('consecutive_days', rows, [f"{length} consecutive working days (maximum {limit:g})"
+                                   for length, limit in zip(run_length[over], max_days[day_rows][over])])
+
+    # Hours in the trailing 7 days: shifts starting in (start - 7 days, start], per member
+    window = trailing_hours(s_codes, s_starts, s_hours)
+    heavy = window > max_window
+    rows = order[heavy]
+    add('hours_7_days', rows, [f"{h:g}h in 7 days (maximum {limit:g}h)"
+                               for h, limit in zip(window[heavy], max_window[heavy])])
+
+    return violations.frame()
+
+
+def validate_changes(df, changes, doctors=None, shift_config=None, constraints=None, rest_rules=None, before=None):
+    """Violations that reassigning slots (a mapping or Series slot -> member) would introduce
+
+    The changed schedule is validated once as a whole and compared with the
+    current one (pass before, its validate_schedule result, to skip
+    revalidating it). Violations are matched on date, shift, member and rule.
+    """
+    if before is None:
+        before = validate_schedule(df, doctors, shift_config, constraints, rest_rules)
+    after = validate_schedule(with_assignments(df, dict(changes)), doctors, shift_config, constraints, rest_rules)
+    keys = ['Date', 'Shift', 'Doctor', 'Rule']
+    existing = pd.MultiIndex.from_frame(before[keys].astype(object))
+    return after[~pd.MultiIndex.from_frame(after[keys].astype(object)).isin(existing)].reset_index(drop=True)
+
+
+def load_config(path):
+    """Team, shift config, constraints and rest rules from an export_config YAML file"""
+    import yaml
+
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    constraints = config.get('constraints') or {}
+    for doctor_constraints in constraints.values():
+        if isinstance(doctor_constraints, dict) and doctor_constraints.get('unavailable'):
+            doctor_constraints['unavailable'] = [normalize_unavailability(rule)
+                                                 for rule in doctor_constraints['unavailable']]
+    for member, rotation in expand_rotation_groups(config.get('rotation_groups') or {}).items():
+        constraints.setdefault(member, {})['rotation'] = rotation
+    return (config.get('team_members') or None, config.get('shift_configuration') or DEFAULT_SHIFTS,
+            constraints, config.get('rest_rules') or {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check a schedule against every team rule")
+    parser.add_argument('schedule', help="Schedule exported as CSV")
+    parser.add_argument('--config', required=True, help="Configuration YAML (export_config format)")
+    parser.add_argument('--ignore', action='append', default=[], choices=RULES, help="Rule to skip (repeatable)")
+    parser.add_argument('--csv', help="Also write the violations to this file")
+    args = parser.parse_args()
+
+    doctors, shift_config, constraints, rest_rules = load_config(args.config)
+    df = pd.read_csv(args.schedule, dtype={'Start_Time': str, 'End_Time': str})
+    violations = validate_schedule(df, doctors, shift_config, constraints, rest_rules)
+    violations = violations[~violations['Rule'].isin(args.ignore)]
+
+    for v in violations.itertuples(index=False):
+        print(f"{v.Date}\t{v.Shift}\t{v.Doctor or '-'}\t{v.Rule}\t{v.Message}")
+    counts = violations['Rule'].value_counts()
+    summary = ", ".join(f"{counts[rule]} {rule}" for rule in RULES if rule in counts)
+    print(f"{len(violations)} violations in {len(df)} rows" + (f": {summary}" if summary else ""))
+
+    if args.csv:
+        violations.to_csv(args.csv, index=False)
+    return 1 if len(violations) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,40 @@
-import streamlit as st
+import copy
+import importlib
+import hashlib
+import json
 import pandas as pd
 import random
 from datetime import datetime, timedelta
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque, namedtuple
+from functools import lru_cache
 import calendar
 import numpy as np
-import yaml
 import time
-from io import BytesIO
-from openpyxl.styles import Alignment
+
+from metrics import (CONFIG_IMPORT_BYTES, CONFIG_IMPORT_MEMBERS, CONFIG_IMPORTS, DOUBLE_BOOKINGS,
+                     FALLBACK_SEATS, GENERATION_SECONDS, IMPROVE_SECONDS, REMAINING_DOUBLE_BOOKINGS)
+
+
+class _LazyModule:
+    """Module stand-in that imports the real module on first attribute access.
+
+    Keeps heavy optional dependencies (streamlit, yaml) out of the import path
+    of callers that only need the scheduling core.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+st = _LazyModule('streamlit')
+yaml = _LazyModule('yaml')
 
 # Default configuration
 DEFAULT_DOCTORS = ["Chen", "Patel", "Johnson", "Okafor", "Valdez"]
@@ -60,9 +86,13 @@ def init_session():
     if 'doctor_colors' not in st.session_state:
         st.session_state.doctor_colors = {}
     if 'shift_config' not in st.session_state:
-        st.session_state.shift_config = DEFAULT_SHIFTS.copy()
+        st.session_state.shift_config = copy.deepcopy(DEFAULT_SHIFTS)
     if 'constraints' not in st.session_state:
         st.session_state.constraints = {}
+    if 'fairness' not in st.session_state:
+        st.session_state.fairness = {}
+    if 'rest_rules' not in st.session_state:
+        st.session_state.rest_rules = {}
     if 'schedule_df' not in st.session_state:
         st.session_state.schedule_df = pd.DataFrame()
     if 'schedule_generated' not in st.session_state:
@@ -93,29 +123,510 @@ def get_shifts_for_day(date):
     day_name = date.strftime("%A")
     return st.session_state.shift_config.get(day_name, {})
 
-def get_doctor_constraints(doctor, year, month):
-    """Get constraints for a doctor in a specific month"""
+# Compiled shift templates: each configured shift parsed once into minute offsets
+ShiftTemplate = namedtuple('ShiftTemplate', [
+    'template_id', 'day', 'name', 'start', 'end',
+    'start_minute', 'end_minute', 'duration', 'overnight', 'night', 'hours', 'headcount', 'roles'
+])
+CompiledShiftConfig = namedtuple('CompiledShiftConfig', ['config_hash', 'templates', 'by_day', 'lookup'])
+ShiftSlot = namedtuple('ShiftSlot', ['date', 'day', 'template', 'start_abs', 'end_abs'])
+
+EPOCH = datetime(1970, 1, 1)
+MINUTES_PER_DAY = 24 * 60
+NIGHT_START, NIGHT_END = 22 * 60, 6 * 60  # 22:00-06:00
+
+@lru_cache(maxsize=None)
+def parse_time(value):
+    """Parse "HH:MM" into minutes after midnight"""
+    if isinstance(value, int):
+        # Unquoted HH:MM in YAML 1.1 loads as a base-60 integer, i.e. minutes already
+        return value
+    hour, minute = map(int, value.split(':'))
+    return hour * 60 + minute
+
+@lru_cache(maxsize=None)
+def shift_interval(start, end):
+    """Return (start_minute, end_minute) for a shift; overnight shifts end past 1440"""
+    start_minute = parse_time(start)
+    end_minute = parse_time(end)
+    if end_minute <= start_minute:
+        end_minute += MINUTES_PER_DAY
+    return start_minute, end_minute
+
+def night_minutes(start_minute, end_minute):
+    """Minutes of a shift that fall between NIGHT_START and NIGHT_END"""
+    length = NIGHT_END + MINUTES_PER_DAY - NIGHT_START
+    total = 0
+    for window_start in (NIGHT_START - MINUTES_PER_DAY, NIGHT_START, NIGHT_START + MINUTES_PER_DAY):
+        total += max(0, min(end_minute, window_start + length) - max(start_minute, window_start))
+    return total
+
+def shift_config_key(shift_config):
+    """Canonical string form of a shift config (keeps day and shift order)"""
+    return json.dumps(shift_config, default=str)
+
+def shift_config_hash(shift_config):
+    """Short content hash identifying a shift config"""
+    return hashlib.sha1(shift_config_key(shift_config).encode('utf-8')).hexdigest()[:16]
+
+@lru_cache(maxsize=32)
+def _compile_shift_config(config_key):
+    shift_config = json.loads(config_key)
+    templates = []
+    by_day = {}
+
+    for day_name, day_shifts in shift_config.items():
+        day_templates = []
+        for shift_name, shift_data in (day_shifts or {}).items():
+            start_minute, end_minute = shift_interval(shift_data['start'], shift_data['end'])
+            duration = end_minute - start_minute
+            # Optional role mix, e.g. {"attending": 1, "nurse": 2}; headcount defaults to its total
+            roles = tuple((shift_data.get('roles') or {}).items())
+            headcount = shift_data.get('headcount', sum(count for _, count in roles) or 1)
+            template = ShiftTemplate(
+                template_id=len(templates),
+                day=day_name,
+                name=shift_name,
+                start=shift_data['start'],
+                end=shift_data['end'],
+                start_minute=start_minute,
+                end_minute=end_minute,
+                duration=duration,
+                overnight=end_minute > MINUTES_PER_DAY,
+                # Night shift: at least half of it between 22:00 and 06:00, unless set explicitly
+                night=bool(shift_data.get('night', 2 * night_minutes(start_minute, end_minute) >= duration)),
+                hours=shift_data.get('hours', duration / 60),
+                headcount=max(int(headcount), 1),
+                roles=roles,
+            )
+            templates.append(template)
+            day_templates.append(template)
+        by_day[day_name] = tuple(day_templates)
+
+    lookup = {(t.day, t.name): t for t in templates}
+    config_hash = hashlib.sha1(config_key.encode('utf-8')).hexdigest()[:16]
+    return CompiledShiftConfig(config_hash, tuple(templates), by_day, lookup)
+
+def compile_shift_config(shift_config=None):
+    """Compile a shift config (defaults to the session's) into ShiftTemplates"""
+    if shift_config is None:
+        shift_config = st.session_state.shift_config
+    return _compile_shift_config(shift_config_key(shift_config))
+
+@lru_cache(maxsize=128)
+def _month_slots(year, month, config_key):
+    compiled = _compile_shift_config(config_key)
+    slots = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        date = datetime(year, month, day)
+        day_name = date.strftime("%A")
+        day_start = (date - EPOCH).days * MINUTES_PER_DAY
+        # In start order whatever the config order, so each slot sees every earlier one first
+        for template in sorted(compiled.by_day.get(day_name, ()), key=lambda t: t.start_minute):
+            slots.append(ShiftSlot(
+                date=date.strftime("%Y-%m-%d"),
+                day=day_name,
+                template=template,
+                start_abs=day_start + template.start_minute,
+                end_abs=day_start + template.end_minute,
+            ))
+    return tuple(slots)
+
+def get_month_slots(year, month, shift_config=None):
+    """Shift slots for a month in start order, cached per (year, month, config)"""
+    if shift_config is None:
+        shift_config = st.session_state.shift_config
+    return _month_slots(year, month, shift_config_key(shift_config))
+
+def _distinct_rows(df, columns):
+    """Code of each row's combination of columns, and the distinct combinations as tuples"""
+    if df.empty:
+        return np.empty(0, dtype=np.int64), []
+    codes, combinations = pd.MultiIndex.from_arrays([df[column] for column in columns]).factorize()
+    return codes, list(combinations)
+
+def schedule_intervals(df):
+    """Absolute (start, end) minutes since the epoch for every schedule row
+
+    Dates and shift times are parsed once per distinct value, not per row.
+    """
+    date_codes, date_values = _distinct_rows(df, ['Date'])
+    day_start = ((pd.to_datetime([date for date, in date_values]) - EPOCH).days.to_numpy(dtype=np.int64)
+                 * MINUTES_PER_DAY)[date_codes]
+    time_codes, times = _distinct_rows(df, ['Start_Time', 'End_Time'])
+    offsets = np.array([shift_interval(start, end) for start, end in times], dtype=np.int64).reshape(-1, 2)[time_codes]
+    return day_start + offsets[:, 0], day_start + offsets[:, 1]
+
+def schedule_row_hours(df, shift_config=None):
+    """Configured hours for every schedule row (shift duration if the shift isn't configured)"""
+    lookup = compile_shift_config(shift_config).lookup
+    codes, shifts = _distinct_rows(df, ['Day', 'Shift', 'Start_Time', 'End_Time'])
+    hours = []
+    for day_name, shift_name, start, end in shifts:
+        template = lookup.get((day_name, shift_name))
+        if template is not None:
+            hours.append(template.hours)
+        else:
+            start_minute, end_minute = shift_interval(start, end)
+            hours.append((end_minute - start_minute) / 60)
+    return np.array(hours, dtype=float)[codes]
+
+def trailing_hours(codes, starts, hours, window=None):
+    """Hours of each member's shifts starting in the window (default 7 days) up to and including each shift's start
+
+    Inputs are per-row arrays sorted by member code, then start.
+    """
+    if window is None:
+        window = REST_WINDOW
+    keys = np.asarray(codes, dtype=np.int64) * (1 << 40) + starts
+    cumulative = np.concatenate([[0.0], np.cumsum(hours)])
+    return (cumulative[np.searchsorted(keys, keys, side='right')]
+            - cumulative[np.searchsorted(keys, keys - window, side='right')])
+
+def schedule_hours(df, shift_config=None):
+    """Total configured hours per doctor for a schedule"""
+    hours = schedule_row_hours(df, shift_config)
+    return pd.Series(hours, index=df.index, dtype=float).groupby(df['Doctor']).sum()
+
+# Fairness: every assignment adds load along these dimensions; the scheduler
+# keeps each member's load proportional to their target ratio
+FAIRNESS_DIMENSIONS = ('shifts', 'hours', 'nights', 'weekends', 'holidays')
+DEFAULT_FAIRNESS = {
+    'weights': {dimension: 1.0 for dimension in FAIRNESS_DIMENSIONS},
+    'weekend_days': ['Saturday', 'Sunday'],
+    'holidays': [],
+}
+MIN_TARGET = 0.01  # A target of 0 keeps a member off that dimension unless nobody else can take it
+
+def get_fairness(fairness=None):
+    """Fairness settings (from the session unless given) filled in from DEFAULT_FAIRNESS"""
+    if fairness is None:
+        fairness = st.session_state.fairness
+    fairness = fairness or {}
+    return {
+        'weights': {dimension: float(weight) for dimension, weight
+                    in dict(DEFAULT_FAIRNESS['weights'], **(fairness.get('weights') or {})).items()},
+        'weekend_days': list(fairness.get('weekend_days') or DEFAULT_FAIRNESS['weekend_days']),
+        'holidays': [(EPOCH + timedelta(days=_epoch_day(d))).strftime('%Y-%m-%d') for d in fairness.get('holidays') or []],
+    }
+
+def fairness_targets(doctors, constraints=None):
+    """Target share per member and dimension (members x dimensions), 1.0 being a full share
+
+    A member's 'target' constraint is either one ratio for every dimension
+    (0.5 for a half-time member) or a mapping per dimension, e.g.
+    {nights: 0, weekends: 0.5}, with unlisted dimensions at 1.0.
+    """
+    if constraints is None:
+        constraints = st.session_state.constraints
+    targets = np.ones((len(doctors), len(FAIRNESS_DIMENSIONS)))
+    for m, doctor in enumerate(doctors):
+        target = (constraints.get(doctor) or {}).get('target')
+        if isinstance(target, dict):
+            targets[m] = [float(target.get(dimension, 1.0)) for dimension in FAIRNESS_DIMENSIONS]
+        elif target is not None:
+            targets[m] = float(target)
+    return np.maximum(targets, MIN_TARGET)
+
+def fairness_costs(doctors, constraints=None, fairness=None):
+    """Weight over target per member and dimension; a member's fairness cost is sum(cost * load ** 2)"""
+    weights = get_fairness(fairness)['weights']
+    weight_row = np.array([float(weights[dimension]) for dimension in FAIRNESS_DIMENSIONS])
+    return weight_row / fairness_targets(doctors, constraints)
+
+def _contributions(hours, night, day_names, dates, fairness, mean_hours):
+    """Load per assignment and dimension, with hours scaled so an average assignment counts 1"""
+    hours = np.asarray(hours, dtype=float)
+    mean_hours = mean_hours if mean_hours > 0 else 1.0
+    weekend_days = set(fairness['weekend_days'])
+    holidays = set(fairness['holidays'])
+    return np.column_stack([
+        np.ones(len(hours)),
+        hours / mean_hours,
+        np.asarray(night, dtype=float),
+        np.fromiter((day in weekend_days for day in day_names), dtype=float, count=len(hours)),
+        np.fromiter((date_str in holidays for date_str in dates), dtype=float, count=len(hours)),
+    ]) if len(hours) else np.zeros((0, len(FAIRNESS_DIMENSIONS)))
+
+def slot_contributions(slots, fairness=None):
+    """Load each seat of a slot adds, per fairness dimension (slots x dimensions)
+
+    Hours are scaled by the mean over all seats, matching
+    schedule_contributions for the schedule generated from these slots.
+    """
+    hours = [slot.template.hours for slot in slots]
+    seats = [slot.template.headcount for slot in slots]
+    mean_hours = np.average(hours, weights=seats) if slots else 1.0
+    return _contributions(hours, [slot.template.night for slot in slots], [slot.day for slot in slots],
+                          [slot.date for slot in slots], get_fairness(fairness), mean_hours)
+
+def schedule_contributions(df, shift_config=None, fairness=None):
+    """Load each schedule row adds to its member, per fairness dimension (rows x dimensions)"""
+    fairness = get_fairness(fairness)
+    lookup = compile_shift_config(shift_config).lookup
+    night = []
+    for day_name, shift_name, start, end in zip(df['Day'], df['Shift'], df['Start_Time'], df['End_Time']):
+        template = lookup.get((day_name, shift_name))
+        if template is not None:
+            night.append(template.night)
+        else:
+            start_minute, end_minute = shift_interval(start, end)
+            night.append(2 * night_minutes(start_minute, end_minute) >= end_minute - start_minute)
+    hours = schedule_row_hours(df, shift_config)
+    return _contributions(hours, night, df['Day'], df['Date'], fairness, hours.mean() if len(hours) else 1.0)
+
+def fairness_loads(df, doctors, shift_config=None, fairness=None):
+    """Shifts, hours, nights, weekends and holidays worked per member"""
+    contributions = schedule_contributions(df, shift_config, fairness)
+    loads = pd.DataFrame(contributions, columns=[d.capitalize() for d in FAIRNESS_DIMENSIONS], index=df.index)
+    loads['Hours'] = schedule_row_hours(df, shift_config)
+    return loads.groupby(df['Doctor']).sum().reindex(doctors, fill_value=0)
+
+# Rest rules: minimum rest between shifts, maximum consecutive working days
+# and maximum hours in any rolling 7 days. A rule set to 0 or null is off.
+DEFAULT_REST_RULES = {
+    'min_rest_hours': 11,
+    'max_consecutive_days': None,
+    'max_hours_7_days': None,
+}
+REST_WINDOW = 7 * MINUTES_PER_DAY
+RestRules = namedtuple('RestRules', ['min_rest', 'max_days', 'max_window_hours'])  # minutes, days, hours
+
+def _rest_rule_values(rest_rules):
+    """Validated rest rule values as floats (None for rules that are off)"""
+    values = {}
+    for name, value in (rest_rules or {}).items():
+        if name not in DEFAULT_REST_RULES:
+            raise ValueError(f"Unknown rest rule {name!r}")
+        if value is not None and float(value) < 0:
+            raise ValueError(f"{name} can't be negative")
+        values[name] = float(value) if value else None
+    return values
+
+def get_rest_rules(rest_rules=None):
+    """Team rest rules (from the session unless given) filled in from DEFAULT_REST_RULES"""
+    if rest_rules is None:
+        rest_rules = st.session_state.rest_rules
+    return dict(DEFAULT_REST_RULES, **_rest_rule_values(rest_rules))
+
+def member_rest_rules(doctors, constraints=None, rest_rules=None):
+    """RestRules per member: the team rules with any 'rest' overrides from the member's constraints"""
+    if constraints is None:
+        constraints = st.session_state.constraints
+    team_rules = get_rest_rules(rest_rules)
+    result = []
+    for doctor in doctors:
+        rules = dict(team_rules, **_rest_rule_values((constraints.get(doctor) or {}).get('rest')))
+        result.append(RestRules(
+            min_rest=rules['min_rest_hours'] * 60 if rules['min_rest_hours'] else 0,
+            max_days=int(rules['max_consecutive_days']) if rules['max_consecutive_days'] else np.inf,
+            max_window_hours=rules['max_hours_7_days'] or np.inf,
+        ))
+    return result
+
+class RestTracker:
+    """Rolling per-member state for checking rest rules while assigning shifts in time order
+
+    Keeps each member's latest shift, current run of working days and hours
+    in the trailing 7 days. The 7-day totals are maintained through one FIFO
+    of assignments that expire as time moves on, so checking all members for
+    a slot and recording an assignment are O(1) amortized per member.
+    """
+
+    def __init__(self, rules):
+        n = len(rules)
+        self.min_rest = np.array([r.min_rest for r in rules], dtype=float)
+        self.max_days = np.array([r.max_days for r in rules], dtype=float)
+        self.max_window_hours = np.array([r.max_window_hours for r in rules], dtype=float)
+        self.last_start = np.full(n, -np.inf)
+        self.last_end = np.full(n, -np.inf)
+        self.last_day = np.full(n, -2, dtype=np.int64)
+        self.streak = np.zeros(n, dtype=np.int64)
+        self.window_hours = np.zeros(n)
+        self._window = deque()  # (start, member, hours) in assignment order
+
+    def _expire(self, start):
+        window = self._window
+        while window and window[0][0] <= start - REST_WINDOW:
+            _, member, hours = window.popleft()
+            self.window_hours[member] -= hours
+
+    def allowed(self, start, end, hours):
+        """Members who can take a shift from start to end (absolute minutes) without breaking a rule"""
+        self._expire(start)
+        day = start // MINUTES_PER_DAY
+        rested = (start >= self.last_end + self.min_rest) | (end + self.min_rest <= self.last_start)
+        streak = np.where(self.last_day == day, self.streak, np.where(self.last_day == day - 1, self.streak + 1, 1))
+        return rested & (streak <= self.max_days) & (self.window_hours + hours <= self.max_window_hours)
+
+    def assign(self, members, start, end, hours):
+        """Record that members took a shift from start to end"""
+        day = start // MINUTES_PER_DAY
+        for member in members.tolist():
+            if self.last_day[member] != day:
+                self.streak[member] = self.streak[member] + 1 if self.last_day[member] == day - 1 else 1
+                self.last_day[member] = day
+            self.last_start[member] = max(self.last_start[member], start)
+            self.last_end[member] = max(self.last_end[member], end)
+            self.window_hours[member] += hours
+            self._window.append((start, member, hours))
+
+class MemberTimeline:
+    """One member's shifts as start-sorted lists, for checking one more shift against rest rules
+
+    Breaks are counted so that adding shifts one at a time sums to the
+    total: pairs of neighbouring shifts with too little rest between them,
+    days beyond the limit in each run of consecutive working days, and
+    shifts whose trailing 7 days (their own start included) go over the
+    hours limit.
+    """
+
+    __slots__ = ('starts', 'ends', 'hours', 'rows')
+
+    def __init__(self):
+        self.starts, self.ends, self.hours, self.rows = [], [], [], []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add(self, start, end, hours, row):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.hours.insert(i, hours)
+        self.rows.insert(i, row)
+
+    def remove(self, row):
+        i = self.rows.index(row)
+        del self.starts[i], self.ends[i], self.hours[i], self.rows[i]
+
+    def without(self, row):
+        """Copy of this timeline without a row"""
+        timeline = MemberTimeline()
+        timeline.starts, timeline.ends, timeline.hours, timeline.rows = (
+            self.starts[:], self.ends[:], self.hours[:], self.rows[:])
+        timeline.remove(row)
+        return timeline
+
+    def _window_hours(self, at):
+        """Hours of shifts starting in the 7 days up to and including minute at"""
+        return sum(self.hours[bisect_right(self.starts, at - REST_WINDOW):bisect_right(self.starts, at)])
+
+    def _breaks(self, start, end, hours, rules):
+        """Details of what a shift from start to end would break, and how many breaks it adds"""
+        starts, ends = self.starts, self.ends
+        i = bisect_right(starts, start)
+        details = {}
+        added = 0
+
+        if rules.min_rest:
+            before = start - ends[i - 1] if i > 0 else None
+            after = starts[i] - end if i < len(starts) else None
+            if before is not None and before < rules.min_rest:
+                details['before'] = before
+            if after is not None and after < rules.min_rest:
+                details['after'] = after
+            # Between two neighbours that were already too close, one break is replaced by two
+            bridged = 0 < i < len(starts) and starts[i] - ends[i - 1] < rules.min_rest
+            added += len(details) - bridged
+
+        if rules.max_days < np.inf:
+            day = start // MINUTES_PER_DAY
+            worked = {s // MINUTES_PER_DAY for s in starts[bisect_left(starts, (day - rules.max_days - 1) * MINUTES_PER_DAY):
+                                                            bisect_left(starts, (day + rules.max_days + 2) * MINUTES_PER_DAY)]}
+            if day not in worked:
+                left = next(k for k in range(int(rules.max_days) + 2) if day - 1 - k not in worked)
+                right = next(k for k in range(int(rules.max_days) + 2) if day + 1 + k not in worked)
+                run = left + right + 1
+                over = max(run - rules.max_days, 0) - max(left - rules.max_days, 0) - max(right - rules.max_days, 0)
+                if over > 0:
+                    details['days'] = run
+                    added += int(over)
+
+        if rules.max_window_hours < np.inf:
+            limit = rules.max_window_hours
+            worst = self._window_hours(start) + hours
+            added += worst > limit
+            for j in range(i, bisect_left(starts, start + REST_WINDOW)):
+                before = self._window_hours(starts[j])
+                worst = max(worst, before + hours)
+                added += before <= limit < before + hours
+            if worst > limit:
+                details['window'] = worst
+        return details, added
+
+    def rest_breaks(self, start, end, hours, rules):
+        """How many rest rule breaks a shift from start to end would add"""
+        return self._breaks(start, end, hours, rules)[1]
+
+    def conflicts(self, start, end, hours, rules):
+        """Rest rules a shift from start to end would break, as messages (empty if none)"""
+        details = self._breaks(start, end, hours, rules)[0]
+        minimum = rules.min_rest / 60
+        messages = []
+        if 'before' in details:
+            messages.append(f"only {max(details['before'], 0) / 60:g}h rest after the previous shift (minimum {minimum:g}h)")
+        if 'after' in details:
+            messages.append(f"only {max(details['after'], 0) / 60:g}h rest before the next shift (minimum {minimum:g}h)")
+        if 'days' in details:
+            messages.append(f"{details['days']} consecutive working days (maximum {rules.max_days:g})")
+        if 'window' in details:
+            messages.append(f"{details['window']:g}h in 7 days (maximum {rules.max_window_hours:g}h)")
+        return messages
+
+def member_timelines(df, shift_config=None):
+    """MemberTimeline per member of a schedule"""
+    timelines = defaultdict(MemberTimeline)
+    starts, ends = schedule_intervals(df)
+    hours = schedule_row_hours(df, shift_config)
+    for row, doctor, start, end, row_hours in zip(df.index, df['Doctor'], starts.tolist(), ends.tolist(), hours.tolist()):
+        timelines[doctor].add(start, end, row_hours, row)
+    return timelines
+
+def rest_conflicts(df, row, member, shift_config=None, constraints=None, rest_rules=None, timelines=None):
+    """Rest rules broken by giving a schedule row to member, as messages
+
+    If member already holds the row it is checked against their other
+    shifts. Pass timelines (from member_timelines) to check many rows of the
+    same schedule without rebuilding them; they are not modified.
+    """
+    if timelines is None:
+        timelines = member_timelines(df, shift_config)
+    timeline = timelines.get(member) or MemberTimeline()
+    if row in timeline.rows:
+        timeline = timeline.without(row)
+    start, end = schedule_intervals(df.loc[[row]])
+    hours = float(schedule_row_hours(df.loc[[row]], shift_config)[0])
+    rules = member_rest_rules([member], constraints, rest_rules)[0]
+    return timeline.conflicts(int(start[0]), int(end[0]), hours, rules)
+
+def get_doctor_constraints(doctor, year, month, constraints=None):
+    """Get constraints for a doctor in a specific month (from the session unless constraints is given)"""
     month_key = f"{year}-{month:02d}"
-    doctor_constraints = st.session_state.constraints.get(doctor, {})
+    if constraints is None:
+        constraints = st.session_state.constraints
+    doctor_constraints = constraints.get(doctor, {})
 
-    constraints = {
+    return {
         'fixed_shifts': doctor_constraints.get('fixed_shifts', {}),  # Day of week based
         'days_off': doctor_constraints.get(month_key, {}).get('days_off', []),  # Month specific
     }
 
-    return constraints
-
 def is_available(doctor, date_str, shift_name, year, month):
     """Check if doctor is available"""
     constraints = get_doctor_constraints(doctor, year, month)
 
-    # Check days off
-    days_off = constraints.get('days_off', [])
-    if days_off and date_str in days_off:
+    # Check days off and unavailable periods
+    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    if member_unavailability([doctor], date_obj, 1)[0, 0]:
         return False
 
+    # Rotations take precedence over the weekly pattern
+    rotation = expand_rotations([doctor], date_obj, 1)[0, 0]
+    if rotation is not None:
+        return rotation == shift_name
+
     # Check fixed shifts by day of week
-    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
     day_of_week = date_obj.strftime('%A')
     fixed_shifts = constraints.get('fixed_shifts', {})
 
@@ -128,75 +639,881 @@ def get_fixed_shift(doctor, date_str, year, month):
     """Get fixed shift for doctor on date"""
     constraints = get_doctor_constraints(doctor, year, month)
 
-    # Check fixed shifts by day of week
+    # Rotations take precedence over the weekly pattern
     date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    rotation = expand_rotations([doctor], date_obj, 1)[0, 0]
+    if rotation is not None:
+        return None if rotation == ROTATION_OFF else rotation
+
+    # Check fixed shifts by day of week
     day_of_week = date_obj.strftime('%A')
     fixed_shifts = constraints.get('fixed_shifts', {})
 
     return fixed_shifts.get(day_of_week)
 
-def generate_schedule(year, month, doctors):
-    """Generate monthly schedule"""
-    days_in_month = calendar.monthrange(year, month)[1]
-    doctor_shifts = {doctor: 0 for doctor in doctors}
-    daily_assignments = defaultdict(set)
-
-    # Create shift slots
-    shifts = []
-    for day in range(1, days_in_month + 1):
-        date = datetime(year, month, day)
-        date_str = date.strftime("%Y-%m-%d")
-        day_shifts = get_shifts_for_day(date)
-
-        for shift_name, shift_data in day_shifts.items():
-            shifts.append({
-                'Date': date_str,
-                'Day': date.strftime("%A"),
-                'Shift': shift_name,
-                'Start_Time': shift_data['start'],
-                'End_Time': shift_data['end'],
-                'Doctor': None
-            })
-
-    # Sort by date
-    shifts.sort(key=lambda x: x['Date'])
-
-    # Assign shifts
-    for shift in shifts:
-        date_str = shift['Date']
-        shift_name = shift['Shift']
-
-        # Check for fixed assignments first
-        fixed_doctor = None
-        for doctor in doctors:
-            if get_fixed_shift(doctor, date_str, year, month) == shift_name:
-                fixed_doctor = doctor
+def get_member_role(doctor, constraints=None):
+    """Get the role of a team member (None if not set)"""
+    if constraints is None:
+        constraints = st.session_state.constraints
+    return constraints.get(doctor, {}).get('role')
+
+ROTATION_OFF = 'off'
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+@lru_cache(maxsize=4096)
+def _epoch_day(value):
+    """Days since 1970-01-01 for a date, datetime or "YYYY-MM-DD" string"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d')
+    return (datetime(value.year, value.month, value.day) - EPOCH).days
+
+def _rotation_entry(value):
+    """Normalise a rotation pattern entry (unquoted off loads from YAML as False)"""
+    if value is False or (isinstance(value, str) and value.lower() == ROTATION_OFF):
+        return ROTATION_OFF
+    return value or None
+
+def expand_rotations(doctors, start_date, n_days, constraints=None):
+    """Tile every member's rotation over n_days starting at start_date
+
+    A rotation is a cycle of shift names ("off" for a rest day, null for a
+    day left to the scheduler) that starts on its anchor date. All members
+    are tiled at once by indexing the padded patterns with
+    (day - anchor) % cycle length. Returns an object array (members x days)
+    holding the shift name, "off" or None.
+    """
+    if constraints is None:
+        constraints = st.session_state.constraints
+    result = np.full((len(doctors), max(n_days, 0)), None, dtype=object)
+    rotating = [(m, constraints.get(d, {}).get('rotation')) for m, d in enumerate(doctors)]
+    rotating = [(m, r) for m, r in rotating if r and r.get('pattern') and r.get('anchor')]
+    if not rotating or n_days <= 0:
+        return result
+
+    codes = {None: 0}
+    lengths = np.array([len(r['pattern']) for _, r in rotating])
+    patterns = np.zeros((len(rotating), lengths.max()), dtype=np.int32)
+    for i, (_, rotation) in enumerate(rotating):
+        patterns[i, :lengths[i]] = [codes.setdefault(_rotation_entry(value), len(codes)) for value in rotation['pattern']]
+    names = np.empty(len(codes), dtype=object)
+    names[:] = list(codes)
+
+    anchors = np.array([_epoch_day(r['anchor']) for _, r in rotating])
+    since_anchor = (_epoch_day(start_date) - anchors)[:, None] + np.arange(n_days)
+    tiled = patterns[np.arange(len(rotating))[:, None], since_anchor % lengths[:, None]]
+    tiled[since_anchor < 0] = 0  # Rotations start on their anchor date
+    result[[m for m, _ in rotating]] = names[tiled]
+    return result
+
+def expand_rotation_groups(groups):
+    """Per-member rotations for rotation groups
+
+    Each group has a pattern, an anchor and members; member i starts
+    i * stagger days after the anchor (stagger 0 keeps everyone in step).
+    """
+    rotations = {}
+    for group_name, group in groups.items():
+        anchor = _epoch_day(group['anchor'])
+        for i, member in enumerate(group.get('members', [])):
+            start = EPOCH + timedelta(days=anchor + i * group.get('stagger', 0))
+            rotations[member] = {
+                'group': group_name,
+                'anchor': start.strftime('%Y-%m-%d'),
+                'pattern': list(group['pattern']),
+            }
+    return rotations
+
+ORDINALS = {1: '1st', 2: '2nd', 3: '3rd', 4: '4th', 5: '5th', -1: 'last'}
+
+def normalize_unavailability(rule):
+    """Validate an unavailability rule and return it with ISO date strings
+
+    A rule is a date range {from, to} (to defaults to from), a weekly rule
+    {weekday, every, anchor} (every N weeks counted from the anchor's week)
+    or a monthly rule {weekday, nth} (nth weekday of each month, -1 for the
+    last). Recurring rules may cover several days from the matching day
+    (days: 2 on a Saturday is the weekend) and be bounded by from/to. Any
+    other keys, such as reason, are kept as they are.
+    """
+    if not isinstance(rule, dict):
+        raise ValueError(f"Unavailability rule must be a mapping, got {rule!r}")
+    rule = dict(rule)
+    for key in ('from', 'to', 'anchor'):
+        if rule.get(key) is not None:
+            rule[key] = (EPOCH + timedelta(days=_epoch_day(rule[key]))).strftime('%Y-%m-%d')
+
+    if 'weekday' not in rule:
+        if not rule.get('from'):
+            raise ValueError(f"Date range needs a 'from' date: {rule}")
+        if rule.get('to') and rule['to'] < rule['from']:
+            raise ValueError(f"Date range ends before it starts: {rule}")
+        return rule
+
+    weekday = str(rule['weekday']).capitalize()
+    if weekday not in WEEKDAY_NAMES:
+        raise ValueError(f"Unknown weekday {rule['weekday']!r}")
+    rule['weekday'] = weekday
+    if int(rule.get('days', 1)) < 1:
+        raise ValueError(f"'days' must be at least 1: {rule}")
+    if 'nth' in rule:
+        if rule['nth'] not in ORDINALS:
+            raise ValueError(f"'nth' must be 1-5 or -1: {rule}")
+    elif int(rule.get('every', 1)) < 1:
+        raise ValueError(f"'every' must be at least 1: {rule}")
+    elif int(rule.get('every', 1)) > 1 and not (rule.get('anchor') or rule.get('from')):
+        raise ValueError(f"Rules repeating every few weeks need an 'anchor' date: {rule}")
+    return rule
+
+def describe_unavailability(rule):
+    """Short human-readable form of an unavailability rule"""
+    if 'weekday' not in rule:
+        text = rule['from'] if rule.get('to', rule['from']) == rule['from'] else f"{rule['from']} to {rule['to']}"
+    else:
+        if 'nth' in rule:
+            text = f"{ORDINALS[rule['nth']]} {rule['weekday']} of each month"
+        elif int(rule.get('every', 1)) > 1:
+            text = f"{rule['weekday']} every {rule['every']} weeks from {rule.get('anchor') or rule['from']}"
+        else:
+            text = f"Every {rule['weekday']}"
+        if int(rule.get('days', 1)) > 1:
+            text += f" ({rule['days']} days)"
+        if rule.get('from') and f"from {rule['from']}" not in text:
+            text += f" from {rule['from']}"
+        if rule.get('to'):
+            text += f" until {rule['to']}"
+    if rule.get('reason'):
+        text += f" ({rule['reason']})"
+    return text
+
+def _rule_mask(rule, first_day, n_days):
+    """Days covered by one unavailability rule over n_days from epoch day first_day"""
+    days = first_day + np.arange(n_days)
+    low = _epoch_day(rule['from']) if rule.get('from') else None
+    high = _epoch_day(rule['to']) if rule.get('to') else None
+
+    if 'weekday' not in rule:
+        high = low if high is None else high
+        return (days >= low) & (days <= high)
+
+    # Find the days each occurrence starts on, reaching back far enough to cover multi-day spans
+    span = int(rule.get('days', 1))
+    starts = first_day - (span - 1) + np.arange(n_days + span - 1)
+    weekday = WEEKDAY_NAMES.index(str(rule['weekday']).capitalize())
+    is_start = (starts + 3) % 7 == weekday  # 1970-01-01 was a Thursday
+    if 'nth' in rule:
+        dates = np.datetime64('1970-01-01', 'D') + starts
+        month_start = dates.astype('datetime64[M]')
+        day_of_month = (dates - month_start.astype('datetime64[D]')).astype(np.int64)
+        if rule['nth'] > 0:
+            is_start &= day_of_month // 7 == rule['nth'] - 1
+        else:
+            next_month = (month_start + np.timedelta64(1, 'M')).astype('datetime64[D]')
+            month_length = (next_month - month_start.astype('datetime64[D]')).astype(np.int64)
+            is_start &= (month_length - 1 - day_of_month) // 7 == -rule['nth'] - 1
+    elif int(rule.get('every', 1)) > 1:
+        anchor = _epoch_day(rule.get('anchor') or rule['from'])
+        is_start &= ((starts - anchor) // 7) % int(rule['every']) == 0
+
+    covered = np.zeros(n_days, dtype=bool)
+    for offset in range(span):
+        covered |= is_start[span - 1 - offset:span - 1 - offset + n_days]
+    if low is not None:
+        covered &= days >= low
+    if high is not None:
+        covered &= days <= high
+    return covered
+
+def member_unavailability(doctors, start_date, n_days, constraints=None):
+    """Days each member is unavailable over n_days starting at start_date
+
+    Combines the month-specific days_off lists with the member's
+    'unavailable' ranges and recurring rules (see normalize_unavailability),
+    expanding everything into one boolean mask (members x days) for the
+    horizon instead of searching date lists day by day.
+    """
+    if constraints is None:
+        constraints = st.session_state.constraints
+    first_day = _epoch_day(start_date)
+    last = EPOCH + timedelta(days=first_day + max(n_days, 1) - 1)
+    first = EPOCH + timedelta(days=first_day)
+    month_keys = [f"{year}-{month:02d}"
+                  for year in range(first.year, last.year + 1)
+                  for month in range(1, 13)
+                  if (first.year, first.month) <= (year, month) <= (last.year, last.month)]
+
+    mask = np.zeros((len(doctors), max(n_days, 0)), dtype=bool)
+    for m, doctor in enumerate(doctors):
+        doctor_constraints = constraints.get(doctor) or {}
+        for month_key in month_keys:
+            days_off = (doctor_constraints.get(month_key) or {}).get('days_off') or []
+            columns = [_epoch_day(d) - first_day for d in days_off]
+            mask[m, [c for c in columns if 0 <= c < n_days]] = True
+        # Date ranges are marked together with a difference array; recurring rules one by one
+        ranges = []
+        for rule in doctor_constraints.get('unavailable') or []:
+            if 'weekday' in rule:
+                mask[m] |= _rule_mask(rule, first_day, n_days)
+            else:
+                ranges.append((_epoch_day(rule['from']), _epoch_day(rule.get('to') or rule['from'])))
+        if ranges:
+            bounds = np.clip(np.array(ranges) - first_day + [0, 1], 0, n_days)
+            change = np.zeros(n_days + 1, dtype=np.int64)
+            np.add.at(change, bounds[:, 0], 1)
+            np.add.at(change, bounds[:, 1], -1)
+            mask[m] |= np.cumsum(change[:n_days]) > 0
+    return mask
+
+def month_assignment_grid(doctors, year, month, constraints=None):
+    """Pre-assignments for every member and day of a month
+
+    Returns (dates, fixed, off): fixed is an object array (members x days)
+    with the shift each member is pinned to (rotation first, then weekly
+    fixed_shifts) and off is True on rotation rest days, days off and
+    unavailable periods.
+    """
+    n_days = calendar.monthrange(year, month)[1]
+    first = datetime(year, month, 1)
+    dates = [f"{year}-{month:02d}-{day:02d}" for day in range(1, n_days + 1)]
+    member_constraints = [get_doctor_constraints(d, year, month, constraints) for d in doctors]
+
+    weekly = np.empty((len(doctors), 7), dtype=object)
+    for m, c in enumerate(member_constraints):
+        weekly[m] = [c['fixed_shifts'].get(day) for day in WEEKDAY_NAMES]
+    fixed = weekly[:, (first.weekday() + np.arange(n_days)) % 7]
+
+    rotation = expand_rotations(doctors, first, n_days, constraints)
+    pinned = np.not_equal(rotation, None)
+    fixed[pinned] = rotation[pinned]
+    off = np.equal(fixed, ROTATION_OFF)
+    fixed[off] = None
+    off |= member_unavailability(doctors, first, n_days, constraints)
+    return dates, fixed, off
+
+def _select_members(count, candidates, cost, busy, rng):
+    """Pick up to count candidate indices: members not busy first, then lowest cost, random ties
+
+    Candidates are shuffled so ties break randomly, then the best count are
+    found with a partial sort, which is linear in the number of candidates
+    however many seats are being filled. A month is only a few hundred slots
+    and every slot changes eligibility (rest, leave, roles) for the whole
+    team, so a heap of members kept across slots would be invalidated almost
+    entirely each time; the scan is a few percent of generation time even at
+    1000 members (benchmarks/scale.py).
+    """
+    if count <= 0 or candidates.size == 0:
+        return candidates[:0]
+    candidates = candidates[rng.permutation(candidates.size)]
+    key = cost[candidates]
+    busy = busy[candidates]
+    if busy.any():
+        key = key + busy * (np.ptp(key) + 1)
+    if count < candidates.size:
+        best = np.argpartition(key, count - 1)[:count]
+        candidates, key = candidates[best], key[best]
+    return candidates[np.argsort(key, kind='stable')]
+
+def generate_schedule(year, month, doctors, shift_config=None, constraints=None, fairness=None, rest_rules=None,
+                      seed=None):
+    """Generate monthly schedule
+
+    Shifts with a headcount above one get one row per seat; all seats of a
+    slot are chosen together in a single ranking of the eligible members.
+    Rotations and weekly fixed shifts are expanded up front into
+    pre-assigned seats (see month_assignment_grid).
+
+    Members are ranked by how much a seat would raise their fairness cost:
+    loads are tracked per member for shifts, hours, nights, weekends and
+    holidays, each weighted and divided by the member's target share (see
+    get_fairness and fairness_targets). Members a seat would break a rest
+    rule for (see get_rest_rules) are only picked when nobody else is free,
+    like members already working that day; a RestTracker answers that for
+    the whole team in one vector operation per slot.
+
+    Fallback seats and double bookings are tallied per call and recorded
+    in the process metrics once the month is done. Ties break with a
+    generator seeded from seed, or from the random module when seed is None.
+    """
+    start_time = time.perf_counter()
+    n = len(doctors)
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+
+    dates, fixed_grid, off_grid = month_assignment_grid(doctors, year, month, constraints)
+    day_column = {date_str: i for i, date_str in enumerate(dates)}
+    roles = np.array([get_member_role(d, constraints) for d in doctors], dtype=object)
+    slots = get_month_slots(year, month, shift_config)
+    uses_roles = any(slot.template.roles for slot in slots)
+
+    costs = fairness_costs(doctors, constraints, fairness)
+    contributions = slot_contributions(slots, fairness)
+    loads = np.zeros((n, len(FAIRNESS_DIMENSIONS)))
+    rest = RestTracker(member_rest_rules(doctors, constraints, rest_rules))
+
+    rows = {column: [] for column in ('Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Doctor', 'Seat')}
+    if uses_roles:
+        rows['Role'] = []
+
+    fallback_seats = double_bookings = 0
+    current_date = None
+    for slot, contribution in zip(slots, contributions):
+        template = slot.template
+        # Increase in each member's fairness cost if they took a seat of this slot
+        dims = np.flatnonzero(contribution)
+        added = contribution[dims]
+        marginal = ((2 * loads[:, dims] + added) * added * costs[:, dims]).sum(axis=1)
+
+        if slot.date != current_date:
+            current_date = slot.date
+            working_today = np.zeros(n, dtype=bool)
+            off_today = off_grid[:, day_column[slot.date]]
+            fixed_today = fixed_grid[:, day_column[slot.date]]
+            has_fixed = np.not_equal(fixed_today, None)
+
+        fixed_here = fixed_today == template.name
+        # Ranked last: already working today, or too little rest for this shift
+        busy = working_today | ~rest.allowed(slot.start_abs, slot.end_abs, template.hours)
+
+        # Fixed assignments take their seats first, in team order
+        chosen = np.flatnonzero(fixed_here)[:template.headcount]
+        free = np.ones(n, dtype=bool)
+        free[chosen] = False
+
+        # Available: not off today and not fixed to a different shift today
+        available = free & ~off_today & (~has_fixed | fixed_here)
+
+        # Role-specific seats, then any remaining seats
+        seats = [(role, count - int(np.sum(roles[chosen] == role))) for role, count in template.roles]
+        seats.append((None, template.headcount - len(chosen) - sum(max(c, 0) for _, c in seats)))
+
+        for role, count in seats:
+            if count <= 0:
+                continue
+            eligible = available & free if role is None else available & free & (roles == role)
+            picked = _select_members(count, np.flatnonzero(eligible), marginal, busy, rng)
+            if picked.size < count:
+                # Nobody suitable is available; fall back to anyone not already on this slot
+                fallback_seats += count - picked.size
+                fallback = free.copy()
+                fallback[picked] = False
+                if role is not None and np.any(fallback & (roles == role)):
+                    fallback &= roles == role
+                extra = _select_members(count - picked.size, np.flatnonzero(fallback), marginal, busy, rng)
+                picked = np.concatenate([picked, extra])
+            free[picked] = False
+            chosen = np.concatenate([chosen, picked])
+
+        loads[chosen] += contribution
+        double_bookings += int(np.count_nonzero(working_today[chosen]))
+        working_today[chosen] = True
+        rest.assign(chosen, slot.start_abs, slot.end_abs, template.hours)
+
+        for seat, member in enumerate(chosen, start=1):
+            rows['Date'].append(slot.date)
+            rows['Day'].append(slot.day)
+            rows['Shift'].append(template.name)
+            rows['Start_Time'].append(template.start)
+            rows['End_Time'].append(template.end)
+            rows['Doctor'].append(doctors[member])
+            rows['Seat'].append(seat)
+            if uses_roles:
+                rows['Role'].append(roles[member])
+
+    schedule = pd.DataFrame(rows)
+    FALLBACK_SEATS.inc(fallback_seats)
+    DOUBLE_BOOKINGS.inc(double_bookings)
+    GENERATION_SECONDS.observe(time.perf_counter() - start_time)
+    return schedule
+
+def _augment(seat, adjacency, member_match, seat_match, visited):
+    """Try to find an augmenting path from an unmatched seat (Kuhn's algorithm)
+
+    Depth-first with an explicit stack, so paths through thousands of seats
+    don't hit the recursion limit.
+    """
+    stack = [(seat, iter(adjacency[seat]))]
+    path = []  # (seat, member) edges leading to the seat on top of the stack
+    while stack:
+        current, members = stack[-1]
+        for member in members:
+            if member in visited:
+                continue
+            visited.add(member)
+            path.append((current, member))
+            if member_match[member] == -1:
+                # Flip the path: every seat on it takes the member it points at
+                for path_seat, path_member in path:
+                    member_match[path_member] = path_seat
+                    seat_match[path_seat] = path_member
+                return True
+            stack.append((member_match[member], iter(adjacency[member_match[member]])))
+            break
+        else:
+            stack.pop()
+            if path:
+                path.pop()
+    return False
+
+def max_bipartite_matching(adjacency, n_members):
+    """Maximum matching of seats to members; adjacency[seat] lists eligible member indices
+
+    Returns (seat_match, member_match) with -1 for unmatched entries.
+    """
+    seat_match = [-1] * len(adjacency)
+    member_match = [-1] * n_members
+
+    # Greedy pass first; augmenting paths only for what it leaves unmatched
+    for seat, members in enumerate(adjacency):
+        for member in members:
+            if member_match[member] == -1:
+                member_match[member] = seat
+                seat_match[seat] = member
                 break
 
-        if fixed_doctor:
-            assigned_doctor = fixed_doctor
-        else:
-            # Find available doctors
-            available = [d for d in doctors if is_available(d, date_str, shift_name, year, month)]
-            if not available:
-                available = doctors
+    for seat in range(len(adjacency)):
+        if seat_match[seat] == -1:
+            _augment(seat, adjacency, member_match, seat_match, set())
+
+    return seat_match, member_match
+
+def _hall_violator(adjacency, seat_match, member_match):
+    """Seats reachable by alternating paths from unmatched seats, and their members
+
+    For a maximum matching these seats outnumber the members they can use,
+    which is exactly why Hall's condition fails.
+    """
+    seats = {seat for seat, member in enumerate(seat_match) if member == -1}
+    members = set()
+    frontier = list(seats)
+    while frontier:
+        seat = frontier.pop()
+        for member in adjacency[seat]:
+            if member not in members:
+                members.add(member)
+                matched_seat = member_match[member]
+                if matched_seat != -1 and matched_seat not in seats:
+                    seats.add(matched_seat)
+                    frontier.append(matched_seat)
+    return seats, members
+
+def check_feasibility(year, month, doctors, shift_config=None, constraints=None):
+    """Pre-flight check that every slot of the month can be staffed within the constraints
+
+    Builds the slot/member availability graph for each day and runs a
+    bipartite matching with one shift per member per day. Returns a report:
+    - unfillable_slots: slots with fewer available members than seats
+      (generation would have to ignore days off)
+    - day_shortfalls: days where Hall's condition fails, i.e. some members
+      would have to work twice; lists the competing shifts and members
+    - fixed_conflicts: more members fixed to a (weekday, shift) than it has
+      seats; rotation conflicts are reported per date
+    - unknown_fixed_shifts: fixed or rotation shifts that don't exist on that
+      weekday (rotations are reported once, at the first date)
+    """
+    compiled = compile_shift_config(shift_config)
+    member_constraints = [get_doctor_constraints(d, year, month, constraints) for d in doctors]
+    fixed = [c['fixed_shifts'] for c in member_constraints]
+    dates, fixed_grid, off_grid = month_assignment_grid(doctors, year, month, constraints)
+    day_column = {date_str: i for i, date_str in enumerate(dates)}
+
+    report = {
+        'feasible': True,
+        'unfillable_slots': [],
+        'day_shortfalls': [],
+        'fixed_conflicts': [],
+        'unknown_fixed_shifts': [],
+    }
 
-            # Prefer doctors not working today
-            not_working = [d for d in available if d not in daily_assignments[date_str]]
-            if not_working:
-                available = not_working
+    pinned = defaultdict(list)
+    for doctor, fixed_shifts in zip(doctors, fixed):
+        for day_name, shift_name in fixed_shifts.items():
+            if (day_name, shift_name) in compiled.lookup:
+                pinned[(day_name, shift_name)].append(doctor)
+            else:
+                report['unknown_fixed_shifts'].append({'member': doctor, 'day': day_name, 'shift': shift_name})
+
+    for (day_name, shift_name), members in pinned.items():
+        seats = compiled.lookup[(day_name, shift_name)].headcount
+        if len(members) > seats:
+            report['fixed_conflicts'].append({
+                'day': day_name, 'shift': shift_name, 'seats': seats,
+                'members': members, 'ignored': members[seats:],
+            })
 
-            # Choose doctor with fewest shifts
-            min_shifts = min(doctor_shifts[d] for d in available)
-            candidates = [d for d in available if doctor_shifts[d] == min_shifts]
-            assigned_doctor = random.choice(candidates)
+    slots_by_date = defaultdict(list)
+    for slot in get_month_slots(year, month, shift_config):
+        slots_by_date[slot.date].append(slot)
+
+    unknown_rotations = set()
+    for date_str, slots in slots_by_date.items():
+        day_name = slots[0].day
+        fixed_today = fixed_grid[:, day_column[date_str]]
+        off_today = off_grid[:, day_column[date_str]]
+        free = [m for m in range(len(doctors)) if not off_today[m] and fixed_today[m] is None]
+
+        # Rotation pins are per date; weekly pins were checked above
+        shift_names = {slot.template.name for slot in slots}
+        for m in np.flatnonzero(np.not_equal(fixed_today, None)):
+            shift_name = fixed_today[m]
+            if shift_name not in shift_names and fixed[m].get(day_name) != shift_name \
+                    and (m, shift_name) not in unknown_rotations:
+                unknown_rotations.add((m, shift_name))
+                report['unknown_fixed_shifts'].append({'member': doctors[m], 'day': date_str, 'shift': shift_name})
+
+        adjacency = []
+        seat_slots = []
+        for slot in slots:
+            template = slot.template
+            pinned_here = np.flatnonzero(np.equal(fixed_today, template.name)).tolist()
+            if len(pinned_here) > template.headcount and any(fixed[m].get(day_name) != template.name for m in pinned_here):
+                report['fixed_conflicts'].append({
+                    'day': date_str, 'shift': template.name, 'seats': template.headcount,
+                    'members': [doctors[m] for m in pinned_here],
+                    'ignored': [doctors[m] for m in pinned_here[template.headcount:]],
+                })
+            candidates = pinned_here + free
+            if len(candidates) < template.headcount:
+                report['unfillable_slots'].append({
+                    'date': date_str, 'shift': template.name, 'seats': template.headcount,
+                    'available': [doctors[m] for m in candidates],
+                })
+            for _ in range(template.headcount):
+                adjacency.append(candidates)
+                seat_slots.append(template.name)
+
+        seat_match, member_match = max_bipartite_matching(adjacency, len(doctors))
+        matched = sum(1 for member in seat_match if member != -1)
+        if matched < len(adjacency):
+            seats, members = _hall_violator(adjacency, seat_match, member_match)
+            report['day_shortfalls'].append({
+                'date': date_str,
+                'seats': len(adjacency),
+                'assignable': matched,
+                'shifts': sorted({seat_slots[seat] for seat in seats}),
+                'members': [doctors[m] for m in sorted(members)],
+            })
 
-        # Assign shift
-        shift['Doctor'] = assigned_doctor
-        doctor_shifts[assigned_doctor] += 1
-        daily_assignments[date_str].add(assigned_doctor)
+    report['feasible'] = not (report['unfillable_slots'] or report['day_shortfalls'] or report['fixed_conflicts'])
+    return report
+
+def feasibility_messages(report):
+    """Human-readable lines describing a check_feasibility report"""
+    messages = []
+    for conflict in report['fixed_conflicts']:
+        messages.append(
+            f"{conflict['day']} {conflict['shift']}: {len(conflict['members'])} members fixed to "
+            f"{conflict['seats']} seat(s); {', '.join(conflict['ignored'])} will be ignored"
+        )
+    for item in report['unknown_fixed_shifts']:
+        messages.append(f"{item['member']}: fixed shift {item['shift']} does not exist on {item['day']}")
+    for slot in report['unfillable_slots']:
+        available = ', '.join(slot['available']) or 'nobody'
+        messages.append(
+            f"{slot['date']} {slot['shift']}: needs {slot['seats']}, available: {available} (days off will be overridden)"
+        )
+    for shortfall in report['day_shortfalls']:
+        messages.append(
+            f"{shortfall['date']}: only {shortfall['assignable']} of {shortfall['seats']} seats can be filled without "
+            f"double-booking ({', '.join(shortfall['shifts'])} compete for {len(shortfall['members'])} members)"
+        )
+    return messages
+
+# Local search penalties, in the same units as one step of squared-load imbalance
+DOUBLE_BOOKING_PENALTY = 50
+REST_PENALTY = 50
+UNAVAILABLE_PENALTY = 200
+
+def improve_schedule(df, year, month, doctors, iterations=20000, time_budget=0.5,
+                     anneal=False, seed=None, shift_config=None, constraints=None, fairness=None,
+                     rest_rules=None):
+    """Improve a generated schedule with local search (moves and pairwise swaps)
+
+    Minimises the fairness cost used by generate_schedule plus penalties for
+    double bookings, rest rule breaks and unavailable members. Per-member
+    fairness loads and per-day occupancy counters are kept up to date so
+    each candidate is scored in constant time; rest breaks are counted
+    against each member's MemberTimeline with binary searches. Rows pinned by fixed shifts
+    or rotations are never moved, and a role seat only goes to a member of its role. Stops after `iterations` candidates or `time_budget`
+    seconds; with anneal=True worse candidates are sometimes accepted
+    (simulated annealing). Search statistics are stored in df.attrs['improvement'];
+    run time and remaining double bookings also go to the process metrics.
+    """
+    start_time = time.perf_counter()
+    try:
+        result = _improve_schedule(df, year, month, doctors, iterations, time_budget, anneal, seed,
+                                   shift_config, constraints, fairness, rest_rules)
+    finally:
+        IMPROVE_SECONDS.observe(time.perf_counter() - start_time)
+    if not result.empty:
+        staffed = result[result['Doctor'].isin(doctors)]
+        REMAINING_DOUBLE_BOOKINGS.observe(int(staffed.duplicated(['Date', 'Doctor']).sum()))
+    return result
+
+def _improve_schedule(df, year, month, doctors, iterations, time_budget, anneal, seed,
+                      shift_config, constraints, fairness, rest_rules):
+    result = df.copy()
+    n = len(doctors)
+    if df.empty or n < 2:
+        return result
+
+    rng = random.Random(seed)
+    index = {doctor: i for i, doctor in enumerate(doctors)}
+    month_dates, fixed_grid, off_grid = month_assignment_grid(doctors, year, month, constraints)
+    day_column = {date_str: i for i, date_str in enumerate(month_dates)}
+    fixed_by_day = fixed_grid.T.tolist()
+    off_by_day = off_grid.T.tolist()
+    dates = df['Date'].tolist()
+    shift_names = df['Shift'].tolist()
+    assigned = [index.get(doctor, -1) for doctor in df['Doctor']]
+
+    day_index = {date_str: i for i, date_str in enumerate(sorted(set(dates)))}
+    slot_index = {}
+    row_day = [day_index[date_str] for date_str in dates]
+    row_slot = [slot_index.setdefault(key, len(slot_index)) for key in zip(dates, shift_names)]
+    # Each row's nonzero fairness contributions as (dimension, amount) pairs
+    contributions = schedule_contributions(df, shift_config, fairness)
+    row_load = [[(k, c) for k, c in enumerate(row) if c] for row in contributions.tolist()]
+    costs = fairness_costs(doctors, constraints, fairness).tolist()
+    starts, ends = schedule_intervals(df)
+    row_start, row_end = starts.tolist(), ends.tolist()
+    row_hours = schedule_row_hours(df, shift_config).tolist()
+    rules = member_rest_rules(doctors, constraints, rest_rules)
+    timelines = [MemberTimeline() for _ in range(n)]
+
+    row_column = [day_column.get(date_str, -1) for date_str in dates]
+    # Seats of shifts with a role mix keep a member of their role
+    lookup = compile_shift_config(shift_config).lookup
+    row_role = [None] * len(dates)
+    if 'Role' in df.columns:
+        for r, (day_name, shift_name, role) in enumerate(zip(df['Day'], shift_names, df['Role'])):
+            template = lookup.get((day_name, shift_name))
+            if template is not None and template.roles and isinstance(role, str):
+                row_role[r] = role
+    member_role = [get_member_role(doctor, constraints) for doctor in doctors]
+
+    def pinned_shift(r, m):
+        c = row_column[r]
+        return fixed_by_day[c][m] if c >= 0 else None
+
+    def fits_role(r, m):
+        return row_role[r] is None or member_role[m] == row_role[r]
+
+    def allowed(r, m):
+        c = row_column[r]
+        if not fits_role(r, m):
+            return False
+        return c < 0 or (not off_by_day[c][m] and fixed_by_day[c][m] in (None, shift_names[r]))
+
+    # Rows held by an unknown member or by a fixed assignment stay put
+    movable = [r for r in range(len(dates))
+               if assigned[r] >= 0 and pinned_shift(r, assigned[r]) != shift_names[r]]
+    if not movable:
+        return result
+
+    loads = [[0.0] * len(FAIRNESS_DIMENSIONS) for _ in range(n)]
+    rest_breaks = 0
+    occupancy = [[0] * len(day_index) for _ in range(n)]
+    slot_count = defaultdict(int)
+    for r, m in enumerate(assigned):
+        if m >= 0:
+            for k, c in row_load[r]:
+                loads[m][k] += c
+            occupancy[m][row_day[r]] += 1
+            slot_count[(row_slot[r], m)] += 1
+            rest_breaks += timelines[m].rest_breaks(row_start[r], row_end[r], row_hours[r], rules[m])
+            timelines[m].add(row_start[r], row_end[r], row_hours[r], r)
+
+    cost = sum(costs[m][k] * loads[m][k] ** 2 for m in range(n) for k in range(len(FAIRNESS_DIMENSIONS)))
+    for m in range(n):
+        cost += DOUBLE_BOOKING_PENALTY * sum(max(o - 1, 0) for o in occupancy[m])
+    cost += UNAVAILABLE_PENALTY * sum(1 for r, m in enumerate(assigned) if m >= 0 and not allowed(r, m))
+    cost += REST_PENALTY * rest_breaks
+    initial_cost = cost
+
+    def move_delta(r, b):
+        a = assigned[r]
+        d = row_day[r]
+        load_a, load_b, cost_a, cost_b = loads[a], loads[b], costs[a], costs[b]
+        delta = 0.0
+        for k, c in row_load[r]:
+            delta += cost_b[k] * c * (2 * load_b[k] + c) - cost_a[k] * c * (2 * load_a[k] - c)
+        if occupancy[a][d] >= 2:
+            delta -= DOUBLE_BOOKING_PENALTY
+        if occupancy[b][d] >= 1:
+            delta += DOUBLE_BOOKING_PENALTY
+        if not allowed(r, a):
+            delta -= UNAVAILABLE_PENALTY
+        if not allowed(r, b):
+            delta += UNAVAILABLE_PENALTY
+        return delta + REST_PENALTY * (rest_delta(r, b) - rest_delta(r, a, held=True))
+
+    def rest_delta(r, m, held=False):
+        """Rest breaks row r adds to member m's other shifts"""
+        timeline = timelines[m]
+        if held:
+            timeline.remove(r)
+        breaks = timeline.rest_breaks(row_start[r], row_end[r], row_hours[r], rules[m])
+        if held:
+            timeline.add(row_start[r], row_end[r], row_hours[r], r)
+        return breaks
+
+    def apply_move(r, b):
+        a = assigned[r]
+        d = row_day[r]
+        timelines[a].remove(r)
+        timelines[b].add(row_start[r], row_end[r], row_hours[r], r)
+        for k, c in row_load[r]:
+            loads[a][k] -= c
+            loads[b][k] += c
+        occupancy[a][d] -= 1
+        occupancy[b][d] += 1
+        slot_count[(row_slot[r], a)] -= 1
+        slot_count[(row_slot[r], b)] += 1
+        assigned[r] = b
+
+    accepted = 0
+    iteration = 0
+    start_time = time.perf_counter()
+    for iteration in range(1, iterations + 1):
+        if time_budget is not None and iteration % 256 == 0 and time.perf_counter() - start_time > time_budget:
+            break
+
+        r1 = rng.choice(movable)
+        a = assigned[r1]
+
+        if rng.random() < 0.5:
+            # Move: hand r1 to another member
+            b = rng.randrange(n)
+            if b == a or slot_count[(row_slot[r1], b)] or not fits_role(r1, b):
+                continue
+            delta = move_delta(r1, b)
+            r2 = None
+        else:
+            # Swap: exchange r1 and r2 between their members
+            r2 = rng.choice(movable)
+            b = assigned[r2]
+            if b == a or row_slot[r1] == row_slot[r2]:
+                continue
+            if slot_count[(row_slot[r1], b)] or slot_count[(row_slot[r2], a)]:
+                continue
+            if not (fits_role(r1, b) and fits_role(r2, a)):
+                continue
+            delta = move_delta(r1, b)
+            apply_move(r1, b)
+            delta += move_delta(r2, a)
+
+        if anneal:
+            temperature = 2.0 * (1 - iteration / iterations) + 0.01
+            accept = delta <= 0 or rng.random() < np.exp(-delta / temperature)
+        else:
+            accept = delta <= 0
 
-    return pd.DataFrame(shifts)
+        if accept:
+            if r2 is None:
+                apply_move(r1, b)
+            else:
+                apply_move(r2, a)
+            cost += delta
+            accepted += 1
+        elif r2 is not None:
+            apply_move(r1, a)  # Undo the first half of the swap
+
+    result['Doctor'] = [doctors[m] if m >= 0 else original
+                        for m, original in zip(assigned, df['Doctor'])]
+    result.attrs['improvement'] = {
+        'initial_cost': initial_cost,
+        'final_cost': cost,
+        'iterations': iteration,
+        'accepted': accepted,
+        'seconds': time.perf_counter() - start_time,
+    }
+    return result
+
+def shift_mask(df, member, start_date=None, end_date=None):
+    """Boolean mask of a member's rows, optionally within an inclusive date range (YYYY-MM-DD or date)"""
+    mask = (df['Doctor'] == member).to_numpy(copy=True)
+    if start_date is not None:
+        mask &= (df['Date'] >= str(start_date)).to_numpy()
+    if end_date is not None:
+        mask &= (df['Date'] <= str(end_date)).to_numpy()
+    return mask
+
+def reassign_shifts(df, member, new_member, start_date=None, end_date=None):
+    """Reassignments (Series slot -> member) handing a member's shifts in a date range to new_member"""
+    mask = shift_mask(df, member, start_date, end_date)
+    return pd.Series(new_member, index=df.index[mask], dtype=object)
+
+def swap_shifts(df, member_a, member_b, start_date=None, end_date=None):
+    """Reassignments (Series slot -> member) exchanging two members' shifts in a date range"""
+    mask_a = shift_mask(df, member_a, start_date, end_date)
+    mask_b = shift_mask(df, member_b, start_date, end_date)
+    either = mask_a | mask_b
+    return pd.Series(np.where(mask_a, member_b, member_a)[either], index=df.index[either], dtype=object)
+
+def redistribute_shifts(df, member, doctors, start_date=None, end_date=None, shift_config=None,
+                        constraints=None, fairness=None, rest_rules=None):
+    """Reassignments (Series slot -> member) spreading a member's shifts in a date range over the team
+
+    Each shift, in time order, goes to the eligible member whose fairness
+    cost it raises least (see generate_schedule), preferring members it
+    breaks no rest rule for. Eligible members are not off that day, not
+    fixed to another shift, not already working that day and, for role
+    seats, of the seat's role. Shifts nobody is eligible for are left out
+    of the result.
+    """
+    mask = shift_mask(df, member, start_date, end_date)
+    others = [d for d in doctors if d != member]
+    if not mask.any() or not others:
+        return pd.Series(dtype=object)
+
+    n = len(others)
+    codes = pd.Index(others).get_indexer(df['Doctor'])
+    staying = (codes >= 0) & ~mask
+    day_codes, days = pd.factorize(df['Date'])
+    starts, ends = (values.tolist() for values in schedule_intervals(df))
+    hours = schedule_row_hours(df, shift_config).tolist()
+    contributions = schedule_contributions(df, shift_config, fairness)
+    costs = fairness_costs(others, constraints, fairness)
+
+    loads = np.zeros((n, len(FAIRNESS_DIMENSIONS)))
+    np.add.at(loads, codes[staying], contributions[staying])
+    working = np.zeros((n, len(days)), dtype=bool)
+    working[codes[staying], day_codes[staying]] = True
+    timelines = [MemberTimeline() for _ in range(n)]
+    for r in np.flatnonzero(staying).tolist():
+        timelines[codes[r]].add(starts[r], ends[r], hours[r], r)
+    rules = member_rest_rules(others, constraints, rest_rules)
+    roles = np.array([get_member_role(d, constraints) for d in others], dtype=object)
+    row_roles = df['Role'].to_numpy(dtype=object) if 'Role' in df.columns else None
+
+    grids = {}  # month key -> (fixed, off) for the other members
+    labels, members = [], []
+    for r in sorted(np.flatnonzero(mask).tolist(), key=lambda r: starts[r]):
+        date_str = df['Date'].iat[r]
+        month_key = date_str[:7]
+        if month_key not in grids:
+            grids[month_key] = month_assignment_grid(others, int(month_key[:4]), int(month_key[5:7]), constraints)[1:]
+        fixed, off = grids[month_key]
+        column = int(date_str[8:10]) - 1
+
+        eligible = ~off[:, column] & ~working[:, day_codes[r]]
+        eligible &= np.equal(fixed[:, column], None) | (fixed[:, column] == df['Shift'].iat[r])
+        if row_roles is not None and isinstance(row_roles[r], str):
+            eligible &= roles == row_roles[r]
+        candidates = np.flatnonzero(eligible)
+        if not candidates.size:
+            continue
+
+        contribution = contributions[r]
+        marginal = ((2 * loads[candidates] + contribution) * contribution * costs[candidates]).sum(axis=1)
+        ranked = candidates[np.argsort(marginal, kind='stable')].tolist()
+        chosen = next((m for m in ranked if not timelines[m].rest_breaks(starts[r], ends[r], hours[r], rules[m])),
+                      ranked[0])
+
+        loads[chosen] += contribution
+        working[chosen, day_codes[r]] = True
+        timelines[chosen].add(starts[r], ends[r], hours[r], r)
+        labels.append(df.index[r])
+        members.append(others[chosen])
+    return pd.Series(members, index=pd.Index(labels, dtype=df.index.dtype), dtype=object)
 
 def export_config():
     """Export configuration as YAML"""
@@ -221,6 +1538,10 @@ def export_config():
                         f"{current_date.year}-{current_date.month:02d}-12"
                     ]
                 },
+                "unavailable": [
+                    {"weekday": "Tuesday", "every": 2, "anchor": f"{current_date.year}-{current_date.month:02d}-01",
+                     "reason": "Teaching every other week"}
+                ],
                 "notes": "Works Monday/Wednesday/Friday day shifts, prefers day shifts"
             }
 
@@ -236,7 +1557,12 @@ def export_config():
                         f"{current_date.year}-{current_date.month:02d}-25"
                     ]
                 },
-                "notes": "Prefers weekend shifts, vacation mid-month"
+                "unavailable": [
+                    {"from": f"{current_date.year}-{current_date.month:02d}-18",
+                     "to": (current_date.replace(day=1) + timedelta(days=40)).strftime("%Y-%m-07"),
+                     "reason": "Vacation"}
+                ],
+                "notes": "Prefers weekend shifts, vacation mid-month and into next month"
             }
 
         # Example for third doctor - night shift specialist
@@ -258,13 +1584,27 @@ def export_config():
         'team_members': st.session_state.doctors,
         'shift_configuration': st.session_state.shift_config,
         'constraints': st.session_state.constraints or example_constraints,
+        'fairness': get_fairness(),
+        'rest_rules': get_rest_rules(),
         'export_date': datetime.now().isoformat(),
         'examples': {
             'description': 'Simplified configuration with day-of-week fixed shifts',
             'constraint_types': {
                 'fixed_shifts': 'Day of week assignments (e.g., Monday: "7a-7p") - portable across months',
                 'days_off': 'Specific dates when unavailable (month-specific under YYYY-MM key)',
-                'notes': 'Additional information about the team member'
+                'notes': 'Additional information about the team member',
+                'role': 'Optional role used to fill shifts with a role mix (e.g., "nurse")',
+                'unavailable': 'Date ranges and recurring rules, portable across months: {from, to} for a range; {weekday, every, anchor} for every N weeks; {weekday, nth} for the nth (or -1 = last) weekday of each month; days: 2 covers the following day too, from/to bound recurring rules',
+                'target': 'Share of the workload relative to a full-time member: 0.5 for half time, or per dimension, e.g. {nights: 0, weekends: 0.5}',
+                'rest': 'Overrides of the team rest_rules for this member, e.g. {min_rest_hours: 12}',
+                'rotation': 'Repeating cycle from an anchor date, e.g. {anchor: "2024-01-01", pattern: [7p-7a, 7p-7a, "off", "off"]}; null entries leave the day to the scheduler'
+            },
+            'fairness': 'Top-level section: weights for shifts, hours, nights, weekends and holidays, plus the weekend_days and holidays (YYYY-MM-DD) they count',
+            'rest_rules': 'Top-level section: min_rest_hours between shifts, max_consecutive_days and max_hours_7_days in any rolling 7 days; 0 or null turns a rule off',
+            'rotation_groups': 'Optional top-level section: {name: {anchor, pattern, members, stagger}} gives each member the rotation, started stagger days after the previous member',
+            'shift_options': {
+                'headcount': 'Number of people needed on the shift (default 1)',
+                'roles': 'Optional role mix for the shift, e.g. {attending: 1, nurse: 2}'
             }
         }
     }
@@ -272,6 +1612,12 @@ def export_config():
 
 def import_config(content):
     """Import configuration from YAML"""
+    CONFIG_IMPORT_BYTES.observe(len(content.encode('utf-8') if isinstance(content, str) else content))
+    success, message = _import_config(content)
+    CONFIG_IMPORTS.inc(result='ok' if success else 'error')
+    return success, message
+
+def _import_config(content):
     try:
         config = yaml.safe_load(content)
 
@@ -281,6 +1627,7 @@ def import_config(content):
         if 'team_members' in config and config['team_members']:
             st.session_state.doctors = config['team_members']
             st.session_state.doctor_colors = generate_colors(st.session_state.doctors)
+            CONFIG_IMPORT_MEMBERS.observe(len(config['team_members']))
             imported_items.append(f"Team members: {len(config['team_members'])} members")
 
         if 'shift_configuration' in config and config['shift_configuration']:
@@ -288,6 +1635,19 @@ def import_config(content):
             imported_items.append("Shift configuration")
 
         if 'constraints' in config and config['constraints']:
+            # Validate unavailable periods up front and store their dates as ISO strings
+            for doctor, doctor_constraints in config['constraints'].items():
+                if isinstance(doctor_constraints, dict) and doctor_constraints.get('unavailable'):
+                    try:
+                        doctor_constraints['unavailable'] = [normalize_unavailability(rule)
+                                                             for rule in doctor_constraints['unavailable']]
+                    except ValueError as e:
+                        return False, f"Invalid unavailable period for {doctor}: {e}"
+                if isinstance(doctor_constraints, dict) and doctor_constraints.get('rest'):
+                    try:
+                        _rest_rule_values(doctor_constraints['rest'])
+                    except (TypeError, ValueError) as e:
+                        return False, f"Invalid rest rules for {doctor}: {e}"
             st.session_state.constraints = config['constraints']
 
             # Count constraints
@@ -306,12 +1666,41 @@ def import_config(content):
             constraint_details = []
             if fixed_shifts_count > 0:
                 constraint_details.append(f"{fixed_shifts_count} weekly schedules")
+            rotations_count = sum(1 for doctor_constraints in config['constraints'].values()
+                                  if isinstance(doctor_constraints, dict) and doctor_constraints.get('rotation'))
+            if rotations_count > 0:
+                constraint_details.append(f"{rotations_count} rotations")
             if days_off_count > 0:
                 constraint_details.append(f"{days_off_count} days off")
+            unavailable_count = sum(len(doctor_constraints.get('unavailable') or [])
+                                    for doctor_constraints in config['constraints'].values()
+                                    if isinstance(doctor_constraints, dict))
+            if unavailable_count > 0:
+                constraint_details.append(f"{unavailable_count} unavailable periods")
 
             if constraint_details:
                 imported_items.append(f"Constraints: {', '.join(constraint_details)}")
 
+        if config.get('fairness'):
+            try:
+                st.session_state.fairness = get_fairness(config['fairness'])
+            except (TypeError, ValueError) as e:
+                return False, f"Invalid fairness settings: {e}"
+            imported_items.append("Fairness settings")
+
+        if config.get('rest_rules'):
+            try:
+                st.session_state.rest_rules = get_rest_rules(config['rest_rules'])
+            except (TypeError, ValueError) as e:
+                return False, f"Invalid rest rules: {e}"
+            imported_items.append("Rest rules")
+
+        if config.get('rotation_groups'):
+            rotations = expand_rotation_groups(config['rotation_groups'])
+            for member, rotation in rotations.items():
+                st.session_state.constraints.setdefault(member, {})['rotation'] = rotation
+            imported_items.append(f"Rotation groups: {len(config['rotation_groups'])} ({len(rotations)} members)")
+
         if imported_items:
             return True, f"Successfully imported: {', '.join(imported_items)}"
         else:
@@ -322,13 +1711,21 @@ def import_config(content):
     except Exception as e:
         return False, f"Error: {str(e)}"
 
-def create_excel_export(df, year, month):
-    """Create Excel export with individual cells for each shift"""
+def create_excel_export(df, year, month, progress=None):
+    """Create Excel export with individual cells for each shift
+
+    progress, if given, is called with the completed fraction (0.0-1.0).
+    """
+    from io import BytesIO
+    from openpyxl.styles import Alignment
+
     buffer = BytesIO()
 
     with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
         # Schedule sheet
         df.to_excel(writer, sheet_name='Schedule', index=False)
+        if progress:
+            progress(0.2)
 
         # Summary sheet
         summary_data = []
@@ -336,18 +1733,20 @@ def create_excel_export(df, year, month):
         for doctor, count in shifts_per_doctor.items():
             summary_data.append({'Doctor': doctor, 'Total_Shifts': count})
         pd.DataFrame(summary_data).to_excel(writer, sheet_name='Summary', index=False)
+        if progress:
+            progress(0.3)
 
         # Calendar sheet with dates in one row and shifts stacked below
         cal = calendar.monthcalendar(year, month)
 
+        # One cell per shift per day; multi-seat shifts list all assigned members
+        day_cells = defaultdict(list)
+        for (date_str, _, shift_name), seats in df.groupby(['Date', 'Start_Time', 'Shift'], sort=True)['Doctor']:
+            names = ', '.join(doctor.replace('Dr. ', '') for doctor in seats)
+            day_cells[date_str].append(f"{shift_name}: {names}")
+
         # Find maximum number of shifts per day to determine how many rows we need
-        max_shifts_per_day = 0
-        for week in cal:
-            for day in week:
-                if day != 0:
-                    date_str = f"{year}-{month:02d}-{day:02d}"
-                    day_shifts = df[df['Date'] == date_str]
-                    max_shifts_per_day = max(max_shifts_per_day, len(day_shifts))
+        max_shifts_per_day = max((len(cells) for cells in day_cells.values()), default=0)
 
         # Create headers
         headers = ['Week', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
@@ -371,18 +1770,14 @@ def create_excel_export(df, year, month):
                     if day == 0:
                         shift_row.append('')
                     else:
-                        date_str = f"{year}-{month:02d}-{day:02d}"
-                        day_shifts = df[df['Date'] == date_str].sort_values('Start_Time')
-
-                        if shift_level < len(day_shifts):
-                            shift = day_shifts.iloc[shift_level]
-                            shift_text = f"{shift['Shift']}: {shift['Doctor'].replace('Dr. ', '')}"
-                            shift_row.append(shift_text)
-                        else:
-                            shift_row.append('')
+                        cells = day_cells.get(f"{year}-{month:02d}-{day:02d}", [])
+                        shift_row.append(cells[shift_level] if shift_level < len(cells) else '')
 
                 calendar_data.append(shift_row)
 
+            if progress:
+                progress(0.3 + 0.5 * (week_num + 1) / len(cal))
+
         # Create DataFrame and export
         cal_df = pd.DataFrame(calendar_data[1:], columns=calendar_data[0])
         cal_df.to_excel(writer, sheet_name='Calendar', index=False)
@@ -414,40 +1809,45 @@ def create_excel_export(df, year, month):
                     cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
 
     buffer.seek(0)
+    if progress:
+        progress(1.0)
     return buffer
 
-def create_ics_export(df):
-    """Create ICS calendar export"""
+def create_ics_export(df, progress=None):
+    """Create ICS calendar export
+
+    progress, if given, is called with the completed fraction (0.0-1.0).
+    """
     lines = [
         "BEGIN:VCALENDAR",
         "VERSION:2.0",
         "PRODID:-//Tool Sched//EN"
     ]
 
-    for _, row in df.iterrows():
-        date = datetime.strptime(row['Date'], '%Y-%m-%d')
-        start_time = row['Start_Time']
-        end_time = row['End_Time']
+    total_rows = len(df)
+    rows = zip(df['Date'], df['Shift'], df['Start_Time'], df['End_Time'], df['Doctor'])
+    for row_num, (date_str, shift_name, start_time, end_time, doctor) in enumerate(rows, start=1):
+        date = datetime.strptime(date_str, '%Y-%m-%d')
+        start_minute, end_minute = shift_interval(start_time, end_time)
 
-        start_hour, start_min = map(int, start_time.split(':'))
-        end_hour, end_min = map(int, end_time.split(':'))
-
-        start_dt = date.replace(hour=start_hour, minute=start_min)
-        end_dt = date.replace(hour=end_hour, minute=end_min)
-
-        if end_dt <= start_dt:
-            end_dt += timedelta(days=1)
+        start_dt = date + timedelta(minutes=start_minute)
+        end_dt = date + timedelta(minutes=end_minute)
 
         lines.extend([
             "BEGIN:VEVENT",
-            f"UID:{row['Date']}-{row['Shift']}-{row['Doctor'].replace(' ', '')}",
+            f"UID:{date_str}-{shift_name}-{doctor.replace(' ', '')}",
             f"DTSTART:{start_dt.strftime('%Y%m%dT%H%M%S')}",
             f"DTEND:{end_dt.strftime('%Y%m%dT%H%M%S')}",
-            f"SUMMARY:{row['Doctor']} - {row['Shift']}",
-            f"DESCRIPTION:Shift assignment for {row['Doctor']}",
+            f"SUMMARY:{doctor} - {shift_name}",
+            f"DESCRIPTION:Shift assignment for {doctor}",
             "LOCATION:Workplace",
             "END:VEVENT"
         ])
 
+        if progress and row_num % 100 == 0:
+            progress(row_num / total_rows)
+
     lines.append("END:VCALENDAR")
+    if progress:
+        progress(1.0)
     return '\n'.join(lines)
@@ -0,0 +1,159 @@
+"""Monte Carlo what-if simulation for staffing decisions.
+
+A scenario is a variation applied to a base configuration (members added or
+removed, extra days off, shift templates changed). Each scenario is
+generated many times with different seeds on a process pool, and the
+fairness, coverage-gap and double-booking distributions are reported side by
+side.
+
+Variation keys (all optional):
+    name            label shown in the results
+    add_members     list of new member names
+    remove_members  list of member names to drop
+    days_off        {member: ["YYYY-MM-DD", ...]} extra days off
+    shift_changes   {weekday: {shift: {start, end, hours, ...} or None}};
+                    None removes the shift
+"""
+import copy
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scheduling_utils import (
+    generate_schedule, get_month_slots, improve_schedule, month_assignment_grid, schedule_hours
+)
+
+METRICS = ['shift_spread', 'hours_std', 'double_bookings', 'days_off_violations', 'coverage_gap']
+
+
+def apply_variation(base_config, variation):
+    """Return a new config with a scenario variation applied to base_config"""
+    config = {
+        'team_members': list(base_config.get('team_members') or []),
+        'shift_configuration': copy.deepcopy(base_config.get('shift_configuration') or {}),
+        'constraints': copy.deepcopy(base_config.get('constraints') or {}),
+        'fairness': copy.deepcopy(base_config.get('fairness') or {}),
+        'rest_rules': copy.deepcopy(base_config.get('rest_rules') or {}),
+    }
+
+    removed = set(variation.get('remove_members', []))
+    config['team_members'] = [m for m in config['team_members'] if m not in removed]
+    for member in variation.get('add_members', []):
+        if member not in config['team_members']:
+            config['team_members'].append(member)
+
+    for member, dates in variation.get('days_off', {}).items():
+        member_constraints = config['constraints'].setdefault(member, {})
+        for date_str in dates:
+            month_days = member_constraints.setdefault(date_str[:7], {}).setdefault('days_off', [])
+            if date_str not in month_days:
+                month_days.append(date_str)
+
+    for day_name, shifts in variation.get('shift_changes', {}).items():
+        day_shifts = config['shift_configuration'].setdefault(day_name, {})
+        for shift_name, shift_data in shifts.items():
+            if shift_data is None:
+                day_shifts.pop(shift_name, None)
+            else:
+                day_shifts[shift_name] = shift_data
+
+    return config
+
+
+def schedule_metrics(df, year, month, config):
+    """Fairness, coverage and conflict metrics for one generated schedule"""
+    doctors = config['team_members']
+    shift_config = config['shift_configuration']
+    constraints = config['constraints']
+
+    counts = df['Doctor'].value_counts().reindex(doctors, fill_value=0)
+    hours = schedule_hours(df, shift_config).reindex(doctors, fill_value=0)
+
+    # Working a day off counts unless the member is pinned to that very shift
+    dates, fixed, off = month_assignment_grid(doctors, year, month, constraints)
+    member_index = {doctor: m for m, doctor in enumerate(doctors)}
+    day_column = {date_str: i for i, date_str in enumerate(dates)}
+    members = df['Doctor'].map(member_index)
+    columns = df['Date'].map(day_column)
+    known = (members.notna() & columns.notna()).to_numpy()
+    m = members[known].astype(int).to_numpy()
+    c = columns[known].astype(int).to_numpy()
+    violations = int(np.sum(off[m, c] & np.not_equal(fixed[m, c], df['Shift'].to_numpy()[known])))
+
+    seats_needed = sum(slot.template.headcount for slot in get_month_slots(year, month, shift_config))
+
+    return {
+        'shift_spread': int(counts.max() - counts.min()) if len(counts) else 0,
+        'hours_std': float(hours.std(ddof=0)) if len(hours) else 0.0,
+        'double_bookings': int(df.duplicated(['Date', 'Doctor']).sum()),
+        'days_off_violations': violations,
+        'coverage_gap': seats_needed - len(df),
+    }
+
+
+def run_scenario(config, year, month, seeds, optimize=False):
+    """Generate a scenario once per seed and return the metrics of each run"""
+    results = []
+    for seed in seeds:
+        df = generate_schedule(year, month, config['team_members'], shift_config=config['shift_configuration'],
+                               constraints=config['constraints'], fairness=config['fairness'],
+                               rest_rules=config['rest_rules'], seed=seed)
+        if optimize:
+            df = improve_schedule(df, year, month, config['team_members'], seed=seed,
+                                  shift_config=config['shift_configuration'], constraints=config['constraints'],
+                                  fairness=config['fairness'], rest_rules=config['rest_rules'])
+        results.append(schedule_metrics(df, year, month, config))
+    return results
+
+
+def simulate(base_config, variations, year, month, runs=20, seed=0, optimize=False,
+             max_workers=None, chunk_size=10):
+    """Run the baseline plus every variation `runs` times and summarise the metrics
+
+    Runs are split into chunks of chunk_size seeds and spread over a process
+    pool (max_workers=1 runs everything in-process). Every scenario uses the
+    same seeds, so differences come from the variation, not the dice.
+    Returns (summary, runs): summary has one row per scenario with the mean,
+    5th and 95th percentile of each metric; runs holds every run's metrics.
+    """
+    scenarios = [('Baseline', apply_variation(base_config, {}))]
+    for i, variation in enumerate(variations, start=1):
+        scenarios.append((variation.get('name', f"Scenario {i}"), apply_variation(base_config, variation)))
+
+    seeds = [seed + i for i in range(runs)]
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    tasks = [(name, config, chunk) for name, config in scenarios for chunk in chunks]
+
+    collected = defaultdict(list)
+    if max_workers == 1:
+        for name, config, chunk in tasks:
+            collected[name].extend(run_scenario(config, year, month, chunk, optimize))
+    else:
+        # Spawned workers: forking the multi-threaded Streamlit server is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+            futures = [(name, executor.submit(run_scenario, config, year, month, chunk, optimize))
+                       for name, config, chunk in tasks]
+            for name, future in futures:
+                collected[name].extend(future.result())
+
+    run_rows = [dict(scenario=name, **metrics) for name, _ in scenarios for metrics in collected[name]]
+    runs_df = pd.DataFrame(run_rows, columns=['scenario'] + METRICS)
+    return summarize(runs_df, [name for name, _ in scenarios]), runs_df
+
+
+def summarize(runs_df, order=None):
+    """Mean / p5 / p95 of every metric per scenario"""
+    grouped = runs_df.groupby('scenario', sort=False)[METRICS]
+    summary = pd.concat({
+        'mean': grouped.mean(),
+        'p5': grouped.quantile(0.05),
+        'p95': grouped.quantile(0.95),
+    }, axis=1).swaplevel(axis=1)
+    summary = summary[[(metric, stat) for metric in METRICS for stat in ('mean', 'p5', 'p95')]]
+    if order is not None:
+        summary = summary.reindex(order)
+    return summary.astype(np.float64)
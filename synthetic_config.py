@@ -0,0 +1,221 @@
+"""Seeded generator of realistic, large team configurations.
+
+Produces configs in the export_config / import_config YAML schema for
+benchmarks and stress tests: team size, shift templates per weekday,
+fixed-shift density, scattered days off, clustered vacations, holidays and
+optionally deliberately infeasible constraints.
+
+Usage:
+    python synthetic_config.py --team-size 300 --months 2024-01 2024-02 --seed 7 -o team.yaml
+"""
+import argparse
+import calendar
+import random
+from datetime import date, datetime, timedelta
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKEND = {'Friday', 'Saturday', 'Sunday'}
+
+# Shift catalogue in the order shifts are added to a day
+SHIFT_CATALOGUE = [
+    ("7a-7p", "07:00", "19:00"),
+    ("7p-7a", "19:00", "07:00"),
+    ("12p-12a", "12:00", "00:00"),
+    ("10a-10p", "10:00", "22:00"),
+    ("2p-2a", "14:00", "02:00"),
+    ("6a-2p", "06:00", "14:00"),
+]
+
+SURNAMES = [
+    "Chen", "Patel", "Johnson", "Okafor", "Valdez", "Nguyen", "Garcia", "Kowalski", "Haddad", "Silva",
+    "Müller", "Tanaka", "Osei", "Ivanova", "Rossi", "Kim", "Andersson", "Mensah", "Dubois", "Novak",
+    "O'Brien", "Singh", "Moreau", "Yilmaz", "Costa", "Nakamura", "Adeyemi", "Larsen", "Schwartz", "Reyes",
+]
+
+INFEASIBLE_KINDS = ('all_off', 'fixed_conflict', 'understaffed')
+
+
+def member_names(team_size, rng):
+    """Unique, realistic-looking member names"""
+    names = []
+    seen = set()
+    while len(names) < team_size:
+        name = f"{rng.choice(SURNAMES)} {chr(65 + rng.randrange(26))}."
+        if name in seen:
+            name = f"{name[:-1]}{len(names)}."
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def build_shift_configuration(shifts_per_weekday, shifts_per_weekend_day, headcount):
+    """Shift templates per weekday drawn from SHIFT_CATALOGUE"""
+    config = {}
+    for day in WEEKDAYS:
+        count = shifts_per_weekend_day if day in WEEKEND else shifts_per_weekday
+        config[day] = {}
+        for name, start, end in SHIFT_CATALOGUE[:count]:
+            shift = {"start": start, "end": end, "hours": _duration_hours(start, end)}
+            if headcount > 1:
+                shift["headcount"] = headcount
+            config[day][name] = shift
+    return config
+
+
+def _duration_hours(start, end):
+    start_hour, start_min = map(int, start.split(':'))
+    end_hour, end_min = map(int, end.split(':'))
+    minutes = (end_hour * 60 + end_min) - (start_hour * 60 + start_min)
+    if minutes <= 0:
+        minutes += 24 * 60
+    return minutes // 60 if minutes % 60 == 0 else minutes / 60
+
+
+def month_dates(year, month):
+    return [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+
+
+def generate_config(team_size=50, months=((2024, 1),), seed=0,
+                    shifts_per_weekday=3, shifts_per_weekend_day=4, headcount=None,
+                    target_shifts_per_member=14, fixed_shift_density=0.15,
+                    days_off_rate=0.04, vacation_probability=0.25, vacation_days=(5, 15),
+                    holidays=(), holiday_off_rate=0.4, infeasible=()):
+    """Build a synthetic configuration dict in the export_config schema
+
+    headcount defaults to the seats per shift needed for members to average
+    about target_shifts_per_member shifts a month. infeasible may contain any
+    of INFEASIBLE_KINDS to inject problems; what was injected is recorded
+    under the 'synthetic' key (ignored by import_config). fixed_conflict is
+    skipped when the whole team fits in one shift's seats.
+    """
+    rng = random.Random(seed)
+    unknown = set(infeasible) - set(INFEASIBLE_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown infeasible kinds: {', '.join(sorted(unknown))}")
+
+    months = [tuple(m) for m in months]
+    all_dates = [d for year, month in months for d in month_dates(year, month)]
+    slots_per_month = sum(
+        shifts_per_weekend_day if d.strftime('%A') in WEEKEND else shifts_per_weekday for d in all_dates
+    ) / max(len(months), 1)
+    if headcount is None:
+        headcount = max(1, round(team_size * target_shifts_per_member / max(slots_per_month, 1)))
+    injected = []
+    if 'understaffed' in infeasible:
+        headcount = team_size + 1
+        injected.append({'kind': 'understaffed', 'headcount': headcount})
+
+    members = member_names(team_size, rng)
+    shift_config = build_shift_configuration(shifts_per_weekday, shifts_per_weekend_day, headcount)
+    constraints = {member: {} for member in members}
+
+    # Fixed weekly shifts, without exceeding any shift's headcount
+    fixed_load = {}
+    for member in members:
+        if rng.random() >= fixed_shift_density:
+            continue
+        fixed = {}
+        for day in rng.sample(WEEKDAYS, rng.randint(1, 3)):
+            shift_name = rng.choice(list(shift_config[day]))
+            if fixed_load.get((day, shift_name), 0) < headcount:
+                fixed_load[(day, shift_name)] = fixed_load.get((day, shift_name), 0) + 1
+                fixed[day] = shift_name
+        if fixed:
+            constraints[member]['fixed_shifts'] = fixed
+
+    if 'fixed_conflict' in infeasible and team_size > headcount:
+        # More members pinned to one (weekday, shift) than it has seats (impossible when everyone fits)
+        day, shift_name = 'Monday', next(iter(shift_config['Monday']))
+        pinned = members[:headcount + 1]
+        for member in pinned:
+            constraints[member].setdefault('fixed_shifts', {})[day] = shift_name
+        injected.append({'kind': 'fixed_conflict', 'day': day, 'shift': shift_name, 'members': pinned})
+
+    # Days off: scattered single days, clustered vacations and holidays
+    days_off = {member: set() for member in members}
+    holiday_dates = {datetime.strptime(h, '%Y-%m-%d').date() if isinstance(h, str) else h for h in holidays}
+    for member in members:
+        for d in all_dates:
+            rate = holiday_off_rate if d in holiday_dates else days_off_rate
+            if rng.random() < rate:
+                days_off[member].add(d)
+        if all_dates and rng.random() < vacation_probability:
+            length = rng.randint(*vacation_days)
+            first = rng.choice(all_dates)
+            days_off[member].update(first + timedelta(days=i) for i in range(length))
+
+    if 'all_off' in infeasible and all_dates:
+        blackout = all_dates[len(all_dates) // 2]
+        for member in members:
+            days_off[member].add(blackout)
+        injected.append({'kind': 'all_off', 'date': blackout.isoformat()})
+
+    for member, dates in days_off.items():
+        for d in sorted(dates):
+            month_key = f"{d.year}-{d.month:02d}"
+            constraints[member].setdefault(month_key, {}).setdefault('days_off', []).append(d.isoformat())
+
+    constraints = {member: c for member, c in constraints.items() if c}
+
+    return {
+        'team_members': members,
+        'shift_configuration': shift_config,
+        'constraints': constraints,
+        'export_date': datetime(*months[0], 1).isoformat() if months else None,
+        'synthetic': {
+            'seed': seed,
+            'team_size': team_size,
+            'months': [f"{year}-{month:02d}" for year, month in months],
+            'headcount': headcount,
+            'infeasible': injected,
+        },
+    }
+
+
+def to_yaml(config):
+    """Serialise a config the same way export_config does"""
+    import yaml
+
+    return yaml.dump(config, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic team configuration")
+    parser.add_argument('--team-size', type=int, default=50)
+    parser.add_argument('--months', nargs='+', default=['2024-01'], metavar='YYYY-MM')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shifts-per-weekday', type=int, default=3)
+    parser.add_argument('--shifts-per-weekend-day', type=int, default=4)
+    parser.add_argument('--headcount', type=int)
+    parser.add_argument('--fixed-shift-density', type=float, default=0.15)
+    parser.add_argument('--days-off-rate', type=float, default=0.04)
+    parser.add_argument('--vacation-probability', type=float, default=0.25)
+    parser.add_argument('--holiday', action='append', default=[], metavar='YYYY-MM-DD')
+    parser.add_argument('--infeasible', action='append', default=[], choices=INFEASIBLE_KINDS)
+    parser.add_argument('-o', '--output', help="Output YAML file (default: stdout)")
+    args = parser.parse_args()
+
+    config = generate_config(
+        team_size=args.team_size,
+        months=[tuple(map(int, m.split('-'))) for m in args.months],
+        seed=args.seed,
+        shifts_per_weekday=args.shifts_per_weekday,
+        shifts_per_weekend_day=args.shifts_per_weekend_day,
+        headcount=args.headcount,
+        fixed_shift_density=args.fixed_shift_density,
+        days_off_rate=args.days_off_rate,
+        vacation_probability=args.vacation_probability,
+        holidays=args.holiday,
+        infeasible=args.infeasible,
+    )
+
+    content = to_yaml(config)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(content)
+    else:
+        print(content)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pandas as pd
 import yaml
 from datetime import datetime, timedelta
@@ -13,6 +14,7 @@ from scheduling_utils import (
     export_config, import_config, create_excel_export,
     create_ics_export, DEFAULT_DOCTORS, DEFAULT_SHIFTS
 )
+from schedule_store import copy_on_write
 
 
 @pytest.fixture
@@ -25,6 +27,8 @@ def mock_session_state():
         session_state.doctor_colors = {}
         session_state.shift_config = DEFAULT_SHIFTS.copy()
         session_state.constraints = {}
+        session_state.fairness = {}
+        session_state.rest_rules = {}
         session_state.schedule_df = pd.DataFrame()
         session_state.schedule_generated = False
 
@@ -273,6 +277,652 @@ class TestGenerateSchedule:
             assert all(doctor != 'Chen' for doctor in jan_15_other_shifts['Doctor'])
 
 
+class TestShiftTemplates:
+    def test_parse_time_and_overnight_interval(self):
+        from scheduling_utils import parse_time, shift_interval
+
+        assert parse_time("07:30") == 450
+        assert parse_time(1140) == 1140  # YAML sexagesimal 19:00
+        assert shift_interval("07:00", "19:00") == (420, 1140)
+        assert shift_interval("19:00", "07:00") == (1140, 1860)
+        assert shift_interval("12:00", "00:00") == (720, 1440)
+
+    def test_compile_shift_config(self):
+        from scheduling_utils import compile_shift_config
+
+        compiled = compile_shift_config(DEFAULT_SHIFTS)
+
+        assert [t.template_id for t in compiled.templates] == list(range(len(compiled.templates)))
+        night = compiled.lookup[("Friday", "7p-7a")]
+        assert night.overnight
+        assert night.duration == 720
+        assert night.hours == 12
+        assert not compiled.lookup[("Friday", "7a-7p")].overnight
+        assert [t.name for t in compiled.by_day["Tuesday"]] == ["7a-7p", "12p-12a"]
+
+    def test_month_slots_cached_per_config(self):
+        from scheduling_utils import get_month_slots
+
+        slots = get_month_slots(2024, 1, DEFAULT_SHIFTS)
+        assert get_month_slots(2024, 1, DEFAULT_SHIFTS) is slots
+        assert [s.date for s in slots] == sorted(s.date for s in slots)
+        assert slots[0].end_abs - slots[0].start_abs == slots[0].template.duration
+
+        only_mondays = {"Monday": DEFAULT_SHIFTS["Monday"]}
+        monday_slots = get_month_slots(2024, 1, only_mondays)
+        assert monday_slots is not slots
+        assert {s.day for s in monday_slots} == {"Monday"}
+        assert len(monday_slots) == 5 * 3  # Five Mondays in January 2024
+
+    def test_generate_schedule_with_explicit_shift_config(self, mock_session_state):
+        only_tuesdays = {"Tuesday": {"7a-7p": {"start": "07:00", "end": "19:00", "hours": 12}}}
+        df = generate_schedule(2024, 1, ["Chen", "Patel"], shift_config=only_tuesdays)
+
+        assert len(df) == 5
+        assert set(df['Day']) == {"Tuesday"}
+
+    def test_schedule_hours_and_intervals(self, mock_session_state):
+        from scheduling_utils import schedule_hours, schedule_intervals
+
+        df = pd.DataFrame([
+            {'Date': '2024-01-01', 'Day': 'Monday', 'Shift': '7p-7a', 'Start_Time': '19:00', 'End_Time': '07:00', 'Doctor': 'Chen'},
+            {'Date': '2024-01-02', 'Day': 'Tuesday', 'Shift': 'Custom', 'Start_Time': '08:00', 'End_Time': '12:00', 'Doctor': 'Chen'},
+        ])
+
+        hours = schedule_hours(df)
+        starts, ends = schedule_intervals(df)
+
+        assert hours['Chen'] == 16
+        assert list(ends - starts) == [720, 240]
+        assert starts[1] - starts[0] == 24 * 60 - 11 * 60
+
+
+class TestMultiSeatShifts:
+    BUSY_FRIDAY = {
+        "Friday": {
+            "7a-7p": {"start": "07:00", "end": "19:00", "hours": 12},
+            "2p-2a": {"start": "14:00", "end": "02:00", "hours": 12, "headcount": 3},
+        }
+    }
+
+    def test_headcount_fills_distinct_members(self, mock_session_state):
+        doctors = ["Chen", "Patel", "Johnson", "Okafor", "Valdez"]
+        df = generate_schedule(2024, 1, doctors, shift_config=self.BUSY_FRIDAY)
+
+        busy = df[df['Shift'] == '2p-2a']
+        per_slot = busy.groupby('Date')['Doctor']
+        assert (per_slot.size() == 3).all()
+        assert (per_slot.nunique() == 3).all()
+        assert list(busy['Seat'].unique()) == [1, 2, 3]
+        assert (df[df['Shift'] == '7a-7p']['Seat'] == 1).all()
+
+    def test_fixed_members_take_seats_first(self, mock_session_state):
+        mock_session_state.constraints = {'Okafor': {'fixed_shifts': {'Friday': '2p-2a'}}}
+        df = generate_schedule(2024, 1, ["Chen", "Patel", "Johnson", "Okafor"], shift_config=self.BUSY_FRIDAY)
+
+        busy = df[df['Shift'] == '2p-2a']
+        assert (busy[busy['Seat'] == 1]['Doctor'] == 'Okafor').all()
+        assert 'Okafor' not in set(df[df['Shift'] == '7a-7p']['Doctor'])
+
+    def test_role_mix(self, mock_session_state):
+        mock_session_state.constraints = {
+            'Chen': {'role': 'attending'},
+            'Patel': {'role': 'attending'},
+            'Johnson': {'role': 'nurse'},
+            'Okafor': {'role': 'nurse'},
+            'Valdez': {'role': 'nurse'},
+        }
+        config = {"Saturday": {"7p-7a": {"start": "19:00", "end": "07:00", "roles": {"attending": 1, "nurse": 2}}}}
+
+        df = generate_schedule(2024, 1, list(mock_session_state.constraints), shift_config=config)
+
+        assert 'Role' in df.columns
+        for _, seats in df.groupby('Date'):
+            assert sorted(seats['Role']) == ['attending', 'nurse', 'nurse']
+
+    def test_improve_keeps_role_seats(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        roles = {'Chen': 'attending', 'Patel': 'attending', 'Ng': 'attending',
+                 'Johnson': 'nurse', 'Okafor': 'nurse', 'Valdez': 'nurse', 'Ruiz': 'nurse', 'Kim': 'nurse'}
+        mock_session_state.constraints = {member: {'role': role} for member, role in roles.items()}
+        config = {day: {"7a-7p": {"start": "07:00", "end": "19:00", "roles": {"attending": 1, "nurse": 2}},
+                        "7p-7a": {"start": "19:00", "end": "07:00"}}
+                  for day in DEFAULT_SHIFTS}
+        df = generate_schedule(2024, 1, list(roles), shift_config=config)
+
+        improved = improve_schedule(df, 2024, 1, list(roles), shift_config=config, time_budget=None, seed=0)
+
+        role_seats = improved[improved['Shift'] == '7a-7p']
+        assert improved.attrs['improvement']['accepted'] > 0
+        assert (role_seats['Doctor'].map(roles) == role_seats['Role']).all()
+
+    def test_headcount_larger_than_team(self, mock_session_state):
+        config = {"Monday": {"7a-7p": {"start": "07:00", "end": "19:00", "headcount": 4}}}
+        df = generate_schedule(2024, 1, ["Chen", "Patel"], shift_config=config)
+
+        assert (df.groupby('Date')['Doctor'].nunique() == 2).all()
+
+    def test_large_team_multi_seat_is_fast(self, mock_session_state):
+        import time as time_module
+
+        doctors = [f"Member {i}" for i in range(300)]
+        config = {day: {"7a-7p": {"start": "07:00", "end": "19:00", "headcount": 4},
+                        "7p-7a": {"start": "19:00", "end": "07:00", "headcount": 4}}
+                  for day in DEFAULT_SHIFTS}
+
+        start = time_module.perf_counter()
+        df = generate_schedule(2024, 1, doctors, shift_config=config)
+        elapsed = time_module.perf_counter() - start
+
+        assert len(df) == 31 * 2 * 4
+        assert df['Doctor'].value_counts().max() <= 1
+        assert elapsed < 2.0
+
+    def test_excel_calendar_groups_seats(self, mock_session_state):
+        from openpyxl import load_workbook
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel", "Johnson"], shift_config=self.BUSY_FRIDAY)
+        workbook = load_workbook(create_excel_export(df, 2024, 1))
+        values = [cell.value for row in workbook['Calendar'].iter_rows() for cell in row]
+
+        busy_cells = [v for v in values if isinstance(v, str) and v.startswith('2p-2a:')]
+        assert busy_cells
+        assert all(v.count(',') == 2 for v in busy_cells)
+
+
+class TestImproveSchedule:
+    DOCTORS = ["Chen", "Patel", "Johnson", "Okafor", "Valdez"]
+
+    def _lopsided(self):
+        df = generate_schedule(2024, 1, self.DOCTORS)
+        df['Doctor'] = 'Chen'
+        return df
+
+    def test_balances_and_removes_double_bookings(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        improved = improve_schedule(self._lopsided(), 2024, 1, self.DOCTORS, seed=7)
+
+        counts = improved['Doctor'].value_counts()
+        assert counts.max() - counts.min() <= 1
+        assert not improved.duplicated(['Date', 'Doctor']).any()
+        stats = improved.attrs['improvement']
+        assert stats['final_cost'] < stats['initial_cost']
+
+    def test_respects_fixed_shifts_and_days_off(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        mock_session_state.constraints = {
+            'Patel': {'fixed_shifts': {'Monday': '7a-7p'}},
+            'Okafor': {'2024-01': {'days_off': ['2024-01-10', '2024-01-11']}},
+        }
+        df = generate_schedule(2024, 1, self.DOCTORS)
+
+        improved = improve_schedule(df, 2024, 1, self.DOCTORS, seed=3, anneal=True)
+
+        monday_days = improved[(improved['Day'] == 'Monday') & (improved['Shift'] == '7a-7p')]
+        assert (monday_days['Doctor'] == 'Patel').all()
+        off_days = improved[improved['Date'].isin(['2024-01-10', '2024-01-11'])]
+        assert 'Okafor' not in set(off_days['Doctor'])
+        assert len(improved) == len(df)
+
+    def test_iteration_budget(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        improved = improve_schedule(self._lopsided(), 2024, 1, self.DOCTORS, iterations=10, seed=1)
+
+        assert improved.attrs['improvement']['iterations'] == 10
+
+    def test_large_month_within_time_budget(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        doctors = [f"Member {i}" for i in range(300)]
+        config = {day: {"7a-7p": {"start": "07:00", "end": "19:00", "headcount": 10},
+                        "7p-7a": {"start": "19:00", "end": "07:00", "headcount": 10}}
+                  for day in DEFAULT_SHIFTS}
+        df = generate_schedule(2024, 1, doctors, shift_config=config)
+        df['Doctor'] = [doctors[i % 40] for i in range(len(df))]
+
+        improved = improve_schedule(df, 2024, 1, doctors, seed=1, shift_config=config, time_budget=0.5)
+
+        stats = improved.attrs['improvement']
+        assert stats['seconds'] < 1.0
+        assert stats['final_cost'] < stats['initial_cost'] / 2
+
+
+
+class TestFairness:
+    DOCTORS = ["Chen", "Patel", "Johnson", "Okafor", "Valdez"]
+
+    def test_night_detection(self):
+        from scheduling_utils import compile_shift_config, night_minutes
+
+        assert night_minutes(19 * 60, 31 * 60) == 8 * 60
+        assert night_minutes(7 * 60, 19 * 60) == 0
+        lookup = compile_shift_config(DEFAULT_SHIFTS).lookup
+        assert lookup[('Monday', '7p-7a')].night
+        assert not lookup[('Monday', '7a-7p')].night
+
+    def test_targets_scale_each_members_share(self, mock_session_state):
+        import random
+        from scheduling_utils import fairness_loads, improve_schedule
+
+        mock_session_state.constraints = {'Patel': {'target': 0.5}, 'Okafor': {'target': {'nights': 0}}}
+        random.seed(0)
+        df = improve_schedule(generate_schedule(2024, 1, self.DOCTORS), 2024, 1, self.DOCTORS, time_budget=None, seed=1)
+
+        loads = fairness_loads(df, self.DOCTORS)
+        assert loads.loc['Okafor', 'Nights'] == 0
+        others = loads.drop(['Patel', 'Okafor'])
+        assert abs(loads.loc['Patel', 'Shifts'] - others['Shifts'].mean() / 2) <= 1
+        assert others['Nights'].max() - others['Nights'].min() <= 2
+        assert others['Weekends'].max() - others['Weekends'].min() <= 2
+
+    def test_holidays_are_spread(self, mock_session_state):
+        import random
+        from scheduling_utils import fairness_loads, improve_schedule
+
+        mock_session_state.fairness = {'holidays': ['2024-01-01', '2024-01-15', '2024-01-26'], 'weights': {'holidays': 5}}
+        random.seed(0)
+        df = improve_schedule(generate_schedule(2024, 1, self.DOCTORS), 2024, 1, self.DOCTORS, time_budget=None, seed=1)
+
+        holidays = fairness_loads(df, self.DOCTORS)['Holidays']
+        assert holidays.sum() == df['Date'].isin(['2024-01-01', '2024-01-15', '2024-01-26']).sum()
+        assert holidays.max() - holidays.min() <= 1
+
+    def test_improve_spreads_nights_and_weekends(self, mock_session_state):
+        from scheduling_utils import fairness_loads, improve_schedule
+
+        df = generate_schedule(2024, 1, self.DOCTORS)
+        weekend = df['Day'].isin(['Saturday', 'Sunday'])
+        df.loc[weekend, 'Doctor'] = 'Chen'
+        df.loc[~weekend & (df['Shift'] == '7p-7a'), 'Doctor'] = 'Patel'
+
+        improved = improve_schedule(df, 2024, 1, self.DOCTORS, seed=2)
+
+        loads = fairness_loads(improved, self.DOCTORS)
+        assert loads['Weekends'].max() - loads['Weekends'].min() <= 2
+        assert loads['Nights'].max() - loads['Nights'].min() <= 2
+        stats = improved.attrs['improvement']
+        assert stats['final_cost'] < stats['initial_cost']
+
+    def test_config_round_trip(self, mock_session_state):
+        mock_session_state.fairness = {'weights': {'nights': 2}, 'holidays': ['2024-12-25']}
+        config = yaml.safe_load(export_config())
+        assert config['fairness']['weights']['nights'] == 2.0
+        assert config['fairness']['holidays'] == ['2024-12-25']
+
+        success, message = import_config("fairness:\n  weekend_days: [Friday, Saturday]\n")
+        assert success
+        assert mock_session_state.fairness['weekend_days'] == ['Friday', 'Saturday']
+        assert not import_config("fairness:\n  holidays: [not-a-date]\n")[0]
+
+
+class TestRestRules:
+    DOCTORS = ["Chen", "Patel", "Johnson", "Okafor", "Valdez", "Ng", "Ruiz"]
+
+    def _conflicts(self, df):
+        """Rest rule messages for every row against the rest of its member's shifts"""
+        from scheduling_utils import member_timelines, rest_conflicts
+
+        timelines = member_timelines(df)
+        return [(row, message) for row, doctor in df['Doctor'].items()
+                for message in rest_conflicts(df, row, doctor, timelines=timelines)]
+
+    def test_generate_respects_rest_rules(self, mock_session_state):
+        mock_session_state.rest_rules = {'max_consecutive_days': 4, 'max_hours_7_days': 48}
+
+        df = generate_schedule(2024, 1, self.DOCTORS)
+
+        assert self._conflicts(df) == []
+
+    def test_shifts_listed_out_of_time_order(self, mock_session_state):
+        import random
+        from scheduling_utils import get_month_slots
+
+        config = {day: {"evening": {"start": "19:00", "end": "23:00"}, "day": {"start": "07:00", "end": "19:00"}}
+                  for day in DEFAULT_SHIFTS}
+        mock_session_state.shift_config = config
+        mock_session_state.rest_rules = {'max_hours_7_days': 36, 'min_rest_hours': 0}
+
+        starts = [slot.start_abs for slot in get_month_slots(2024, 1, config)]
+        assert starts == sorted(starts)
+        for seed in range(5):
+            random.seed(seed)
+            assert self._conflicts(generate_schedule(2024, 1, self.DOCTORS[:5])) == []
+
+    def test_default_rules_allow_night_then_day_off(self, mock_session_state):
+        df = generate_schedule(2024, 1, self.DOCTORS)
+
+        nights = df[df['Shift'] == '7p-7a']
+        next_day = {(doctor, (datetime.strptime(date, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d'))
+                    for doctor, date in zip(nights['Doctor'], nights['Date'])}
+        days = df[df['Shift'] == '7a-7p']
+        assert not next_day & set(zip(days['Doctor'], days['Date']))
+
+    def test_edit_conflicts_report_each_rule(self, mock_session_state):
+        from scheduling_utils import rest_conflicts
+
+        mock_session_state.rest_rules = {'max_consecutive_days': 3, 'max_hours_7_days': 40}
+        df = pd.DataFrame({
+            'Date': ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-02'],
+            'Day': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Tuesday'],
+            'Shift': ['7a-7p', '7a-7p', '7a-7p', '7a-7p', '7p-7a'],
+            'Start_Time': ['07:00', '07:00', '07:00', '07:00', '19:00'],
+            'End_Time': ['19:00', '19:00', '19:00', '19:00', '07:00'],
+            'Doctor': ['Chen', 'Chen', 'Chen', 'Patel', 'Patel'],
+        })
+
+        assert rest_conflicts(df, 3, 'Chen') == ['4 consecutive working days (maximum 3)',
+                                                 '48h in 7 days (maximum 40h)']
+        assert rest_conflicts(df, 4, 'Chen') == ['only 0h rest after the previous shift (minimum 11h)',
+                                                 'only 0h rest before the next shift (minimum 11h)',
+                                                 '48h in 7 days (maximum 40h)']
+        assert rest_conflicts(df, 3, 'Patel') == []
+
+        mock_session_state.constraints = {'Chen': {'rest': {'min_rest_hours': 0, 'max_hours_7_days': 0}}}
+        assert rest_conflicts(df, 4, 'Chen') == []
+
+    def test_improve_removes_rest_breaks(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        mock_session_state.rest_rules = {'max_consecutive_days': 5}
+        df = generate_schedule(2024, 1, self.DOCTORS)
+        df['Doctor'] = [self.DOCTORS[i % 2] for i in range(len(df))]
+        assert self._conflicts(df)
+
+        improved = improve_schedule(df, 2024, 1, self.DOCTORS, seed=4)
+
+        assert self._conflicts(improved) == []
+        recount = improve_schedule(improved, 2024, 1, self.DOCTORS, iterations=1).attrs['improvement']
+        assert recount['initial_cost'] == improved.attrs['improvement']['final_cost']
+
+    def test_config_round_trip(self, mock_session_state):
+        mock_session_state.rest_rules = {'min_rest_hours': 12, 'max_consecutive_days': 0}
+        config = yaml.safe_load(export_config())
+        assert config['rest_rules'] == {'min_rest_hours': 12.0, 'max_consecutive_days': None, 'max_hours_7_days': None}
+
+        assert import_config("rest_rules:\n  max_hours_7_days: 60\n")[0]
+        assert mock_session_state.rest_rules['max_hours_7_days'] == 60
+        assert not import_config("rest_rules:\n  max_rest: 3\n")[0]
+        assert not import_config("constraints:\n  Chen:\n    rest: {min_rest_hours: -1}\n")[0]
+
+class TestFeasibility:
+    def test_default_team_is_feasible(self, mock_session_state):
+        from scheduling_utils import check_feasibility
+
+        report = check_feasibility(2024, 1, DEFAULT_DOCTORS)
+
+        assert report['feasible']
+        assert not report['unfillable_slots'] and not report['day_shortfalls']
+
+    def test_reports_unfillable_slots(self, mock_session_state):
+        from scheduling_utils import check_feasibility, feasibility_messages
+
+        mock_session_state.constraints = {
+            'Chen': {'2024-01': {'days_off': ['2024-01-09']}},
+            'Patel': {'2024-01': {'days_off': ['2024-01-09']}},
+        }
+
+        report = check_feasibility(2024, 1, ['Chen', 'Patel'])
+
+        assert not report['feasible']
+        assert {(s['date'], s['shift']) for s in report['unfillable_slots']} == {
+            ('2024-01-09', '7a-7p'), ('2024-01-09', '12p-12a')
+        }
+        assert any('2024-01-09 7a-7p' in m for m in feasibility_messages(report))
+
+    def test_reports_hall_violation_with_competing_shifts(self, mock_session_state):
+        from scheduling_utils import check_feasibility
+
+        # Monday has three shifts but only two people can work that day
+        mock_session_state.constraints = {'Johnson': {'2024-01': {'days_off': ['2024-01-08']}}}
+
+        report = check_feasibility(2024, 1, ['Chen', 'Patel', 'Johnson'])
+
+        shortfall = [d for d in report['day_shortfalls'] if d['date'] == '2024-01-08']
+        assert len(shortfall) == 1
+        assert shortfall[0]['seats'] == 3
+        assert shortfall[0]['assignable'] == 2
+        assert shortfall[0]['members'] == ['Chen', 'Patel']
+        assert not report['unfillable_slots']
+
+    def test_reports_conflicting_and_unknown_fixed_shifts(self, mock_session_state):
+        from scheduling_utils import check_feasibility
+
+        mock_session_state.constraints = {
+            'Chen': {'fixed_shifts': {'Monday': '7a-7p'}},
+            'Patel': {'fixed_shifts': {'Monday': '7a-7p', 'Tuesday': '7p-7a'}},
+        }
+
+        report = check_feasibility(2024, 1, ['Chen', 'Patel', 'Johnson', 'Okafor'])
+
+        assert report['fixed_conflicts'] == [{
+            'day': 'Monday', 'shift': '7a-7p', 'seats': 1,
+            'members': ['Chen', 'Patel'], 'ignored': ['Patel'],
+        }]
+        assert report['unknown_fixed_shifts'] == [{'member': 'Patel', 'day': 'Tuesday', 'shift': '7p-7a'}]
+
+    def test_matching_finds_augmenting_paths(self):
+        from scheduling_utils import max_bipartite_matching
+
+        # Greedy would give seat 0 member 0 and strand seat 1
+        seat_match, member_match = max_bipartite_matching([[0, 1], [0]], 2)
+
+        assert seat_match == [1, 0]
+
+    def test_matching_follows_paths_deeper_than_the_recursion_limit(self):
+        import sys
+        from scheduling_utils import max_bipartite_matching
+
+        # Greedy gives seat i member i; the last seat only fits member 0, so the
+        # augmenting path shifts every seat along to the one free member at the end
+        n = sys.getrecursionlimit() * 3
+        adjacency = [[i, i + 1] for i in range(n)] + [[0]]
+
+        seat_match, member_match = max_bipartite_matching(adjacency, n + 1)
+
+        assert seat_match == list(range(1, n + 1)) + [0]
+        assert -1 not in member_match
+
+    def test_large_team_check_is_fast(self, mock_session_state):
+        import time as time_module
+        from scheduling_utils import check_feasibility
+        from synthetic_config import generate_config
+
+        config = generate_config(team_size=300, seed=1, infeasible=['all_off'])
+        mock_session_state.shift_config = config['shift_configuration']
+        mock_session_state.constraints = config['constraints']
+
+        start = time_module.perf_counter()
+        report = check_feasibility(2024, 1, config['team_members'])
+        elapsed = time_module.perf_counter() - start
+
+        blackout = config['synthetic']['infeasible'][0]['date']
+        assert {s['date'] for s in report['unfillable_slots']} == {blackout}
+        assert elapsed < 0.5
+
+
+class TestRotations:
+    DOCTORS = ["Chen", "Patel", "Johnson", "Okafor", "Valdez"]
+    FOUR_ON_FOUR_OFF = {'anchor': '2024-01-03', 'pattern': ['7a-7p'] * 4 + ['off'] * 4}
+
+    def test_expand_rotations_tiles_cycle_from_anchor(self):
+        from scheduling_utils import expand_rotations
+
+        constraints = {
+            'Chen': {'rotation': self.FOUR_ON_FOUR_OFF},
+            'Patel': {'rotation': {'anchor': '2023-12-25', 'pattern': ['7p-7a', None, False]}},
+        }
+        grid = expand_rotations(['Chen', 'Patel', 'Johnson'], datetime(2024, 1, 1), 366, constraints)
+
+        assert grid.shape == (3, 366)
+        assert list(grid[0, :12]) == [None, None] + ['7a-7p'] * 4 + ['off'] * 4 + ['7a-7p'] * 2
+        assert grid[0, 2 + 8 * 40] == '7a-7p' and grid[0, 6 + 8 * 40] == 'off'
+        # Patel's cycle started a week earlier: Jan 1 is day 7 of the cycle (7 % 3 == 1)
+        assert list(grid[1, :3]) == [None, 'off', '7p-7a']
+        assert all(value is None for value in grid[2])
+
+    def test_generate_schedule_follows_rotation(self, mock_session_state):
+        mock_session_state.constraints = {'Chen': {'rotation': self.FOUR_ON_FOUR_OFF}}
+
+        df = generate_schedule(2024, 1, self.DOCTORS)
+
+        chen = df[(df['Doctor'] == 'Chen') & (df['Date'] >= '2024-01-03')]
+        on_days = {f"2024-01-{d:02d}" for d in range(3, 32) if (d - 3) % 8 < 4}
+        assert set(chen['Date']) == on_days
+        assert (chen['Shift'] == '7a-7p').all()
+        assert set(df[df['Shift'] == '7a-7p'].set_index('Date').loc[sorted(on_days), 'Doctor']) == {'Chen'}
+
+    def test_rotation_overrides_weekly_fixed_shift(self, mock_session_state):
+        from scheduling_utils import get_fixed_shift
+
+        mock_session_state.constraints = {
+            'Chen': {'fixed_shifts': {'Wednesday': '12p-12a'}, 'rotation': self.FOUR_ON_FOUR_OFF},
+        }
+
+        assert get_fixed_shift('Chen', '2024-01-01', 2024, 1) is None  # Monday, before the anchor
+        assert get_fixed_shift('Chen', '2024-01-03', 2024, 1) == '7a-7p'  # Wednesday, rotation on
+        assert get_fixed_shift('Chen', '2024-01-10', 2024, 1) is None  # Wednesday, rotation off
+        assert is_available('Chen', '2024-01-03', '7a-7p', 2024, 1)
+        assert not is_available('Chen', '2024-01-03', '12p-12a', 2024, 1)
+        assert not is_available('Chen', '2024-01-10', '12p-12a', 2024, 1)
+
+    def test_empty_rotation_days_fall_back_to_weekly_pattern(self, mock_session_state):
+        from scheduling_utils import get_fixed_shift
+
+        mock_session_state.constraints = {
+            'Patel': {'fixed_shifts': {'Monday': '7p-7a'}, 'rotation': {'anchor': '2024-01-01', 'pattern': [None, '7a-7p']}},
+        }
+
+        assert get_fixed_shift('Patel', '2024-01-01', 2024, 1) == '7p-7a'
+        assert get_fixed_shift('Patel', '2024-01-08', 2024, 1) == '7a-7p'
+
+    def test_improve_schedule_keeps_rotation_rows(self, mock_session_state):
+        from scheduling_utils import improve_schedule
+
+        mock_session_state.constraints = {'Chen': {'rotation': self.FOUR_ON_FOUR_OFF}}
+        df = generate_schedule(2024, 1, self.DOCTORS)
+        df['Doctor'] = 'Patel'
+
+        improved = improve_schedule(df, 2024, 1, self.DOCTORS, seed=3)
+
+        chen = improved[improved['Doctor'] == 'Chen']
+        off_days = {f"2024-01-{d:02d}" for d in range(1, 32) if d >= 3 and (d - 3) % 8 >= 4}
+        assert not set(chen['Date']) & off_days
+
+    def test_feasibility_reports_rotation_conflicts_per_date(self, mock_session_state):
+        from scheduling_utils import check_feasibility
+
+        mock_session_state.constraints = {
+            'Chen': {'rotation': self.FOUR_ON_FOUR_OFF},
+            'Patel': {'rotation': {'anchor': '2024-01-05', 'pattern': ['7a-7p', 'off']}},
+            'Okafor': {'rotation': {'anchor': '2024-01-01', 'pattern': ['7p-7a']}},
+        }
+
+        report = check_feasibility(2024, 1, self.DOCTORS)
+
+        conflict_dates = {c['day'] for c in report['fixed_conflicts']}
+        assert '2024-01-05' in conflict_dates and '2024-01-06' not in conflict_dates
+        # Tuesdays have no night shift; reported once, at the first Tuesday
+        assert report['unknown_fixed_shifts'] == [{'member': 'Okafor', 'day': '2024-01-02', 'shift': '7p-7a'}]
+
+    def test_import_expands_rotation_groups(self, mock_session_state):
+        mock_session_state.constraints = {}
+        config = yaml.dump({
+            'team_members': self.DOCTORS,
+            'rotation_groups': {
+                'nights': {'anchor': '2024-01-01', 'pattern': ['7p-7a', '7p-7a', 'off', 'off'],
+                           'members': ['Okafor', 'Valdez'], 'stagger': 2},
+            },
+        })
+
+        success, message = import_config(config.replace("'off'", 'off'))
+
+        assert success and 'Rotation groups' in message
+        assert mock_session_state.constraints['Okafor']['rotation']['anchor'] == '2024-01-01'
+        assert mock_session_state.constraints['Valdez']['rotation']['anchor'] == '2024-01-03'
+        assert mock_session_state.constraints['Valdez']['rotation']['pattern'][2] is False
+
+        from scheduling_utils import expand_rotations
+        grid = expand_rotations(['Okafor', 'Valdez'], datetime(2024, 1, 3), 2, mock_session_state.constraints)
+        assert list(grid[0]) == ['off', 'off'] and list(grid[1]) == ['7p-7a', '7p-7a']
+
+
+class TestUnavailability:
+    def test_rules_expand_to_day_masks(self):
+        from scheduling_utils import member_unavailability
+
+        constraints = {
+            'Chen': {'unavailable': [{'from': '2024-01-30', 'to': '2024-02-02'}]},
+            'Patel': {'unavailable': [{'weekday': 'Tuesday', 'every': 2, 'anchor': '2024-01-02'}]},
+            'Johnson': {'unavailable': [{'weekday': 'Saturday', 'nth': 1, 'days': 2}]},
+            'Okafor': {'unavailable': [{'weekday': 'Friday', 'nth': -1}],
+                       '2024-02': {'days_off': ['2024-02-05']}},
+        }
+        doctors = list(constraints)
+        mask = member_unavailability(doctors, '2024-01-01', 60, constraints)
+        off = {doctor: [(datetime(2024, 1, 1) + timedelta(days=int(i))).strftime('%Y-%m-%d')
+                        for i in np.flatnonzero(mask[m])] for m, doctor in enumerate(doctors)}
+
+        assert off['Chen'] == ['2024-01-30', '2024-01-31', '2024-02-01', '2024-02-02']
+        assert off['Patel'] == ['2024-01-02', '2024-01-16', '2024-01-30', '2024-02-13', '2024-02-27']
+        assert off['Johnson'] == ['2024-01-06', '2024-01-07', '2024-02-03', '2024-02-04']
+        assert off['Okafor'] == ['2024-01-26', '2024-02-05', '2024-02-23']
+
+    def test_schedule_and_availability_honour_rules(self, mock_session_state):
+        mock_session_state.constraints = {
+            'Chen': {'unavailable': [{'from': '2024-01-10', 'to': '2024-01-20'}]},
+            'Patel': {'unavailable': [{'weekday': 'Monday', 'from': '2024-01-15'}]},
+        }
+
+        df = generate_schedule(2024, 1, ['Chen', 'Patel', 'Johnson'])
+
+        chen_dates = set(df.loc[df['Doctor'] == 'Chen', 'Date'])
+        assert not chen_dates & {f"2024-01-{d:02d}" for d in range(10, 21)}
+        assert not set(df.loc[df['Doctor'] == 'Patel', 'Date']) & {'2024-01-15', '2024-01-22', '2024-01-29'}
+        assert not is_available('Chen', '2024-01-15', '7a-7p', 2024, 1)
+        assert is_available('Patel', '2024-01-08', '7a-7p', 2024, 1)
+
+    def test_import_normalises_and_export_round_trips(self, mock_session_state):
+        yaml_content = """
+team_members: [Chen, Patel]
+constraints:
+  Chen:
+    unavailable:
+      - {from: 2024-01-25, to: 2024-02-14, reason: Vacation}
+      - {weekday: saturday, nth: 1, days: 2}
+"""
+        success, message = import_config(yaml_content)
+        assert success
+        assert "2 unavailable periods" in message
+
+        rules = mock_session_state.constraints['Chen']['unavailable']
+        assert rules[0] == {'from': '2024-01-25', 'to': '2024-02-14', 'reason': 'Vacation'}
+        assert rules[1]['weekday'] == 'Saturday'
+
+        exported = yaml.safe_load(export_config())
+        assert exported['constraints']['Chen']['unavailable'] == rules
+
+    def test_invalid_rules_are_rejected(self, mock_session_state):
+        from scheduling_utils import describe_unavailability, normalize_unavailability
+
+        with pytest.raises(ValueError):
+            normalize_unavailability({'weekday': 'Tusday'})
+        with pytest.raises(ValueError):
+            normalize_unavailability({'weekday': 'Tuesday', 'every': 2})  # No anchor
+        with pytest.raises(ValueError):
+            normalize_unavailability({'from': '2024-02-01', 'to': '2024-01-01'})
+
+        success, message = import_config("team_members: [Chen]\nconstraints:\n  Chen:\n    unavailable: [{weekday: Funday}]\n")
+        assert not success
+        assert "Chen" in message
+
+        rule = normalize_unavailability({'weekday': 'Friday', 'nth': -1, 'days': 3, 'to': '2024-06-30'})
+        assert describe_unavailability(rule) == "last Friday of each month (3 days) until 2024-06-30"
+
+
 class TestExportConfig:
     def test_export_config_basic(self, mock_session_state):
         yaml_content = export_config()
@@ -359,6 +1009,76 @@ constraints:
         assert "No valid configuration data found" in message
 
 
+class TestLeaveImport:
+    def test_csv_rows_are_validated_and_merged(self):
+        from leave_import import import_leave
+
+        content = (
+            "Employee,Start Date,End Date,Leave Type\n"
+            "Chen,2024-01-15,2024-01-15,PTO\n"
+            "Patel,2024-01-30,2024-02-09,Vacation\n"
+            "\n"
+            "Nobody,2024-01-10,2024-01-10,PTO\n"
+            "Chen,2024-13-01,,PTO\n"
+            "Patel,2024-03-05,2024-03-01,Sick\n"
+            "Chen,01/15/2024,01/15/2024,PTO\n"
+            "Chen,02/03/2024,,Sick\n"
+        ).encode('utf-8')
+        upload = BytesIO(content)
+        doctors = ['Chen', 'Patel']
+        constraints = {'Chen': {'2024-01': {'days_off': ['2024-01-02']}}}
+
+        result = import_leave(upload, 'leave.csv', doctors, constraints)
+
+        assert not upload.closed
+        assert result.rows == 7
+        assert (result.days_off, result.ranges) == (2, 1)
+        assert [row for row, _ in result.errors] == [5, 6, 7]
+        assert "Unknown member 'Nobody'" in result.errors[0][1]
+        assert constraints['Chen']['2024-01']['days_off'] == ['2024-01-02', '2024-01-15']
+        assert constraints['Chen']['2024-02']['days_off'] == ['2024-02-03']
+        assert constraints['Patel']['unavailable'] == [{'from': '2024-01-30', 'to': '2024-02-09', 'reason': 'Vacation'}]
+
+        # Importing the same file again adds nothing
+        again = import_leave(BytesIO(content), 'leave.csv', doctors, constraints)
+        assert (again.days_off, again.ranges) == (0, 0)
+        assert len(constraints['Patel']['unavailable']) == 1
+
+    def test_xlsx_streams_date_cells_and_adds_members(self, mock_session_state):
+        from openpyxl import Workbook
+        from leave_import import import_leave
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['Name', 'Date'])
+        sheet.append(['Chen', datetime(2024, 1, 9)])
+        sheet.append(['Okafor', '2024-01-10'])
+        sheet.append(['Okafor', None])
+        buffer = BytesIO()
+        workbook.save(buffer)
+        buffer.seek(0)
+
+        doctors = ['Chen', 'Patel']
+        constraints = {}
+        result = import_leave(buffer, 'leave.xlsx', doctors, constraints, add_members=True)
+
+        assert result.new_members == ['Okafor']
+        assert doctors == ['Chen', 'Patel', 'Okafor']
+        assert result.errors == [(4, 'Missing date')]
+        assert constraints['Chen']['2024-01']['days_off'] == ['2024-01-09']
+
+        mock_session_state.constraints = constraints
+        assert not is_available('Okafor', '2024-01-10', '7a-7p', 2024, 1)
+
+    def test_missing_columns_are_rejected(self):
+        from leave_import import import_leave
+
+        with pytest.raises(ValueError, match="member"):
+            import_leave(BytesIO(b"Who,When\nChen,2024-01-01\n"), 'leave.csv', ['Chen'], {})
+        with pytest.raises(ValueError, match="date"):
+            import_leave(BytesIO(b"Member,Reason\nChen,PTO\n"), 'leave.csv', ['Chen'], {})
+
+
 class TestCreateExcelExport:
     def test_create_excel_export_basic(self):
         # Create sample dataframe
@@ -481,6 +1201,86 @@ class TestCreateIcsExport:
         assert "Patel - 12p-12a" in ics_content
 
 
+class TestScheduleStore:
+    def _schedule(self):
+        return pd.DataFrame({
+            'Date': ['2024-01-01', '2024-01-01', '2024-01-02'],
+            'Shift': ['7a-7p', '7p-7a', '7a-7p'],
+            'Doctor': ['Chen', 'Patel', 'Johnson'],
+            'Seat': [1, 1, 1],
+        })
+
+    def test_identical_schedules_share_one_copy(self):
+        from schedule_store import ScheduleStore
+
+        store = ScheduleStore()
+        sessions = [store.share(self._schedule()) for _ in range(100)]
+
+        assert len(store) == 1
+        assert all(shared is sessions[0] for shared in sessions)
+        assert store.get(sessions[0].key) is sessions[0]
+
+        other = self._schedule()
+        other.loc[0, 'Doctor'] = 'Okafor'
+        assert store.share(other).key != sessions[0].key
+
+    def test_unreferenced_schedules_are_released(self):
+        import gc
+        from schedule_store import ScheduleStore
+
+        store = ScheduleStore()
+        shared = store.share(self._schedule())
+        key = shared.key
+        del shared
+        gc.collect()
+        assert store.get(key) is None
+
+        published = store.share(self._schedule())
+        store.publish('team', published)
+        del published
+        gc.collect()
+        assert store.get(key) is store.published('team')
+
+    def test_edits_leave_shared_frame_untouched(self):
+        from edit_history import EditLog
+        from schedule_store import ScheduleStore
+
+        shared = ScheduleStore().share(self._schedule())
+        log = EditLog.from_schedule(shared.frame)
+        assert log.apply(shared.frame) is shared.frame
+
+        log.record(0, 'Chen', 'Okafor')
+        view = log.apply(shared.frame)
+        view.loc[1, 'Shift'] = 'changed'
+
+        assert list(view['Doctor']) == ['Okafor', 'Patel', 'Johnson']
+        assert list(shared.frame['Doctor']) == ['Chen', 'Patel', 'Johnson']
+        assert list(shared.frame['Shift']) == ['7a-7p', '7p-7a', '7a-7p']
+
+    @pytest.mark.skipif(not copy_on_write(), reason="views are full copies without copy-on-write")
+    def test_views_share_unchanged_columns(self):
+        from schedule_store import ScheduleStore, with_assignments
+
+        shared = ScheduleStore().share(self._schedule())
+        view = with_assignments(shared.frame, {2: 'Chen'})
+
+        assert np.shares_memory(view['Seat'].to_numpy(), shared.frame['Seat'].to_numpy())
+
+    def test_init_session_copies_default_shifts(self):
+        from scheduling_utils import init_session
+
+        class SessionState(dict):
+            __getattr__ = dict.__getitem__
+            __setattr__ = dict.__setitem__
+
+        with patch('scheduling_utils.st') as mock_st:
+            mock_st.session_state = SessionState()
+            init_session()
+            mock_st.session_state.shift_config['Monday']['7a-7p']['hours'] = 99
+
+        assert DEFAULT_SHIFTS['Monday']['7a-7p']['hours'] == 12
+
+
 class TestDefaultValues:
     def test_default_doctors(self):
         assert len(DEFAULT_DOCTORS) == 5
@@ -507,6 +1307,920 @@ class TestDefaultValues:
         assert weekend_shifts > weekday_shifts
 
 
+class TestExportJobs:
+    def test_run_export_filters_members_and_dates(self, mock_session_state):
+        from export_jobs import ExportJob, run_export
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        job = ExportJob('csv', 2024, 1, start_date='2024-01-10', end_date='2024-01-12', members=('Chen',))
+
+        content = run_export(df, job).decode('utf-8')
+        rows = content.strip().splitlines()[1:]
+
+        assert rows
+        assert all(',Chen' in row for row in rows)
+        assert all('2024-01-10' <= row[:10] <= '2024-01-12' for row in rows)
+
+    def test_manager_returns_bytes_and_progress(self, mock_session_state):
+        from export_jobs import ExportJob, ExportManager, iter_completed
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        jobs = [ExportJob('excel', 2024, 1), ExportJob('ics', 2024, 1)]
+
+        with ExportManager(max_workers=2) as manager:
+            handles = manager.submit_many(df, jobs)
+            finished = list(iter_completed(handles, timeout=30))
+
+        assert len(finished) == 2
+        for handle in handles:
+            assert handle.done()
+            assert handle.progress == 1.0
+            assert handle.error is None
+        assert handles[0].result()[:2] == b'PK'  # xlsx is a zip archive
+        assert b'BEGIN:VCALENDAR' in handles[1].result()
+        assert handles[0].job.filename == 'schedule_2024_01.xlsx'
+
+    def test_progress_callback_reaches_completion(self, mock_session_state):
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        reported = []
+
+        create_ics_export(df, progress=reported.append)
+
+        assert reported == sorted(reported)
+        assert reported[-1] == 1.0
+
+    def test_unknown_format_surfaces_as_error(self, mock_session_state):
+        from export_jobs import ExportJob, ExportManager
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        with ExportManager(max_workers=1) as manager:
+            handle = manager.submit(df, ExportJob('pdf', 2024, 1))
+            with pytest.raises(ValueError):
+                handle.result(timeout=30)
+        assert isinstance(handle.error, ValueError)
+
+
+class TestMetrics:
+    def test_render_prometheus_text(self):
+        from metrics import Counter, Gauge, Histogram, render
+
+        registry = []
+        counter = Counter('jobs_total', "Jobs run", ['format'], registry=registry)
+        gauge = Gauge('queue_depth', "Jobs waiting", registry=registry)
+        histogram = Histogram('job_seconds', "Job time", buckets=(0.1, 1), registry=registry)
+        counter.inc(format='csv')
+        counter.inc(2, format='csv')
+        gauge.set(4)
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value)
+
+        text = render(registry)
+
+        assert '# TYPE jobs_total counter\njobs_total{format="csv"} 3' in text
+        assert 'queue_depth 4' in text
+        assert 'job_seconds_bucket{le="0.1"} 1' in text
+        assert 'job_seconds_bucket{le="1"} 3' in text
+        assert 'job_seconds_bucket{le="+Inf"} 4' in text
+        assert 'job_seconds_count 4' in text
+        with pytest.raises(ValueError):
+            counter.inc(format='csv', team='er')
+        with pytest.raises(ValueError):
+            counter.inc(-1, format='csv')
+
+    def test_generation_records_fallback_and_double_bookings(self, mock_session_state):
+        from metrics import DOUBLE_BOOKINGS, FALLBACK_SEATS, GENERATION_SECONDS
+
+        runs = GENERATION_SECONDS.count()
+        fallback = FALLBACK_SEATS.value()
+        doubled = DOUBLE_BOOKINGS.value()
+        # Two members for a three-seat day shift, then a night shift for whoever worked the day
+        config = {"Monday": {"day": {"start": "07:00", "end": "19:00", "headcount": 3},
+                             "night": {"start": "19:00", "end": "07:00"}}}
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel"], shift_config=config)
+
+        mondays = df['Date'].nunique()
+        assert GENERATION_SECONDS.count() == runs + 1
+        assert FALLBACK_SEATS.value() - fallback == mondays
+        assert DOUBLE_BOOKINGS.value() - doubled == mondays
+
+    def test_improve_records_every_run(self, mock_session_state):
+        from metrics import IMPROVE_SECONDS, REMAINING_DOUBLE_BOOKINGS
+        from scheduling_utils import improve_schedule
+
+        runs = IMPROVE_SECONDS.count()
+        improved = REMAINING_DOUBLE_BOOKINGS.count()
+        doubled = REMAINING_DOUBLE_BOOKINGS.total()
+        # Nothing movable: one member holds every shift, so both shifts of each day stay double-booked
+        df = generate_schedule(2024, 1, ["Chen"])
+
+        improve_schedule(df.iloc[:0], 2024, 1, ["Chen", "Patel"])
+        improve_schedule(df, 2024, 1, ["Chen"])
+
+        assert IMPROVE_SECONDS.count() == runs + 2
+        assert REMAINING_DOUBLE_BOOKINGS.count() == improved + 1
+        assert REMAINING_DOUBLE_BOOKINGS.total() - doubled == len(df) - df['Date'].nunique()
+
+    def test_exports_and_imports_are_recorded(self, mock_session_state):
+        from export_jobs import ExportJob, run_export
+        from metrics import CONFIG_IMPORT_MEMBERS, CONFIG_IMPORTS, EXPORT_BYTES, EXPORT_SECONDS
+
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        exports = EXPORT_SECONDS.count(format='ics')
+        exported_bytes = EXPORT_BYTES.total(format='ics')
+        ok, errors = CONFIG_IMPORTS.value(result='ok'), CONFIG_IMPORTS.value(result='error')
+        members = CONFIG_IMPORT_MEMBERS.total()
+
+        data = run_export(df, ExportJob('ics', 2024, 1))
+        import_config("team_members: [Chen, Patel, Johnson]\n")
+        import_config("team_members: [")
+
+        assert EXPORT_SECONDS.count(format='ics') == exports + 1
+        assert EXPORT_BYTES.total(format='ics') - exported_bytes == len(data)
+        assert CONFIG_IMPORTS.value(result='ok') == ok + 1
+        assert CONFIG_IMPORTS.value(result='error') == errors + 1
+        assert CONFIG_IMPORT_MEMBERS.total() - members == 3
+
+    def test_http_endpoint_and_file(self, tmp_path):
+        import urllib.error
+        import urllib.request
+        from metrics import Gauge, serve_metrics, write_metrics
+
+        registry = []
+        Gauge('answer', "The answer", registry=registry).set(42)
+        server = serve_metrics(port=0, registry=registry)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/metrics") as response:
+                assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+                assert b'answer 42' in response.read()
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(f"{base}/other")
+            assert excinfo.value.code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        path = tmp_path / 'scheduler.prom'
+        write_metrics(str(path), registry)
+        assert 'answer 42' in path.read_text()
+        assert [p.name for p in tmp_path.iterdir()] == ['scheduler.prom']
+
+    def test_session_tracker_forgets_discarded_sessions(self):
+        import gc
+        from metrics import SessionTracker
+
+        tracker = SessionTracker()
+        first = tracker.register()
+        second = tracker.register()
+        assert len(tracker) == 2
+
+        del first
+        gc.collect()
+        assert len(tracker) == 1
+        assert second is not None
+
+
+class TestEditLog:
+    def _schedule(self):
+        return pd.DataFrame({
+            'Date': ['2024-01-01', '2024-01-01', '2024-01-02'],
+            'Shift': ['7a-7p', '7p-7a', '7a-7p'],
+            'Doctor': ['Chen', 'Patel', 'Johnson'],
+        })
+
+    def test_record_undo_redo(self):
+        from edit_history import EditLog
+
+        df = self._schedule()
+        log = EditLog.from_schedule(df)
+
+        log.record(0, 'Chen', 'Okafor', author='coordinator')
+        log.record(2, 'Johnson', 'Chen')
+        assert log.version == 2
+        assert log.edits[0].author == 'coordinator'
+
+        edit = log.undo()
+        assert (edit.slot, edit.old) == (2, 'Johnson')
+        assert log.version == 1
+        assert log.can_redo()
+
+        assert log.redo().new == 'Chen'
+        assert not log.can_redo()
+        assert list(log.apply(df)['Doctor']) == ['Okafor', 'Patel', 'Chen']
+
+    def test_record_after_undo_discards_redo_tail(self):
+        from edit_history import EditLog
+
+        log = EditLog.from_schedule(self._schedule())
+        log.record(0, 'Chen', 'Okafor')
+        log.record(1, 'Patel', 'Valdez')
+        log.undo()
+        log.record(1, 'Patel', 'Chen')
+
+        assert log.latest_version == 2
+        assert not log.can_redo()
+        assert log.member_at(1, 2) == 'Chen'
+
+    def test_diff_between_versions(self):
+        from edit_history import EditLog
+
+        log = EditLog.from_schedule(self._schedule(), checkpoint_every=2)
+        log.record(0, 'Chen', 'Okafor')     # v1
+        log.record(1, 'Patel', 'Valdez')    # v2 (checkpoint)
+        log.record(0, 'Okafor', 'Chen')     # v3: slot 0 back to original
+        log.record(2, 'Johnson', 'Patel')   # v4 (checkpoint)
+
+        assert log.diff(0, 4) == {1: ('Patel', 'Valdez'), 2: ('Johnson', 'Patel')}
+        assert log.diff(1, 3) == {0: ('Okafor', 'Chen'), 1: ('Patel', 'Valdez')}
+        assert log.diff(4, 4) == {}
+        assert log.overrides_at(3) == {1: 'Valdez'}
+
+    def test_bulk_edit_is_one_version(self):
+        from edit_history import BulkEdit, EditLog
+
+        df = self._schedule()
+        log = EditLog.from_schedule(df, checkpoint_every=2)
+        log.record(1, 'Patel', 'Valdez')
+        edit = log.record_many([0, 2], ['Chen', 'Johnson'], ['Okafor', 'Okafor'], action='Reassign')
+
+        assert isinstance(edit, BulkEdit)
+        assert log.version == 2
+        assert list(log.apply(df)['Doctor']) == ['Okafor', 'Valdez', 'Okafor']
+        assert log.diff(1, 2) == {0: ('Chen', 'Okafor'), 2: ('Johnson', 'Okafor')}
+
+        assert log.undo() is edit
+        assert list(log.apply(df)['Doctor']) == ['Chen', 'Valdez', 'Johnson']
+        assert log.redo().changes == ((0, 'Chen', 'Okafor'), (2, 'Johnson', 'Okafor'))
+        assert log.overrides_at(2) == {0: 'Okafor', 1: 'Valdez', 2: 'Okafor'}
+
+    def test_memory_tracks_edits_not_versions(self):
+        from edit_history import EditLog
+
+        df = pd.DataFrame({'Doctor': ['Chen'] * 1000})
+        log = EditLog.from_schedule(df, checkpoint_every=10)
+        for i in range(100):
+            log.record(i % 5, 'Chen', f'Member {i}')
+
+        # Only five distinct slots were ever touched, so every checkpoint stays tiny
+        assert all(len(c) <= 5 for c in log._checkpoints.values())
+        assert len(log.edits) == 100
+
+
+class TestIcsServer:
+    def _schedule(self):
+        return pd.DataFrame([
+            {'Date': '2024-01-01', 'Day': 'Monday', 'Shift': '7a-7p', 'Start_Time': '07:00', 'End_Time': '19:00', 'Doctor': 'Chen'},
+            {'Date': '2024-01-01', 'Day': 'Monday', 'Shift': '7p-7a', 'Start_Time': '19:00', 'End_Time': '07:00', 'Doctor': 'Patel'},
+            {'Date': '2024-01-02', 'Day': 'Tuesday', 'Shift': '7a-7p', 'Start_Time': '07:00', 'End_Time': '19:00', 'Doctor': 'Chen'},
+        ])
+
+    def test_only_changed_members_are_invalidated(self):
+        from ics_server import FeedStore
+
+        store = FeedStore()
+        assert sorted(store.update('er', self._schedule())) == ['Chen', 'Patel']
+
+        chen = store.get_feed('er', 'Chen')
+        patel = store.get_feed('er', 'Patel')
+        assert chen.body.count(b'BEGIN:VEVENT') == 2
+        assert store.get_feed('er', 'Chen') is chen  # Cached
+
+        df = self._schedule()
+        df.loc[1, 'Doctor'] = 'Johnson'
+        changed = store.update('er', df)
+
+        assert sorted(changed) == ['Johnson', 'Patel']
+        assert store.get_feed('er', 'Chen') is chen
+        assert store.get_feed('er', 'Patel').etag != patel.etag
+        assert b'BEGIN:VEVENT' not in store.get_feed('er', 'Patel').body
+        assert store.get_feed('er', 'Nobody') is None
+        assert store.get_feed('other') is None
+
+    def test_http_conditional_get(self):
+        import urllib.error
+        import urllib.request
+        from ics_server import FeedStore, serve_feeds
+
+        store = FeedStore()
+        store.update('er', self._schedule())
+        server = serve_feeds(store, port=0)
+        base = f"http://127.0.0.1:{server.server_address[1]}/teams/er"
+        try:
+            with urllib.request.urlopen(f"{base}/members/Chen.ics") as response:
+                assert response.status == 200
+                assert response.headers['Content-Type'].startswith('text/calendar')
+                etag = response.headers['ETag']
+                last_modified = response.headers['Last-Modified']
+                assert b'Chen - 7a-7p' in response.read()
+
+            renders = store.renders
+            for headers in ({'If-None-Match': etag}, {'If-Modified-Since': last_modified}):
+                request = urllib.request.Request(f"{base}/members/Chen.ics", headers=headers)
+                with pytest.raises(urllib.error.HTTPError) as excinfo:
+                    urllib.request.urlopen(request)
+                assert excinfo.value.code == 304
+                assert excinfo.value.headers['ETag'] == etag
+            assert store.renders == renders
+
+            request = urllib.request.Request(f"{base}.ics", headers={'If-None-Match': etag})
+            with urllib.request.urlopen(request) as response:
+                assert response.status == 200  # Team feed has a different ETag
+
+            with pytest.raises(urllib.error.HTTPError) as excinfo:
+                urllib.request.urlopen(f"{base}/members/Nobody.ics")
+            assert excinfo.value.code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_parse_feed_path(self):
+        from ics_server import parse_feed_path
+
+        assert parse_feed_path('/teams/er.ics') == ('er', None)
+        assert parse_feed_path('/teams/er/members/Dr.%20Chen.ics?x=1') == ('er', 'Dr. Chen')
+        assert parse_feed_path('/favicon.ico') is None
+
+
+class TestScheduleArchive:
+    def test_write_and_query_multiple_months(self, mock_session_state, tmp_path):
+        from scheduling_utils import schedule_hours
+        from schedule_archive import ScheduleArchive
+
+        doctors = ["Chen", "Patel", "Johnson"]
+        january = generate_schedule(2024, 1, doctors)
+        february = generate_schedule(2024, 2, doctors)
+        archive = ScheduleArchive(str(tmp_path))
+
+        assert archive.write(pd.concat([january, february])) == ['2024-01', '2024-02']
+        assert archive.months() == ['2024-01', '2024-02']
+
+        hours = ScheduleArchive(str(tmp_path)).member_hours()
+        expected = schedule_hours(january) + schedule_hours(february)
+        assert hours['Hours'].to_dict() == pytest.approx(expected.to_dict())
+        assert hours['Shifts'].sum() == len(january) + len(february)
+
+        january_only = archive.member_hours(end_month='2024-01')
+        assert january_only['Shifts'].sum() == len(january)
+
+        coverage = archive.coverage_by_shift()
+        assert coverage.loc[('Tuesday', '7a-7p'), 'Assignments'] == 5 + 4  # Tuesdays in Jan + Feb 2024
+        assert ('Tuesday', '7p-7a') not in coverage.index
+
+    def test_partitions_are_memory_mapped_and_typed(self, mock_session_state, tmp_path):
+        from schedule_archive import ScheduleArchive
+
+        archive = ScheduleArchive(str(tmp_path))
+        archive.write(generate_schedule(2024, 1, ["Chen", "Patel"]))
+
+        part = archive.partition('2024-01')
+        assert isinstance(part['member'], np.memmap)
+        assert part['shift'].dtype == np.int16
+
+        frame = archive.to_frame()
+        assert isinstance(frame['Doctor'].dtype, pd.CategoricalDtype)
+        night = frame[frame['Shift'] == '7p-7a'].iloc[0]
+        assert (night['End'] - night['Start']) == pd.Timedelta(hours=12)
+
+    def test_rewriting_a_month_replaces_it(self, mock_session_state, tmp_path):
+        from schedule_archive import ScheduleArchive
+
+        archive = ScheduleArchive(str(tmp_path))
+        df = generate_schedule(2024, 1, ["Chen", "Patel"])
+        archive.write(df)
+        df['Doctor'] = 'Okafor'
+        archive.write(df)
+
+        hours = archive.member_hours()
+        assert list(hours.index) == ['Okafor']
+        members = archive.categories['members']
+        assert members[2] == 'Okafor' and set(members[:2]) == {'Chen', 'Patel'}  # Codes stay stable
+
+
+class TestScheduleIndex:
+    def _schedule(self):
+        return pd.DataFrame({
+            'Date': ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-02', '2024-01-04'],
+            'Day': ['Monday', 'Monday', 'Monday', 'Tuesday', 'Thursday'],
+            'Shift': ['7a-7p', '7a-7p', '7p-7a', '7a-7p', '7a-7p'],
+            'Start_Time': ['07:00', '07:00', '19:00', '07:00', '07:00'],
+            'End_Time': ['19:00', '19:00', '07:00', '19:00', '19:00'],
+            'Doctor': ['Chen', 'Patel', 'Johnson', 'Chen', 'Chen'],
+            'Seat': [1, 2, 1, 1, 1],
+        })
+
+    def test_on_call_includes_overnight_shifts(self):
+        from schedule_index import ScheduleIndex
+
+        index = ScheduleIndex.from_schedule(self._schedule())
+
+        assert [a.member for a in index.on_call('2024-01-01 12:00')] == ['Chen', 'Patel']
+        overnight = index.on_call(datetime(2024, 1, 2, 6, 59))
+        assert [(a.member, a.end) for a in overnight] == [('Johnson', datetime(2024, 1, 2, 7, 0))]
+        assert [a.member for a in index.on_call('2024-01-02 07:00')] == ['Chen']  # End is exclusive
+        assert index.on_call('2024-01-01 12:00', member='Johnson') == []
+        assert list(index.headcount(['2024-01-01 06:00', '2024-01-01 12:00', '2024-01-01 19:00'])) == [0, 2, 1]
+
+    def test_next_shift_and_range(self):
+        from schedule_index import ScheduleIndex
+
+        index = ScheduleIndex.from_schedule(self._schedule())
+
+        assert index.next_shift('Chen', '2024-01-01 08:00').start == datetime(2024, 1, 2, 7, 0)
+        assert index.next_shift('Chen', '2024-01-05') is None
+        assert index.next_shift('Okafor', '2024-01-01') is None
+
+        in_range = index.between('2024-01-02 06:00', '2024-01-04 08:00')
+        assert [(a.member, a.start.day) for a in in_range] == [('Johnson', 1), ('Chen', 2), ('Chen', 4)]
+        assert len(index.between('2024-01-01', '2024-01-05', member='Chen')) == 3
+
+    def test_gaps(self):
+        from schedule_index import Gap, ScheduleIndex
+
+        index = ScheduleIndex.from_schedule(self._schedule())
+
+        assert index.gaps('2024-01-01 07:00', '2024-01-02 19:00') == []
+        assert index.gaps('2024-01-02', '2024-01-05') == [
+            Gap(datetime(2024, 1, 2, 19, 0), datetime(2024, 1, 4, 7, 0)),
+            Gap(datetime(2024, 1, 4, 19, 0), datetime(2024, 1, 5, 0, 0)),
+        ]
+
+    def test_archive_index_spans_months(self, mock_session_state, tmp_path):
+        from schedule_archive import ScheduleArchive
+        from schedule_index import ScheduleIndex
+
+        doctors = ["Chen", "Patel", "Johnson"]
+        schedule = pd.concat([generate_schedule(2024, 1, doctors), generate_schedule(2024, 2, doctors)])
+        ScheduleArchive(str(tmp_path)).write(schedule)
+        index = ScheduleIndex.from_archive(ScheduleArchive(str(tmp_path)))
+
+        assert len(index) == len(schedule)
+        month_end = '2024-01-31 23:00'
+        expected = schedule[(schedule['Date'] == '2024-01-31') & (schedule['Shift'] != '7a-7p')]
+        assert sorted(a.member for a in index.on_call(month_end)) == sorted(expected['Doctor'])
+        member = schedule['Doctor'].iloc[-1]
+        assert index.next_shift(member, '2024-02-01').start.month == 2
+
+
+class TestScheduleValidator:
+    SHIFTS = {day: {"day": {"start": "07:00", "end": "19:00"}, "night": {"start": "19:00", "end": "07:00"}}
+              for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']}
+    TEAM = ['Chen', 'Patel', 'Johnson', 'Okafor']
+
+    def _schedule(self):
+        """February 2024 with Chen on every day shift and Patel on every night"""
+        rows = []
+        for day in range(1, 30):
+            date = datetime(2024, 2, day)
+            rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), 'day', '07:00', '19:00', 'Chen'])
+            rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), 'night', '19:00', '07:00', 'Patel'])
+        return pd.DataFrame(rows, columns=['Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Doctor'])
+
+    def _violations(self, df, constraints=None, rest_rules=None, shift_config=None):
+        from schedule_validator import validate_schedule
+
+        result = validate_schedule(df, self.TEAM, shift_config or self.SHIFTS, constraints or {}, rest_rules or {})
+        return {(v.Date, v.Shift, v.Doctor if isinstance(v.Doctor, str) else None, v.Rule)
+                for v in result.itertuples()}
+
+    def _reassign(self, df, date, shift, member):
+        df.loc[(df['Date'] == date) & (df['Shift'] == shift), 'Doctor'] = member
+
+    def test_clean_schedule_has_no_violations(self):
+        from schedule_validator import VIOLATION_COLUMNS, validate_schedule
+
+        result = validate_schedule(self._schedule(), self.TEAM, self.SHIFTS, {}, {})
+
+        assert result.empty
+        assert list(result.columns) == VIOLATION_COLUMNS
+
+    def test_every_row_rule(self):
+        df = self._schedule()
+        self._reassign(df, '2024-02-05', 'day', 'Johnson')
+        self._reassign(df, '2024-02-06', 'night', 'Chen')
+        self._reassign(df, '2024-02-20', 'day', 'Zed')
+        self._reassign(df, '2024-02-01', 'day', 'Okafor')
+        df = df[~((df['Date'] == '2024-02-10') & (df['Shift'] == 'day'))]
+        extra = pd.DataFrame([['2024-02-12', 'Monday', 'extra', '12:00', '20:00', 'Patel']], columns=df.columns)
+        df = pd.concat([df, extra], ignore_index=True)
+        constraints = {
+            'Johnson': {'2024-02': {'days_off': ['2024-02-05']}},
+            'Okafor': {'fixed_shifts': {'Thursday': 'night'}},
+        }
+
+        violations = self._violations(df, constraints)
+
+        assert ('2024-02-05', 'day', 'Johnson', 'day_off') in violations
+        assert ('2024-02-06', 'night', 'Chen', 'double_booking') in violations
+        assert ('2024-02-06', 'night', 'Chen', 'rest') in violations
+        assert ('2024-02-07', 'day', 'Chen', 'rest') in violations  # Straight from the night shift
+        assert ('2024-02-10', 'day', None, 'coverage') in violations
+        assert ('2024-02-12', 'night', 'Patel', 'overlap') in violations
+        assert ('2024-02-20', 'day', 'Zed', 'unknown_member') in violations
+        thursdays = ['2024-02-01', '2024-02-08', '2024-02-15', '2024-02-22', '2024-02-29']
+        assert {(d, 'night', 'Okafor', 'fixed_shift') for d in thursdays} <= violations  # Fixed but not on it
+        assert ('2024-02-01', 'day', 'Okafor', 'fixed_shift') in violations  # On the wrong shift
+
+    def test_rest_limits_and_messages(self):
+        from schedule_validator import validate_schedule
+
+        result = validate_schedule(self._schedule(), self.TEAM, self.SHIFTS, {},
+                                   {'max_consecutive_days': 5, 'max_hours_7_days': 60})
+
+        days = result[result['Rule'] == 'consecutive_days']
+        assert days['Date'].min() == '2024-02-06'
+        assert len(days) == 2 * 24  # Chen and Patel, days 6 to 29
+        assert days['Message'].iloc[0] == "29 consecutive working days (maximum 5)"
+        hours = result[(result['Rule'] == 'hours_7_days') & (result['Doctor'] == 'Chen')]
+        assert hours['Date'].min() == '2024-02-06'
+        assert hours['Message'].iloc[0] == "72h in 7 days (maximum 60h)"
+
+    def test_role_coverage(self):
+        config = {"Thursday": {"day": {"start": "07:00", "end": "19:00", "roles": {"attending": 1, "nurse": 1}}}}
+        constraints = {'Chen': {'role': 'nurse'}, 'Patel': {'role': 'nurse'}}
+        df = pd.DataFrame([['2024-02-01', 'Thursday', 'day', '07:00', '19:00', 'Chen'],
+                           ['2024-02-01', 'Thursday', 'day', '07:00', '19:00', 'Patel']],
+                          columns=['Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Doctor'])
+        from schedule_validator import validate_schedule
+
+        result = validate_schedule(df, self.TEAM, config, constraints, {})
+
+        first = result[result['Date'] == '2024-02-01']
+        assert list(first['Message']) == ["0 of 1 attending seats filled"]
+        assert (result['Rule'] == 'coverage').sum() == 1 + 4 * 3  # Other Thursdays: seats, attending, nurse
+
+    def test_cli_exit_code(self, tmp_path, monkeypatch, capsys):
+        import schedule_validator
+
+        config = tmp_path / 'team.yaml'
+        config.write_text(yaml.dump({'team_members': self.TEAM, 'shift_configuration': self.SHIFTS}))
+        clean = tmp_path / 'clean.csv'
+        self._schedule().to_csv(clean, index=False)
+        broken = tmp_path / 'broken.csv'
+        df = self._schedule()
+        self._reassign(df, '2024-02-06', 'night', 'Chen')
+        df.to_csv(broken, index=False)
+
+        monkeypatch.setattr('sys.argv', ['schedule_validator.py', str(clean), '--config', str(config)])
+        assert schedule_validator.main() == 0
+        monkeypatch.setattr('sys.argv', ['schedule_validator.py', str(broken), '--config', str(config),
+                                         '--csv', str(tmp_path / 'violations.csv')])
+        assert schedule_validator.main() == 1
+        assert 'double_booking' in capsys.readouterr().out
+        assert len(pd.read_csv(tmp_path / 'violations.csv')) == 3
+        monkeypatch.setattr('sys.argv', ['schedule_validator.py', str(broken), '--config', str(config),
+                                         '--ignore', 'double_booking', '--ignore', 'rest'])
+        assert schedule_validator.main() == 0
+
+
+class TestBulkChanges:
+    TEAM = ['Chen', 'Patel', 'Johnson', 'Okafor']
+
+    def test_reassign_and_swap_over_a_range(self, mock_session_state):
+        from scheduling_utils import reassign_shifts, swap_shifts
+
+        df = generate_schedule(2024, 1, self.TEAM)
+        in_range = df['Date'].between('2024-01-08', '2024-01-21')
+
+        changes = reassign_shifts(df, 'Chen', 'Patel', '2024-01-08', datetime(2024, 1, 21).date())
+        assert set(changes.index) == set(df.index[in_range & (df['Doctor'] == 'Chen')])
+        assert (changes == 'Patel').all()
+
+        swapped = swap_shifts(df, 'Chen', 'Patel', '2024-01-08', '2024-01-21')
+        before = df.loc[swapped.index, 'Doctor']
+        assert set(before) == {'Chen', 'Patel'}
+        assert ((before == 'Chen') == (swapped == 'Patel')).all()
+        assert not swapped.index.isin(df.index[~in_range]).any()
+
+    def test_redistribute_respects_availability_and_balances(self, mock_session_state):
+        from scheduling_utils import redistribute_shifts
+
+        mock_session_state.constraints = {'Okafor': {'2024-01': {'days_off': [f"2024-01-{d:02d}" for d in range(8, 22)]}}}
+        mock_session_state.rest_rules = {'min_rest_hours': 0}
+        # Chen on every day shift, the others taking turns on nights
+        rows = []
+        for day in range(1, 32):
+            date = datetime(2024, 1, day)
+            rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), '7a-7p', '07:00', '19:00', 'Chen'])
+            rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), '7p-7a', '19:00', '07:00', self.TEAM[1 + day % 3]])
+        df = pd.DataFrame(rows, columns=['Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Doctor'])
+
+        changes = redistribute_shifts(df, 'Chen', self.TEAM, '2024-01-08', '2024-01-21')
+
+        assert not changes.empty
+        moved = df.loc[changes.index]
+        assert (moved['Doctor'] == 'Chen').all()
+        assert 'Chen' not in set(changes) and 'Okafor' not in set(changes)
+        assert changes.value_counts().max() - changes.value_counts().min() <= 2
+        # Nobody gets a second shift on a day they already work
+        staying = set(zip(df.drop(index=changes.index)['Date'], df.drop(index=changes.index)['Doctor']))
+        given = list(zip(moved['Date'], changes))
+        assert not staying & set(given)
+        assert len(set(given)) == len(given)
+
+    def test_validate_changes_reports_only_new_violations(self, mock_session_state):
+        from scheduling_utils import reassign_shifts
+        from schedule_validator import validate_changes, validate_schedule
+
+        df = generate_schedule(2024, 1, self.TEAM)
+        before = validate_schedule(df, self.TEAM)
+
+        added = validate_changes(df, reassign_shifts(df, 'Chen', 'Patel'), self.TEAM)
+
+        assert 'double_booking' in set(added['Rule'])
+        assert set(added['Doctor']) == {'Patel'}
+        assert validate_changes(df, {}, self.TEAM, before=before).empty
+
+
+class TestMemberViews:
+    SHIFTS = TestScheduleValidator.SHIFTS
+
+    def _schedule(self):
+        """February 2024 with Chen on day shifts Monday to Thursday and Patel on every night"""
+        rows = []
+        for day in range(29, 0, -1):
+            date = datetime(2024, 2, day)
+            if date.weekday() < 4:
+                rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), 'day', '07:00', '19:00', 'Chen'])
+            rows.append([date.strftime('%Y-%m-%d'), date.strftime('%A'), 'night', '19:00', '07:00', 'Patel'])
+        return pd.DataFrame(rows, columns=['Date', 'Day', 'Shift', 'Start_Time', 'End_Time', 'Doctor'])
+
+    def test_shifts_in_time_order_with_rolling_hours(self):
+        from member_views import SHIFT_COLUMNS, MemberViews
+
+        views = MemberViews(self._schedule(), self.SHIFTS)
+        chen = views.shifts('Chen')
+
+        assert list(chen.columns) == SHIFT_COLUMNS
+        assert chen['Date'].is_monotonic_increasing and len(chen) == 17
+        assert (chen['Hours'] == 12).all()
+        # Four shifts a week, so 48 hours in any seven days once the first week is in
+        assert chen['Hours_7_Days'].tolist()[:4] == [12, 24, 36, 48]
+        assert chen['Hours_7_Days'].max() == 48
+        assert views.summary.loc['Patel', 'Max_Hours_7_Days'] == 84
+
+    def test_monthly_hours_and_unknown_member(self):
+        from member_views import MemberViews
+
+        views = MemberViews(self._schedule(), self.SHIFTS)
+
+        assert views.monthly_hours('Patel').loc['2024-02'].tolist() == [29, 348]
+        assert 'Zed' not in views and 'Chen' in views
+        assert views.shifts('Zed').empty and views.monthly_hours('Zed').empty
+        assert views.next_shift('Zed', '2024-02-01 00:00') is None
+
+    def test_upcoming_and_calendar(self):
+        from member_views import MemberViews
+
+        views = MemberViews(self._schedule(), self.SHIFTS)
+
+        upcoming = views.upcoming('Chen', datetime(2024, 2, 8, 12, 0), limit=3)
+        assert upcoming['Date'].tolist() == ['2024-02-12', '2024-02-13', '2024-02-14']
+        assert views.next_shift('Chen', '2024-02-29 07:00')['Date'] == '2024-02-29'
+        assert views.upcoming('Chen', '2024-03-01 00:00').empty
+
+        weeks = views.calendar('Chen', 2024, 2)
+        days = dict(day for week in weeks for day in week if day[0])
+        assert days[5] == ['day'] and days[9] == [] and len(days) == 29
+        assert views.calendar('Chen', 2024, 3)[1][0] == (4, [])
+
+
+class TestSchedulePivots:
+    TEAM = ['Chen', 'Patel', 'Johnson', 'Okafor']
+
+    def test_loads_match_fairness_loads(self, mock_session_state):
+        from schedule_pivots import DIMENSIONS, SchedulePivots
+        from scheduling_utils import fairness_loads
+
+        df = generate_schedule(2024, 1, self.TEAM)
+        pivots = SchedulePivots.from_frame(df, self.TEAM + ['Valdez'])
+
+        assert pivots.members == self.TEAM + ['Valdez']
+        assert pivots.weeks[0] == pd.Timestamp('2024-01-01') and len(pivots.weeks) == 5
+        expected = fairness_loads(df, self.TEAM + ['Valdez'])
+        totals = pd.DataFrame(pivots.loads.sum(axis=1), index=pivots.members, columns=list(DIMENSIONS))
+        pd.testing.assert_frame_equal(totals, expected[list(DIMENSIONS)], check_names=False)
+        # Default shifts: one person on each shift, and 10a-10p only runs Friday to Sunday
+        staffing = pivots.staffing()
+        assert staffing.loc['Friday', '10a-10p'] == 1 and np.isnan(staffing.loc['Monday', '10a-10p'])
+        team_totals = totals.loc[self.TEAM]
+        assert pivots.fairness_trend(self.TEAM).iloc[-1].tolist() == (team_totals.max() - team_totals.min()).tolist()
+
+    def test_sync_follows_edits_and_undo(self, mock_session_state):
+        from edit_history import EditLog
+        from schedule_pivots import SchedulePivots
+
+        df = generate_schedule(2024, 1, self.TEAM)
+        shared = SchedulePivots.from_frame(df, self.TEAM)
+        pivots = shared.copy()
+        first, second = df.index[:2]
+        log = EditLog.from_schedule(df)
+        log.record(first, df.loc[first, 'Doctor'], 'Zed')
+        log.record_many([second], [df.loc[second, 'Doctor']], ['Patel'], action='reassign')
+
+        pivots.sync(log.overrides_at(log.version))
+        edited = SchedulePivots.from_frame(log.apply(df), self.TEAM)
+        assert pivots.members == edited.members
+        np.testing.assert_allclose(pivots.loads, edited.loads)
+        assert shared.members == self.TEAM and 'Zed' not in shared.members
+
+        log.undo()
+        log.undo()
+        pivots.sync(log.overrides_at(log.version))
+        np.testing.assert_allclose(pivots.loads[:len(self.TEAM)], shared.loads)
+        assert not pivots.loads[pivots.members.index('Zed')].any()
+
+    def test_archive_pivots_match_frame(self, mock_session_state, tmp_path):
+        from schedule_archive import ScheduleArchive
+        from schedule_pivots import SchedulePivots, coverage_heatmap, fairness_trend_chart, hours_over_time, member_week_heatmap
+
+        df = pd.concat([generate_schedule(2024, month, self.TEAM) for month in (1, 2, 3)], ignore_index=True)
+        archive = ScheduleArchive(str(tmp_path))
+        archive.write(df, mock_session_state.shift_config)
+
+        from_frame = SchedulePivots.from_frame(df, self.TEAM, fairness={})
+        from_archive = SchedulePivots.from_archive(archive, '2024-01', '2024-03', self.TEAM, fairness={})
+
+        assert from_archive.members == from_frame.members
+        assert (from_archive.weeks == from_frame.weeks).all()
+        np.testing.assert_allclose(from_archive.loads, from_frame.loads)
+        np.testing.assert_array_equal(from_archive.staffing().to_numpy(), from_frame.staffing()[from_archive.shifts].to_numpy())
+        for figure in (coverage_heatmap(from_archive), member_week_heatmap(from_archive, 'Nights'),
+                       hours_over_time(from_archive, self.TEAM, ['Chen']), fairness_trend_chart(from_archive)):
+            assert figure.data
+
+
+class TestSyntheticConfig:
+    def test_seeded_and_deterministic(self):
+        from synthetic_config import generate_config
+
+        first = generate_config(team_size=40, months=[(2024, 1)], seed=3)
+        second = generate_config(team_size=40, months=[(2024, 1)], seed=3)
+        other = generate_config(team_size=40, months=[(2024, 1)], seed=4)
+
+        assert first == second
+        assert first['constraints'] != other['constraints']
+        assert len(set(first['team_members'])) == 40
+
+    def test_imports_and_generates_at_scale(self, mock_session_state):
+        from synthetic_config import generate_config, to_yaml
+
+        config = generate_config(team_size=300, months=[(2024, 1), (2024, 2)], seed=1, holidays=['2024-01-01'])
+
+        success, message = import_config(to_yaml(config))
+        assert success
+        assert len(mock_session_state.doctors) == 300
+
+        df = generate_schedule(2024, 1, mock_session_state.doctors)
+        headcount = config['synthetic']['headcount']
+        assert headcount > 1
+        assert (df.groupby(['Date', 'Shift']).size() == headcount).all()
+
+        # Holiday draws far more requests than an ordinary day
+        holiday_off = sum('2024-01-01' in c.get('2024-01', {}).get('days_off', []) for c in config['constraints'].values())
+        ordinary_off = sum('2024-01-17' in c.get('2024-01', {}).get('days_off', []) for c in config['constraints'].values())
+        assert holiday_off > 3 * ordinary_off
+
+    def test_vacations_are_clustered(self):
+        from synthetic_config import generate_config
+
+        config = generate_config(team_size=20, months=[(2024, 3)], seed=5,
+                                 days_off_rate=0, vacation_probability=1.0, vacation_days=(7, 7))
+
+        for constraints in config['constraints'].values():
+            dates = sorted(d for key, value in constraints.items() if key.count('-') == 1
+                           for d in value.get('days_off', []))
+            parsed = [datetime.strptime(d, '%Y-%m-%d') for d in dates]
+            assert len(parsed) == 7
+            assert (parsed[-1] - parsed[0]).days == 6
+
+    def test_infeasible_cases_are_recorded(self):
+        from synthetic_config import generate_config
+
+        config = generate_config(team_size=10, seed=2, infeasible=['all_off', 'fixed_conflict'])
+
+        kinds = [item['kind'] for item in config['synthetic']['infeasible']]
+        assert kinds == ['fixed_conflict', 'all_off']
+        blackout = config['synthetic']['infeasible'][1]['date']
+        assert all(blackout in c['2024-01']['days_off'] for c in config['constraints'].values())
+
+        # With more seats than members nothing can be over-pinned, so only the understaffing is recorded
+        config = generate_config(team_size=4, seed=2, infeasible=['understaffed', 'fixed_conflict'])
+        assert config['synthetic']['infeasible'] == [{'kind': 'understaffed', 'headcount': 5}]
+        with pytest.raises(ValueError):
+            generate_config(infeasible=['meteor'])
+
+
+class TestSimulation:
+    BASE = {
+        'team_members': ['Chen', 'Patel', 'Johnson'],
+        'shift_configuration': DEFAULT_SHIFTS,
+        'constraints': {'Patel': {'fixed_shifts': {'Monday': '7a-7p'}}},
+    }
+
+    def test_apply_variation_leaves_base_untouched(self):
+        from simulation import apply_variation
+
+        config = apply_variation(self.BASE, {
+            'add_members': ['Okafor'],
+            'remove_members': ['Chen'],
+            'days_off': {'Patel': ['2024-01-10', '2024-01-11']},
+            'shift_changes': {'Monday': {'7p-7a': None}},
+        })
+
+        assert config['team_members'] == ['Patel', 'Johnson', 'Okafor']
+        assert config['constraints']['Patel']['2024-01']['days_off'] == ['2024-01-10', '2024-01-11']
+        assert '7p-7a' not in config['shift_configuration']['Monday']
+        assert self.BASE['team_members'] == ['Chen', 'Patel', 'Johnson']
+        assert '2024-01' not in self.BASE['constraints']['Patel']
+        assert '7p-7a' in DEFAULT_SHIFTS['Monday']
+
+    def test_simulate_is_reproducible_and_compares_scenarios(self):
+        from simulation import METRICS, simulate
+
+        variations = [
+            {'name': 'Add two', 'add_members': ['Okafor', 'Valdez']},
+            {'name': 'Patel away', 'days_off': {'Patel': [f"2024-01-{d:02d}" for d in range(1, 15)]}},
+        ]
+        summary, runs = simulate(self.BASE, variations, 2024, 1, runs=6, seed=5, max_workers=1)
+        again, _ = simulate(self.BASE, variations, 2024, 1, runs=6, seed=5, max_workers=1)
+
+        assert list(summary.index) == ['Baseline', 'Add two', 'Patel away']
+        assert [m for m, _ in summary.columns[::3]] == METRICS
+        assert len(runs) == 18
+        pd.testing.assert_frame_equal(summary, again)
+
+        means = summary.xs('mean', axis=1, level=1)
+        assert (means['coverage_gap'] == 0).all()
+        assert (means['days_off_violations'] == 0).all()
+        # Three members cannot cover every day without doubling up; two more can
+        assert means.loc['Add two', 'double_bookings'] < means.loc['Baseline', 'double_bookings']
+        assert means.loc['Patel away', 'double_bookings'] > means.loc['Baseline', 'double_bookings']
+
+    def test_run_scenario_leaves_global_random_alone(self):
+        import random
+        from simulation import apply_variation, run_scenario
+
+        config = apply_variation(self.BASE, {})
+        random.seed(42)
+        state = random.getstate()
+        first = run_scenario(config, 2024, 1, [3, 4])
+
+        assert random.getstate() == state
+        assert run_scenario(config, 2024, 1, [3, 4]) == first
+
+    def test_simulate_process_pool_matches_in_process(self):
+        from simulation import simulate
+
+        variations = [{'name': 'Add one', 'add_members': ['Okafor']}]
+        pooled, _ = simulate(self.BASE, variations, 2024, 2, runs=4, seed=1, max_workers=2, chunk_size=2)
+        serial, _ = simulate(self.BASE, variations, 2024, 2, runs=4, seed=1, max_workers=1)
+
+        pd.testing.assert_frame_equal(pooled, serial)
+
+
+class TestImportTime:
+    # Budget for `import scheduling_utils` in a cold interpreter; pandas dominates
+    IMPORT_BUDGET_MS = 1500
+
+    def test_core_import_skips_optional_dependencies(self):
+        from benchmarks.import_time import measure_import, LAZY_DEPENDENCIES
+
+        timings = measure_import("scheduling_utils")
+
+        for dep in LAZY_DEPENDENCIES:
+            assert dep not in timings, f"{dep} imported eagerly"
+
+    def test_core_import_within_budget(self):
+        from benchmarks.import_time import measure_import
+
+        timings = measure_import("scheduling_utils")
+
+        assert timings["scheduling_utils"] / 1000 < self.IMPORT_BUDGET_MS
+
+    def test_lazy_module_loads_on_first_use(self):
+        from scheduling_utils import _LazyModule
+
+        lazy_json = _LazyModule("json")
+        assert lazy_json._module is None
+        assert lazy_json.loads("[1]") == [1]
+        assert lazy_json._module is not None
+
+
+class TestSessionLoad:
+    def test_simulated_sessions_report_every_step(self, monkeypatch):
+        from benchmarks.sessions import REPO_ROOT, STEPS, run
+
+        monkeypatch.chdir(REPO_ROOT)
+        results = run(sessions=2, concurrency=2, team='default', year=2024, month=1, seed=0)
+
+        assert set(results['steps']) <= set(STEPS)
+        assert {'start', 'load', 'generate', 'filter', 'edit'} <= set(results['steps'])
+        assert results['steps']['generate']['count'] == 2 * 3
+        assert results['run_time']['p50'] <= results['run_time']['max']
+        assert results['cpu_seconds'] > 0
+
+
 # Integration tests
 class TestIntegration:
     def test_full_workflow(self, mock_session_state):